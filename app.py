@@ -8,11 +8,13 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 import streamlit as st
-from core.auth import check_authentication, logout
+from core.auth import check_authentication, logout, restore_session
 from core.rbac import check_page_access, get_accessible_pages
 from core.theme import initialize_theme, apply_theme_css, get_logo_path, render_theme_toggle
 from core.db import get_bigquery_client, run_query
 from core.settings import get_table_ref
+from core.kpi_history import track_kpi
+from core.snapshots import latest_snapshots
 
 st.set_page_config(
     page_title="MIND Unified Dashboard",
@@ -31,6 +33,8 @@ if 'username' not in st.session_state:
 if 'role' not in st.session_state:
     st.session_state.role = None
 
+restore_session()
+
 if not st.session_state.authenticated:
     check_authentication()
 else:
@@ -75,6 +79,14 @@ else:
                 st.session_state.current_page = 'Admin'
                 st.rerun()
         
+        # Pre-rendered read-only copies, written by `python -m core.snapshots`
+        snapshots = {name: snap for name, snap in latest_snapshots().items() if name.title() in accessible_pages}
+        if snapshots:
+            st.caption("Snapshots (fast, read-only)")
+            for name, snap in snapshots.items():
+                st.link_button(f"📸 {name.title()} snapshot", snap['url'], use_container_width=True,
+                               help=f"Generated {snap['generated']}")
+        
         st.divider()
         
         if st.button("🚪 Logout", use_container_width=True):
@@ -99,31 +111,23 @@ else:
         if client:
             st.success("✅ Connection successful")
             
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                q = f"SELECT COUNT(DISTINCT user_id) as c FROM {get_table_ref('user')}"
-                df = run_query(q, client)
-                if df is not None and not df.empty:
-                    st.metric("👥 Users", f"{int(df['c'].iloc[0]):,}")
-            
-            with col2:
-                q = f"SELECT COUNT(*) as c FROM {get_table_ref('casestudy')}"
-                df = run_query(q, client)
-                if df is not None and not df.empty:
-                    st.metric("📚 Cases", f"{int(df['c'].iloc[0]):,}")
-            
-            with col3:
-                q = f"SELECT COUNT(*) as c FROM {get_table_ref('sessions')}"
-                df = run_query(q, client)
-                if df is not None and not df.empty:
-                    st.metric("🎯 Sessions", f"{int(df['c'].iloc[0]):,}")
+            metrics = [
+                ("👥 Users", 'home.users', f"SELECT COUNT(DISTINCT user_id) as c FROM {get_table_ref('user')}"),
+                ("📚 Cases", 'home.cases', f"SELECT COUNT(*) as c FROM {get_table_ref('casestudy')}"),
+                ("🎯 Sessions", 'home.sessions', f"SELECT COUNT(*) as c FROM {get_table_ref('sessions')}"),
+                ("✅ Grades", 'home.grades', f"SELECT COUNT(*) as c FROM {get_table_ref('grades')}")
+            ]
             
-            with col4:
-                q = f"SELECT COUNT(*) as c FROM {get_table_ref('grades')}"
-                df = run_query(q, client)
-                if df is not None and not df.empty:
-                    st.metric("✅ Grades", f"{int(df['c'].iloc[0]):,}")
+            for col, (label, key, q) in zip(st.columns(len(metrics)), metrics):
+                with col:
+                    df = run_query(q, client)
+                    if df is not None and not df.empty:
+                        count = int(df['c'].iloc[0])
+                        # Delta and sparkline come from the local KPI history, not extra queries
+                        trend = track_kpi(key, count)
+                        delta = f"{trend['delta']:+,.0f}" if trend['delta'] is not None else None
+                        st.metric(label, f"{count:,}", delta=delta,
+                                  chart_data=trend['series'] if len(trend['series']) > 1 else None)
         else:
             st.error("❌ Failed to connect")
     
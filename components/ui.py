@@ -8,70 +8,266 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+import gzip
 import io
-from core.settings import COLORS
+from core.settings import (
+    COLORS, CHART_CONFIG, EXPORT_CONFIG, USER_INDEX_CONFIG, TRANSCRIPT_CONFIG, TABLES, get_table_ref
+)
+from core.db import (
+    get_bigquery_client, run_query, execute_query, build_keyset_query, build_transcript_query,
+    sql_literal
+)
+from core.user_index import refresh_user_index
+from core.transcript_index import refresh_transcript_index
+from core.cube import refresh_grade_cube
+from core.kpi_history import track_kpi
 from core.theme import get_current_theme, get_theme_colors
 
+# ============================================================================
+# FIGURE CACHE
+# ============================================================================
+
+class LRUCache:
+    """
+    Small thread-safe LRU keyed by content fingerprints
+    
+    Instances are shared by all sessions (via st.cache_resource), so keys
+    must capture every input that affects the stored value. With
+    ``max_size`` the total ``sizeof`` of the values is bounded as well;
+    a single value larger than that is not cached.
+    """
+    
+    def __init__(self, max_entries: int, max_size: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = len):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Any:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: str, value: Any):
+        size = self.sizeof(value) if self.max_size is not None else 0
+        if self.max_size is not None and size > self.max_size:
+            return
+        
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._sizes.pop(key)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self.size += size
+            while len(self._entries) > self.max_entries or (self.max_size is not None and self.size > self.max_size):
+                evicted, _ = self._entries.popitem(last=False)
+                self.size -= self._sizes.pop(evicted)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.size = 0
+    
+    def __len__(self):
+        return len(self._entries)
+
+@st.cache_resource
+def get_figure_cache() -> LRUCache:
+    """Process-wide cache of built Plotly figures"""
+    return LRUCache(CHART_CONFIG['figure_cache_size'])
+
+def frame_fingerprint(data: Optional[pd.DataFrame]) -> str:
+    """
+    Cheap content fingerprint of a DataFrame
+    
+    Hashes shape, column names, dtypes and a vectorized per-row hash of the
+    values, so an unchanged cache hit from run_query maps to the same key.
+    """
+    if data is None:
+        return 'none'
+    
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((data.shape, list(map(str, data.columns)),
+                        list(map(str, data.dtypes)))).encode('utf-8'))
+    try:
+        row_hashes = pd.util.hash_pandas_object(data, index=False)
+    except TypeError:
+        # Nested values (STRUCT/ARRAY columns) are not hashable directly
+        row_hashes = pd.util.hash_pandas_object(data.astype(str), index=False)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _figure_cache_key(kind: str, data: Optional[pd.DataFrame], params: Dict[str, Any]) -> str:
+    """Build the cache key for a chart from its inputs and the active theme"""
+    theme = sorted(get_theme_colors().items())
+    raw = repr((kind, frame_fingerprint(data), sorted(params.items(), key=lambda kv: kv[0]), theme))
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+def render_cached_chart(kind: str, build: Callable[[], go.Figure],
+                        data: Optional[pd.DataFrame] = None, **params):
+    """
+    Render a Plotly chart, reusing the built figure when inputs are unchanged
+    
+    The validated Figure object itself is cached: st.plotly_chart passes a
+    Figure straight to serialization, whereas a cached dict would be
+    re-validated into a new Figure on every hit. Cached figures are shared
+    across sessions and must not be mutated after build().
+    
+    Args:
+        kind: Chart identifier, unique per builder
+        build: Zero-argument function returning the figure; only called on a miss
+        data: DataFrame the figure is built from (fingerprinted)
+        **params: Every other input that affects the figure
+    """
+    cache = get_figure_cache()
+    key = _figure_cache_key(kind, data, params)
+    
+    fig = cache.get(key)
+    if fig is None:
+        fig = build()
+        cache.put(key, fig)
+    
+    st.plotly_chart(fig, use_container_width=True)
+
 # ============================================================================
 # KPI CARDS & METRICS
 # ============================================================================
 
 def render_kpi_card(title: str, value: any, delta: Optional[str] = None, 
-                   help_text: Optional[str] = None, icon: str = "📊"):
-    """Render a single KPI metric card"""
+                   help_text: Optional[str] = None, icon: str = "📊",
+                   chart_data: Optional[List[float]] = None):
+    """Render a single KPI metric card, with an optional sparkline"""
     with st.container():
         col1, col2 = st.columns([1, 5])
         with col1:
             st.markdown(f"<h1>{icon}</h1>", unsafe_allow_html=True)
         with col2:
+            sparkline = chart_data if chart_data and len(chart_data) > 1 else None
             if delta:
-                st.metric(label=title, value=value, delta=delta, help=help_text)
+                st.metric(label=title, value=value, delta=delta, help=help_text, chart_data=sparkline)
             else:
-                st.metric(label=title, value=value, help=help_text)
+                st.metric(label=title, value=value, help=help_text, chart_data=sparkline)
 
-def render_kpi_row(kpis: list):
-    """Render a row of KPI cards"""
+def render_kpi_row(kpis: list, scope: str = 'global'):
+    """
+    Render a row of KPI cards
+    
+    A KPI with a 'key' is recorded in the local KPI history
+    (core.kpi_history) and gets its delta against the previous period and a
+    sparkline from that history, without any extra query. Its numeric value
+    is 'raw' (or 'value' when numeric); 'delta_format' formats the delta
+    and 'period' overrides the comparison period in seconds.
+    
+    Args:
+        kpis: KPI dicts with title, value and optional delta, help_text,
+              icon, key, raw, delta_format and period
+        scope: Data scope of the values (see core.kpi_history.track_kpi)
+    """
     cols = st.columns(len(kpis))
     for i, kpi in enumerate(kpis):
+        delta, chart_data = kpi.get('delta'), None
+        if kpi.get('key'):
+            raw = kpi.get('raw', kpi.get('value'))
+            trend = track_kpi(kpi['key'], float(raw) if isinstance(raw, (int, float, np.number)) else None,
+                              scope, kpi.get('period'))
+            chart_data = trend['series']
+            if delta is None and trend['delta'] is not None:
+                delta = kpi.get('delta_format', "{:+,.1f}").format(trend['delta'])
+        
         with cols[i]:
             render_kpi_card(
                 title=kpi.get('title', ''),
                 value=kpi.get('value', 0),
-                delta=kpi.get('delta'),
+                delta=delta,
                 help_text=kpi.get('help_text'),
-                icon=kpi.get('icon', '📊')
+                icon=kpi.get('icon', '📊'),
+                chart_data=chart_data
             )
 
+def render_indicator(title: str, value: float, axis_max: Optional[float] = None,
+                     bar_color: Optional[str] = None, mode: str = "number+gauge",
+                     height: int = 200, history_key: Optional[str] = None,
+                     scope: str = 'global'):
+    """
+    Render a compact number/gauge indicator card
+    
+    With ``history_key`` the value is recorded in the local KPI history
+    and the indicator shows its change against the previous period.
+    """
+    reference = None
+    if history_key:
+        reference = track_kpi(history_key, value, scope)['previous']
+    
+    def build():
+        indicator = dict(mode=mode, value=value, title={'text': title})
+        if 'gauge' in mode:
+            indicator['gauge'] = {
+                'axis': {'range': [0, axis_max if axis_max is not None else 100]},
+                'bar': {'color': bar_color or COLORS['primary']}
+            }
+        if reference is not None:
+            indicator['mode'] = f"{mode}+delta"
+            indicator['delta'] = {'reference': reference, 'valueformat': ',.1f'}
+        
+        fig = go.Figure(go.Indicator(**indicator))
+        fig.update_layout(height=height, margin=dict(l=10, r=10, t=50, b=10))
+        
+        return fig
+    
+    render_cached_chart('indicator', build, title=title, value=value, axis_max=axis_max,
+                        bar_color=bar_color, mode=mode, height=height, reference=reference)
+
 def render_gauge_chart(title: str, value: float, max_value: float = 100, 
                        threshold_colors: Optional[Dict] = None):
     """Render a gauge/indicator chart"""
     if threshold_colors is None:
         threshold_colors = {'low': 'red', 'medium': 'yellow', 'high': 'green'}
     
-    fig = go.Figure(go.Indicator(
-        mode = "gauge+number+delta",
-        value = value,
-        domain = {'x': [0, 1], 'y': [0, 1]},
-        title = {'text': title},
-        gauge = {
-            'axis': {'range': [None, max_value]},
-            'bar': {'color': COLORS['primary']},
-            'steps': [
-                {'range': [0, max_value * 0.33], 'color': "lightgray"},
-                {'range': [max_value * 0.33, max_value * 0.66], 'color': "gray"}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': max_value * 0.9
+    def build():
+        fig = go.Figure(go.Indicator(
+            mode = "gauge+number+delta",
+            value = value,
+            domain = {'x': [0, 1], 'y': [0, 1]},
+            title = {'text': title},
+            gauge = {
+                'axis': {'range': [None, max_value]},
+                'bar': {'color': COLORS['primary']},
+                'steps': [
+                    {'range': [0, max_value * 0.33], 'color': "lightgray"},
+                    {'range': [max_value * 0.33, max_value * 0.66], 'color': "gray"}
+                ],
+                'threshold': {
+                    'line': {'color': "red", 'width': 4},
+                    'thickness': 0.75,
+                    'value': max_value * 0.9
+                }
             }
-        }
-    ))
+        ))
+        
+        fig.update_layout(height=300)
+        
+        return fig
     
-    fig.update_layout(height=300)
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('gauge', build, title=title, value=value, max_value=max_value)
 
 # ============================================================================
 # GLOBAL FILTERS
@@ -80,9 +276,16 @@ def render_gauge_chart(title: str, value: float, max_value: float = 100,
 def render_global_filters(show_date: bool = True, show_case_study: bool = True,
                          show_cohort: bool = True, show_role: bool = True,
                          show_session_type: bool = False):
-    """Render global filter panel"""
+    """
+    Render global filter panel
+    
+    Options come from the in-memory grade cube, so they list only values
+    that exist in the data. Pass the result to core.cube.filters_to_slice
+    to query the cube with the same selection.
+    """
     st.markdown("### 🔍 Filters")
     
+    cube = refresh_grade_cube()
     filters = {}
     
     col1, col2, col3 = st.columns(3)
@@ -97,8 +300,9 @@ def render_global_filters(show_date: bool = True, show_case_study: bool = True,
             filters['date_range'] = date_range
             
             if date_range == "Custom":
-                start_date = st.date_input("Start Date", key="filter_start_date")
-                end_date = st.date_input("End Date", key="filter_end_date")
+                first_day, last_day = cube.day_range()
+                start_date = st.date_input("Start Date", value=first_day, key="filter_start_date")
+                end_date = st.date_input("End Date", value=last_day, key="filter_end_date")
                 filters['start_date'] = start_date
                 filters['end_date'] = end_date
     
@@ -106,7 +310,7 @@ def render_global_filters(show_date: bool = True, show_case_study: bool = True,
         if show_case_study:
             case_study = st.selectbox(
                 "Case Study",
-                ["All Case Studies", "Case Study 1", "Case Study 2"],  # Will be populated from data
+                ["All Case Studies"] + cube.labels('case_study'),
                 key="global_case_filter"
             )
             filters['case_study'] = case_study
@@ -114,7 +318,7 @@ def render_global_filters(show_date: bool = True, show_case_study: bool = True,
         if show_cohort:
             cohort = st.selectbox(
                 "Cohort",
-                ["All Cohorts", "2024-A", "2024-B", "2025-A"],  # Will be populated from data
+                ["All Cohorts"] + cube.labels('cohort'),
                 key="global_cohort_filter"
             )
             filters['cohort'] = cohort
@@ -123,7 +327,8 @@ def render_global_filters(show_date: bool = True, show_case_study: bool = True,
         if show_role:
             role = st.selectbox(
                 "User Role",
-                ["All Roles", "Student", "Faculty", "Admin"],
+                ["All Roles"] + cube.labels('role'),
+                format_func=str.title,
                 key="global_role_filter"
             )
             filters['role'] = role
@@ -131,7 +336,7 @@ def render_global_filters(show_date: bool = True, show_case_study: bool = True,
         if show_session_type:
             session_type = st.selectbox(
                 "Session Type",
-                ["All Types", "Learning", "Exploratory", "Navigation Only"],
+                ["All Types"] + cube.labels('session_type'),
                 key="global_session_type_filter"
             )
             filters['session_type'] = session_type
@@ -139,189 +344,566 @@ def render_global_filters(show_date: bool = True, show_case_study: bool = True,
     return filters
 
 # ============================================================================
-# CHART RENDERERS
+# DOWNSAMPLING
 # ============================================================================
 
-def render_line_chart(data: pd.DataFrame, x: str, y: str, title: str,
-                     color: Optional[str] = None, height: int = 400):
-    """Render interactive line chart"""
-    theme_colors = get_theme_colors()
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets point selection, vectorized with NumPy
+    
+    The first and last points are always kept and the interior is split into
+    ``n_out - 2`` buckets. Each bucket keeps the point forming the largest
+    triangle with the neighbouring bucket averages, so every bucket is scored
+    in one pass instead of a per-bucket Python loop. The global minimum and
+    maximum are added back so extrema always stay visible.
+    
+    Args:
+        x: Monotonic numeric x values
+        y: Numeric y values
+        n_out: Target number of points
+    
+    Returns:
+        Sorted array of indices to keep (at most ``n_out + 2``)
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
     
+    n_buckets = n_out - 2
+    interior = np.arange(1, n - 1)
+    bucket = (np.arange(n - 2) * n_buckets) // (n - 2)
+    
+    counts = np.bincount(bucket, minlength=n_buckets)
+    mean_x = np.bincount(bucket, weights=x[interior], minlength=n_buckets) / counts
+    mean_y = np.bincount(bucket, weights=y[interior], minlength=n_buckets) / counts
+    
+    prev_x = np.concatenate(([x[0]], mean_x[:-1]))[bucket]
+    prev_y = np.concatenate(([y[0]], mean_y[:-1]))[bucket]
+    next_x = np.concatenate((mean_x[1:], [x[-1]]))[bucket]
+    next_y = np.concatenate((mean_y[1:], [y[-1]]))[bucket]
+    
+    area = np.abs((prev_x - next_x) * (y[interior] - prev_y)
+                  - (prev_x - x[interior]) * (next_y - prev_y))
+    area = np.nan_to_num(area, nan=-1.0)
+    
+    # Buckets are contiguous, so the first entry per bucket after sorting by
+    # (bucket, -area) is that bucket's winner
+    order = np.lexsort((-area, bucket))
+    first = np.concatenate(([0], np.flatnonzero(np.diff(bucket[order])) + 1))
+    selected = interior[order[first]]
+    
+    keep = np.concatenate(([0], selected, [n - 1], [np.nanargmin(y), np.nanargmax(y)]))
+    return np.unique(keep)
+
+def downsample_series(data: pd.DataFrame, x: str, y: str, max_points: int,
+                      color: Optional[str] = None, shared_x: bool = False) -> pd.DataFrame:
+    """
+    Reduce a time series to roughly ``max_points`` per series with LTTB
+    
+    When ``color`` is given each group is downsampled independently, unless
+    ``shared_x`` is set: then LTTB picks x values from the per-x total and
+    every group keeps its rows at those same x values, so stacked series
+    stay aligned. Frames already under budget, or with a
+    non-numeric/non-temporal x axis, are returned unchanged.
+    """
+    if data is None or max_points is None or len(data) <= max_points:
+        return data
+    
+    x_values = data[x]
+    if pd.api.types.is_datetime64_any_dtype(x_values):
+        x_numeric = x_values.to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(float)
+    elif pd.api.types.is_numeric_dtype(x_values):
+        x_numeric = x_values.to_numpy(dtype=float)
+    else:
+        return data
+    
+    y_numeric = pd.to_numeric(data[y], errors='coerce').to_numpy(dtype=float)
+    frame = pd.DataFrame({'_x': x_numeric, '_y': y_numeric, '_pos': np.arange(len(data))})
+    frame = frame[np.isfinite(frame['_x']) & np.isfinite(frame['_y'])]
     if color:
-        fig = px.line(data, x=x, y=y, color=color, title=title)
+        frame['_group'] = data[color].to_numpy()[frame['_pos'].to_numpy()]
+    
+    def _select(group: pd.DataFrame) -> np.ndarray:
+        group = group.sort_values('_x', kind='stable')
+        keep = lttb_indices(group['_x'].to_numpy(), group['_y'].to_numpy(), max_points)
+        return group['_pos'].to_numpy()[keep]
+    
+    if color and shared_x:
+        totals = frame.groupby('_x', sort=True)['_y'].sum()
+        if len(totals) <= max_points:
+            return data
+        kept_x = totals.index.to_numpy()[lttb_indices(totals.index.to_numpy(), totals.to_numpy(), max_points)]
+        positions = frame['_pos'].to_numpy()[np.isin(frame['_x'].to_numpy(), kept_x)]
+    elif color:
+        positions = [_select(group) for _, group in frame.groupby('_group', sort=False, dropna=False)]
+        positions = np.concatenate(positions) if positions else np.array([], dtype=int)
     else:
-        fig = px.line(data, x=x, y=y, title=title)
+        positions = _select(frame)
     
-    fig.update_traces(line_color=COLORS['primary'])
-    fig.update_layout(
-        height=height,
-        hovermode='x unified',
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    return data.iloc[np.sort(positions)]
+
+# ============================================================================
+# SEARCH & SELECTION
+# ============================================================================
+
+def render_user_search(label: str = "Search students", key: str = "user_search") -> Optional[str]:
+    """
+    Typeahead student picker backed by the in-memory user index
     
-    st.plotly_chart(fig, use_container_width=True)
+    Matches are looked up locally (core.user_index) on every keystroke
+    submission, so any student can be found without loading the user table.
+    
+    Returns:
+        Selected user_id, or None when nothing matches
+    """
+    index = refresh_user_index()
+    
+    query = st.text_input(label, key=f"{key}_query", placeholder="Type a name or email")
+    matches = index.search(query, limit=USER_INDEX_CONFIG['max_results'])
+    
+    if matches.empty:
+        st.info("No matching students")
+        return None
+    
+    labels = {
+        user_id: f"{name} ({email})"
+        for user_id, name, email in zip(matches['user_id'], matches['name'], matches['email'])
+    }
+    selected = st.selectbox("Choose student", list(labels), format_func=labels.get,
+                            key=f"{key}_choice")
+    st.caption(f"Top {len(matches)} matches of {len(index):,} students")
+    
+    return selected
+
+# ============================================================================
+# CHART RENDERERS
+# ============================================================================
+
+def render_line_chart(data: pd.DataFrame, x: str, y: str, title: str,
+                     color: Optional[str] = None, height: int = 400,
+                     markers: bool = False, line_width: Optional[int] = None,
+                     max_points: Optional[int] = CHART_CONFIG['lttb_max_points']):
+    """
+    Render interactive line chart, optionally with point markers
+    
+    Series longer than ``max_points`` (per ``color`` group) are LTTB
+    downsampled before plotting; pass ``None`` to send every point.
+    """
+    def build():
+        theme_colors = get_theme_colors()
+        plot_data = downsample_series(data, x, y, max_points, color=color)
+        
+        if color:
+            fig = px.line(plot_data, x=x, y=y, color=color, title=title, markers=markers)
+        else:
+            fig = px.line(plot_data, x=x, y=y, title=title, markers=markers)
+            fig.update_traces(line_color=COLORS['primary'], marker_color=COLORS['primary'])
+        
+        if line_width:
+            fig.update_traces(line_width=line_width)
+        
+        fig.update_layout(
+            height=height,
+            hovermode='x unified',
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
+    
+    render_cached_chart('line', build, data=data, x=x, y=y, title=title, color=color, height=height,
+                        markers=markers, line_width=line_width, max_points=max_points)
 
 def render_bar_chart(data: pd.DataFrame, x: str, y: str, title: str,
-                    color: Optional[str] = None, orientation: str = 'v', height: int = 400):
-    """Render interactive bar chart"""
-    theme_colors = get_theme_colors()
+                    color: Optional[str] = None, orientation: str = 'v', height: int = 400,
+                    palette: Optional[str] = None, ref_line: Optional[float] = None):
+    """
+    Render interactive bar chart
+    
+    With ``palette`` (a Plotly colorscale name such as 'RdYlGn') each bar is
+    colored by its value; ``ref_line`` draws a dashed threshold on the value axis.
+    """
+    def build():
+        theme_colors = get_theme_colors()
+        value_col = x if orientation == 'h' else y
+        
+        fig = px.bar(data, x=x, y=y, color=color, title=title, orientation=orientation)
+        if palette:
+            fig.update_traces(marker=dict(color=data[value_col], colorscale=palette))
+        elif not color:
+            fig.update_traces(marker_color=COLORS['primary'])
+        
+        if ref_line is not None:
+            if orientation == 'h':
+                fig.add_vline(x=ref_line, line_dash="dash", line_color="red", opacity=0.5)
+            else:
+                fig.add_hline(y=ref_line, line_dash="dash", line_color="red", opacity=0.5)
+        
+        fig.update_layout(
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    fig = px.bar(data, x=x, y=y, color=color, title=title, orientation=orientation)
-    fig.update_traces(marker_color=COLORS['primary'])
+    render_cached_chart('bar', build, data=data, x=x, y=y, title=title, color=color, orientation=orientation,
+                        height=height, palette=palette, ref_line=ref_line)
+
+def _density_figure(data: pd.DataFrame, x: str, y: str, title: str, bins: int) -> go.Figure:
+    """Bin a point cloud server-side into a 2D count heatmap"""
+    x_values = pd.to_numeric(data[x], errors='coerce').to_numpy(dtype=float)
+    y_values = pd.to_numeric(data[y], errors='coerce').to_numpy(dtype=float)
+    finite = np.isfinite(x_values) & np.isfinite(y_values)
+    
+    counts, x_edges, y_edges = np.histogram2d(x_values[finite], y_values[finite], bins=bins)
+    counts = np.where(counts > 0, counts, np.nan)  # leave empty cells transparent
+    
+    fig = go.Figure(go.Heatmap(
+        z=counts.T,
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        colorscale='Reds',
+        colorbar=dict(title='Points')
+    ))
     fig.update_layout(
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
+        title=f"{title} ({int(finite.sum()):,} points, binned)",
+        xaxis_title=x,
+        yaxis_title=y
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 def render_scatter_plot(data: pd.DataFrame, x: str, y: str, title: str,
                        color: Optional[str] = None, size: Optional[str] = None,
-                       height: int = 400):
-    """Render scatter plot"""
-    theme_colors = get_theme_colors()
+                       height: int = 400,
+                       webgl_threshold: Optional[int] = CHART_CONFIG['scattergl_threshold'],
+                       density_threshold: Optional[int] = CHART_CONFIG['scatter_density_threshold'],
+                       bins: int = 100):
+    """
+    Render scatter plot
     
-    fig = px.scatter(data, x=x, y=y, color=color, size=size, title=title)
-    fig.update_layout(
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    Above ``webgl_threshold`` points the trace is drawn with WebGL
+    (scattergl). Above ``density_threshold`` the points are binned into a
+    ``bins`` x ``bins`` count heatmap on the server instead; ``color`` and
+    ``size`` are not shown in that mode. Pass ``None`` to disable either switch.
+    """
+    def build():
+        theme_colors = get_theme_colors()
+        n_points = len(data)
+        
+        if density_threshold is not None and n_points > density_threshold:
+            fig = _density_figure(data, x, y, title, bins)
+        else:
+            render_mode = 'webgl' if webgl_threshold is not None and n_points > webgl_threshold else 'svg'
+            fig = px.scatter(data, x=x, y=y, color=color, size=size, title=title,
+                             render_mode=render_mode)
+        
+        fig.update_layout(
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('scatter', build, data=data, x=x, y=y, title=title, color=color, size=size,
+                        height=height, webgl_threshold=webgl_threshold,
+                        density_threshold=density_threshold, bins=bins)
 
 def render_box_plot(data: pd.DataFrame, x: str, y: str, title: str,
                    color: Optional[str] = None, height: int = 400):
     """Render box plot for distribution analysis"""
-    theme_colors = get_theme_colors()
+    def build():
+        theme_colors = get_theme_colors()
+        
+        fig = px.box(data, x=x, y=y, color=color, title=title)
+        fig.update_layout(
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    fig = px.box(data, x=x, y=y, color=color, title=title)
-    fig.update_layout(
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    render_cached_chart('box', build, data=data, x=x, y=y, title=title, color=color, height=height)
+
+def _kde_curve(values: np.ndarray, points: int = 200, grid_bins: int = 512):
+    """
+    Gaussian kernel density estimate (Scott's rule bandwidth)
     
-    st.plotly_chart(fig, use_container_width=True)
+    Values are pre-binned onto a fine grid so the cost is independent of the
+    number of rows.
+    
+    Returns:
+        Tuple of (x grid, density) or None if the data cannot be estimated
+    """
+    values = values[np.isfinite(values)]
+    if len(values) < 2 or np.std(values) == 0:
+        return None
+    
+    bandwidth = np.std(values, ddof=1) * len(values) ** (-1 / 5)
+    lo, hi = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    counts, edges = np.histogram(values, bins=grid_bins, range=(lo, hi))
+    centers = (edges[:-1] + edges[1:]) / 2
+    
+    grid = np.linspace(lo, hi, points)
+    kernel = np.exp(-0.5 * ((grid[:, None] - centers[None, :]) / bandwidth) ** 2)
+    density = kernel @ counts / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
 
 def render_histogram(data: pd.DataFrame, x: str, title: str,
-                    nbins: int = 30, height: int = 400):
-    """Render histogram for distribution"""
-    theme_colors = get_theme_colors()
+                    nbins: int = 30, height: int = 400, kde: bool = False,
+                    vlines: Optional[List[Dict]] = None):
+    """
+    Render histogram for distribution
     
-    fig = px.histogram(data, x=x, title=title, nbins=nbins)
-    fig.update_traces(marker_color=COLORS['primary'])
-    fig.update_layout(
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    Args:
+        kde: Overlay a kernel density curve scaled to the bar counts
+        vlines: Reference lines as dicts with 'x' and optional 'label',
+                'color' and 'dash' keys
+    """
+    def build():
+        theme_colors = get_theme_colors()
+        
+        fig = px.histogram(data, x=x, title=title, nbins=nbins)
+        fig.update_traces(marker_color=COLORS['primary'], opacity=0.75)
+        
+        if kde:
+            values = pd.to_numeric(data[x], errors='coerce').to_numpy(dtype=float)
+            curve = _kde_curve(values)
+            if curve is not None:
+                grid, density = curve
+                finite = values[np.isfinite(values)]
+                bin_width = (finite.max() - finite.min()) / nbins
+                # Pin the bins so the curve scaling matches the bars exactly
+                fig.update_traces(xbins=dict(start=finite.min(), end=finite.max(), size=bin_width))
+                fig.add_trace(go.Scatter(
+                    x=grid, y=density * len(finite) * bin_width,
+                    mode='lines', name='KDE',
+                    line=dict(color=COLORS['secondary'], width=2)
+                ))
+        
+        for line in vlines or []:
+            fig.add_vline(
+                x=line['x'],
+                line_dash=line.get('dash', 'dash'),
+                line_color=line.get('color', 'red'),
+                annotation_text=line.get('label')
+            )
+        
+        fig.update_layout(
+            bargap=0.05,
+            showlegend=False,
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('histogram', build, data=data, x=x, title=title, nbins=nbins, height=height, kde=kde,
+                        vlines=vlines)
 
 def render_area_chart(data: pd.DataFrame, x: str, y: str, title: str,
-                     color: Optional[str] = None, height: int = 400):
-    """Render stacked area chart"""
-    theme_colors = get_theme_colors()
+                     color: Optional[str] = None, height: int = 400,
+                     max_points: Optional[int] = CHART_CONFIG['lttb_max_points']):
+    """
+    Render stacked area chart, LTTB downsampled above ``max_points`` per series
     
-    fig = px.area(data, x=x, y=y, color=color, title=title)
-    fig.update_layout(
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    Stacked groups are downsampled on shared x values; independently chosen
+    points would make Plotly's stacking fill the gaps with zeros.
+    """
+    def build():
+        theme_colors = get_theme_colors()
+        plot_data = downsample_series(data, x, y, max_points, color=color, shared_x=True)
+        
+        fig = px.area(plot_data, x=x, y=y, color=color, title=title)
+        fig.update_layout(
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('area', build, data=data, x=x, y=y, title=title, color=color, height=height,
+                        max_points=max_points)
 
 def render_pie_chart(data: pd.DataFrame, values: str, names: str, title: str,
                     height: int = 400):
     """Render pie chart"""
-    theme_colors = get_theme_colors()
-    
-    fig = px.pie(data, values=values, names=names, title=title)
-    fig.update_layout(
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    def build():
+        theme_colors = get_theme_colors()
+        
+        fig = px.pie(data, values=values, names=names, title=title)
+        fig.update_layout(
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('pie', build, data=data, values=values, names=names, title=title, height=height)
 
 def render_heatmap(data: pd.DataFrame, x: str, y: str, z: str, title: str,
-                  height: int = 500):
-    """Render heatmap"""
-    theme_colors = get_theme_colors()
-    
-    # Pivot data for heatmap
-    pivot_data = data.pivot(index=y, columns=x, values=z)
-    
-    fig = go.Figure(data=go.Heatmap(
-        z=pivot_data.values,
-        x=pivot_data.columns,
-        y=pivot_data.index,
-        colorscale='Reds'
-    ))
+                  height: int = 500, agg: str = 'mean'):
+    """
+    Render heatmap
     
-    fig.update_layout(
-        title=title,
-        height=height,
-        plot_bgcolor=theme_colors['bg'],
-        paper_bgcolor=theme_colors['bg']
-    )
+    Rows sharing an (x, y) cell are combined with ``agg`` ('mean', 'sum',
+    'count', ...). For large tables, aggregate in BigQuery first with
+    core.db.build_heatmap_query and pass the resulting grid.
+    """
+    def build():
+        theme_colors = get_theme_colors()
+        
+        # Aggregate duplicates into one value per cell
+        pivot_data = data.pivot_table(index=y, columns=x, values=z, aggfunc=agg, observed=True)
+        
+        fig = go.Figure(data=go.Heatmap(
+            z=pivot_data.values,
+            x=pivot_data.columns,
+            y=pivot_data.index,
+            colorscale='Reds'
+        ))
+        
+        fig.update_layout(
+            title=title,
+            height=height,
+            plot_bgcolor=theme_colors['bg'],
+            paper_bgcolor=theme_colors['bg']
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('heatmap', build, data=data, x=x, y=y, z=z, title=title, height=height, agg=agg)
 
 def render_radar_chart(categories: List[str], values: List[float], title: str,
                       height: int = 400):
     """Render radar chart for multi-dimensional comparison"""
-    theme_colors = get_theme_colors()
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=categories,
-        fill='toself',
-        line_color=COLORS['primary']
-    ))
-    
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(visible=True, range=[0, 100])
-        ),
-        showlegend=False,
-        title=title,
-        height=height
-    )
+    def build():
+        theme_colors = get_theme_colors()
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Scatterpolar(
+            r=values,
+            theta=categories,
+            fill='toself',
+            line_color=COLORS['primary']
+        ))
+        
+        fig.update_layout(
+            polar=dict(
+                radialaxis=dict(visible=True, range=[0, 100])
+            ),
+            showlegend=False,
+            title=title,
+            height=height
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('radar', build, categories=categories, values=values, title=title, height=height)
 
 def render_funnel_chart(stages: List[str], values: List[int], title: str,
                        height: int = 400):
     """Render funnel chart for conversion analysis"""
-    fig = go.Figure(go.Funnel(
-        y=stages,
-        x=values,
-        textinfo="value+percent initial"
-    ))
-    
-    fig.update_layout(
-        title=title,
-        height=height
-    )
+    def build():
+        fig = go.Figure(go.Funnel(
+            y=stages,
+            x=values,
+            textinfo="value+percent initial"
+        ))
+        
+        fig.update_layout(
+            title=title,
+            height=height
+        )
+        
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_cached_chart('funnel', build, stages=stages, values=values, title=title, height=height)
 
 # ============================================================================
 # DATA TABLES WITH EXPORT
 # ============================================================================
 
+def _to_csv(data: pd.DataFrame) -> bytes:
+    return data.to_csv(index=False).encode('utf-8')
+
+def _to_csv_gzip(data: pd.DataFrame) -> bytes:
+    return gzip.compress(_to_csv(data), compresslevel=6, mtime=0)
+
+def _to_parquet(data: pd.DataFrame) -> bytes:
+    output = io.BytesIO()
+    data.to_parquet(output, index=False)
+    return output.getvalue()
+
+def _to_excel(data: pd.DataFrame) -> bytes:
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        data.to_excel(writer, index=False, sheet_name='Data')
+    return output.getvalue()
+
+# Download formats offered by render_data_table, in button order
+EXPORT_FORMATS = {
+    'csv': {'label': "📥 Download CSV", 'extension': 'csv', 'mime': "text/csv", 'writer': _to_csv},
+    'csv_gz': {'label': "📥 Download CSV (gzip)", 'extension': 'csv.gz',
+               'mime': "application/gzip", 'writer': _to_csv_gzip},
+    'parquet': {'label': "📥 Download Parquet", 'extension': 'parquet',
+                'mime': "application/vnd.apache.parquet", 'writer': _to_parquet},
+    'excel': {'label': "📥 Download Excel", 'extension': 'xlsx',
+              'mime': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+              'writer': _to_excel}
+}
+
+@st.cache_resource
+def get_export_cache() -> LRUCache:
+    """Process-wide cache of generated export files"""
+    return LRUCache(EXPORT_CONFIG['cache_entries'])
+
+@st.cache_resource
+def get_excel_slots() -> threading.BoundedSemaphore:
+    """Process-wide limit on concurrent Excel workbook builds"""
+    return threading.BoundedSemaphore(EXPORT_CONFIG['excel_workers'])
+
+def export_bytes(data: pd.DataFrame, fmt: str) -> bytes:
+    """
+    Serialize a DataFrame to one of EXPORT_FORMATS, cached by data fingerprint
+    
+    At most EXPORT_CONFIG['excel_workers'] Excel workbooks are built at
+    once, which bounds their CPU and memory. Further Excel downloads wait
+    for a free slot in their own request thread. Other formats are not
+    limited.
+    """
+    cache = get_export_cache()
+    key = f"{fmt}:{frame_fingerprint(data)}"
+    
+    payload = cache.get(key)
+    if payload is None:
+        writer = EXPORT_FORMATS[fmt]['writer']
+        if fmt == 'excel':
+            with get_excel_slots():
+                payload = cache.get(key)
+                if payload is None:
+                    payload = writer(data)
+        else:
+            payload = writer(data)
+        cache.put(key, payload)
+    
+    return payload
+
 def render_data_table(data: pd.DataFrame, title: str = "Data Table",
                      max_rows: int = 100, enable_download: bool = True,
                      key_suffix: str = ""):
-    """Render interactive data table with export functionality"""
+    """
+    Render interactive data table with export functionality
+    
+    Export files are generated only when a download button is clicked
+    (Streamlit deferred downloads), so rendering costs just the preview.
+    """
     
     st.markdown(f"#### {title}")
     
@@ -340,42 +922,248 @@ def render_data_table(data: pd.DataFrame, title: str = "Data Table",
     
     with col2:
         if enable_download:
-            # CSV Download
-            csv = data.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv,
-                file_name=f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                key=f"csv_download_{key_suffix}"
-            )
-            
-            # Excel Download
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                data.to_excel(writer, index=False, sheet_name='Data')
-            excel_data = output.getvalue()
+            file_stem = f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
             
-            st.download_button(
-                label="📥 Download Excel",
-                data=excel_data,
-                file_name=f"{title.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key=f"excel_download_{key_suffix}"
-            )
+            for fmt, spec in EXPORT_FORMATS.items():
+                if fmt == 'excel' and len(data) > EXPORT_CONFIG['excel_max_rows']:
+                    st.caption(f"Excel export is limited to {EXPORT_CONFIG['excel_max_rows']:,} rows; "
+                               "use CSV or Parquet")
+                    continue
+                
+                st.download_button(
+                    label=spec['label'],
+                    data=lambda fmt=fmt: export_bytes(data, fmt),
+                    file_name=f"{file_stem}.{spec['extension']}",
+                    mime=spec['mime'],
+                    key=f"{fmt}_download_{key_suffix}",
+                    on_click="ignore"
+                )
 
-def render_expandable_table(data: pd.DataFrame, title: str, 
-                           expand_column: Optional[str] = None):
-    """Render table with expandable rows"""
+@st.fragment
+def render_paginated_table(table_name: str, columns: List[str], title: str,
+                           page_size: int = 50, where: Optional[str] = None,
+                           key_suffix: str = "",
+                           on_select: Optional[Callable[[pd.Series], None]] = None):
+    """
+    Render a server-side paginated table with on-demand row detail
+    
+    Pages are fetched with keyset pagination on the primary key declared in
+    core.settings.TABLES (``WHERE pk > last ORDER BY pk``), so only the
+    visible page is queried and rendered regardless of table size. Selecting
+    a row loads its full record in a single lookup.
+    
+    Runs as a fragment: paging and row selection rerun only the table,
+    with the cursor moved in the button callbacks before that rerun.
+    
+    Args:
+        table_name: Key of core.settings.TABLES
+        columns: Lightweight columns shown in the list view
+        title: Table title
+        page_size: Rows per page
+        where: Optional filter condition without the WHERE keyword
+        key_suffix: Distinguishes multiple tables on one page
+        on_select: Renders the selected row instead of the full-record
+                   lookup (e.g. to avoid fetching heavy columns)
+    """
     st.markdown(f"#### {title}")
     
-    if data is None or data.empty:
+    client = get_bigquery_client()
+    if client is None:
+        render_data_unavailable("Database connection unavailable")
+        return
+    
+    pk = TABLES[table_name]['primary_key']
+    state_key = f"paginated_{table_name}_{key_suffix}_{hashlib.md5(str(where).encode()).hexdigest()[:8]}"
+    cursors = st.session_state.setdefault(state_key, [None])
+    
+    # Fetch one extra row to know whether a next page exists
+    page = run_query(build_keyset_query(table_name, columns, page_size + 1,
+                                        after=cursors[-1], where=where), client)
+    if page is None:
+        return
+    if page.empty and len(cursors) == 1:
         st.info("No data available")
         return
     
-    for idx, row in data.iterrows():
-        with st.expander(f"Row {idx + 1}: {row[expand_column] if expand_column else ''}"):
-            st.json(row.to_dict())
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+    
+    event = st.dataframe(
+        page,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"{state_key}_grid_{len(cursors)}"
+    )
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    
+    with col1:
+        st.button("◀ Previous", disabled=len(cursors) == 1, key=f"{state_key}_prev",
+                  on_click=cursors.pop)
+    
+    with col2:
+        st.caption(f"Page {len(cursors)} · {len(page)} rows · select a row for details")
+    
+    with col3:
+        st.button("Next ▶", disabled=not has_next, key=f"{state_key}_next",
+                  on_click=cursors.append, args=(page[pk].iloc[-1],) if has_next else None)
+    
+    selected_rows = event.selection.rows if event is not None else []
+    if selected_rows and on_select is not None:
+        on_select(page.iloc[selected_rows[0]])
+    elif selected_rows:
+        row_key = page[pk].iloc[selected_rows[0]]
+        detail_q = f"SELECT * FROM {get_table_ref(table_name)} WHERE {pk} = {sql_literal(row_key)} LIMIT 1"
+        detail = run_query(detail_q, client)
+        if detail is not None and not detail.empty:
+            with st.expander(f"{pk}: {row_key}", expanded=True):
+                st.json(detail.iloc[0].to_dict())
+
+# ============================================================================
+# TRANSCRIPT VIEWER
+# ============================================================================
+
+@st.cache_resource
+def get_transcript_cache() -> LRUCache:
+    """Process-wide cache of recently opened transcripts, bounded by total characters"""
+    return LRUCache(TRANSCRIPT_CONFIG['cache_transcripts'], max_size=TRANSCRIPT_CONFIG['cache_chars'])
+
+def fetch_transcript(table_name: str, key: Any, locator: Optional[dict] = None) -> Optional[str]:
+    """
+    A row's whole transcript, from the LRU or a single primary-key lookup
+    
+    The transcript is fetched once and paged through locally, so reading a
+    long transcript costs one BigQuery scan however many parts are viewed.
+    It bypasses the run_query cache, which is not size-bounded; the LRU
+    keeps at most TRANSCRIPT_CONFIG['cache_chars'] characters.
+    
+    Returns:
+        Transcript text ('' if none recorded), or None if the row does not
+        exist or the query failed
+    """
+    cache = get_transcript_cache()
+    cache_key = f"{table_name}:{key}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    result = execute_query(build_transcript_query(table_name, key, locator), get_bigquery_client())
+    if result is None or result.empty:
+        return None
+    
+    text = result['transcript'].iloc[0]
+    text = '' if text is None or (not isinstance(text, str) and pd.isna(text)) else str(text)
+    cache.put(cache_key, text)
+    return text
+
+def render_transcript_viewer(table_name: str, row: pd.Series, key_suffix: str = ""):
+    """
+    Show one row's transcript a chunk at a time
+    
+    Args:
+        table_name: 'conversation' or 'sessions'
+        row: Listed row; its primary key and cluster column values locate the transcript
+        key_suffix: Distinguishes multiple viewers on one page
+    """
+    pk = TABLES[table_name]['primary_key']
+    key = row[pk]
+    locator = {col: row[col] for col in TABLES[table_name].get('cluster_columns', []) if col in row.index}
+    state_key = f"transcript_{table_name}_{key_suffix}_{key}"
+    chunk = st.session_state.setdefault(state_key, 0)
+    
+    with st.spinner("Loading transcript..."):
+        transcript = fetch_transcript(table_name, key, locator)
+    
+    with st.container(border=True):
+        st.markdown(f"**💬 Transcript · {pk}: {key}**")
+        if not transcript:
+            st.info("No transcript recorded")
+            return
+        
+        chunk_chars = TRANSCRIPT_CONFIG['chunk_chars']
+        chunks = -(-len(transcript) // chunk_chars)
+        chunk = min(chunk, chunks - 1)
+        st.code(transcript[chunk * chunk_chars:(chunk + 1) * chunk_chars], language=None,
+                wrap_lines=True, height=400)
+        
+        if chunks > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("◀ Earlier", disabled=chunk == 0, key=f"{state_key}_prev",
+                          on_click=st.session_state.__setitem__, args=(state_key, chunk - 1))
+            with col2:
+                st.caption(f"Part {chunk + 1} of {chunks} · {len(transcript):,} characters")
+            with col3:
+                st.button("Later ▶", disabled=chunk >= chunks - 1, key=f"{state_key}_next",
+                          on_click=st.session_state.__setitem__, args=(state_key, chunk + 1))
+
+def render_transcript_browser(table_name: str, title: str, where: Optional[str] = None,
+                              key_suffix: str = ""):
+    """
+    Browse conversations or sessions and read transcripts on demand
+    
+    The list pages through TRANSCRIPT_CONFIG['list_columns'] only; a
+    transcript is fetched by primary key when its row is selected and shown
+    in chunks, so browsing never pulls transcripts in bulk.
+    
+    Args:
+        table_name: 'conversation' or 'sessions'
+        title: Section title
+        where: Optional filter condition without the WHERE keyword
+        key_suffix: Distinguishes multiple browsers on one page
+    """
+    render_paginated_table(
+        table_name, TRANSCRIPT_CONFIG['list_columns'][table_name], title,
+        page_size=TRANSCRIPT_CONFIG['page_size'], where=where, key_suffix=key_suffix,
+        on_select=lambda row: render_transcript_viewer(table_name, row, key_suffix)
+    )
+
+@st.fragment
+def render_transcript_search(key_suffix: str = ""):
+    """
+    Full-text search over conversation transcripts
+    
+    Searches run against the local FTS5 index (core.transcript_index),
+    never BigQuery; selecting a result opens its transcript in the chunked
+    viewer.
+    
+    Args:
+        key_suffix: Distinguishes multiple search boxes on one page
+    """
+    index = refresh_transcript_index()
+    
+    query = st.text_input("Search transcripts", key=f"transcript_search_{key_suffix}",
+                          placeholder='Words, "a phrase" or a prefix*')
+    if index.building:
+        st.caption("⏳ The transcript index is being built in the background; results may be incomplete")
+    if not query.strip():
+        st.caption(f"{len(index):,} conversations indexed")
+        return
+    
+    started = time.perf_counter()
+    results = index.search(query)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    if results.empty:
+        st.info("No transcripts match")
+        return
+    
+    event = st.dataframe(
+        results,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"transcript_results_{key_suffix}_{hashlib.md5(query.encode()).hexdigest()[:8]}"
+    )
+    st.caption(f"Top {len(results)} matches of {len(index):,} conversations · {elapsed_ms:.0f} ms"
+               " · select a row to read the transcript")
+    
+    selected_rows = event.selection.rows if event is not None else []
+    if selected_rows:
+        render_transcript_viewer('conversation', results.iloc[selected_rows[0]], key_suffix)
 
 # ============================================================================
 # ALERT & WARNING COMPONENTS
@@ -425,10 +1213,15 @@ def format_number(num: float, decimals: int = 2) -> str:
         return f"{num:,.{decimals}f}"
 
 def calculate_percentile(value: float, values: List[float]) -> int:
-    """Calculate percentile rank of a value"""
-    if not values:
+    """
+    Calculate percentile rank of a single value
+    
+    For ranking many values against the same population, build a
+    core.percentiles.PercentileRanker once instead.
+    """
+    if len(values) == 0:
         return 0
-    return int((sum(1 for v in values if v < value) / len(values)) * 100)
+    return int(np.count_nonzero(np.asarray(values, dtype=float) < value) / len(values) * 100)
 
 def render_data_unavailable(message: str = "No data available for the selected filters"):
     """Render data unavailable message"""
@@ -0,0 +1,375 @@
+"""
+At-risk student detection for MIND Dashboard
+Per-student features are loaded from grades and conversation in set-based
+queries, kept up to date incrementally, and scored with vectorized rules
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from typing import Optional
+from core.db import get_bigquery_client, execute_query, sql_literal
+from core.settings import get_table_ref, RISK_CONFIG, TABLES
+from core.user_index import refresh_user_index
+
+# Rubric dimensions in grades.individual_scores
+RUBRIC_SKILLS = {
+    'communication': 'Communication',
+    'comprehension': 'Comprehension',
+    'critical_thinking': 'Critical Thinking'
+}
+
+# Rule name -> label shown in the reasons column
+RISK_RULES = {
+    'low_score': 'Low recent scores',
+    'low_engagement': 'Few attempts',
+    'inactive': 'Inactive',
+    'weak_rubric': 'Skill gap'
+}
+
+SUM_COLUMNS = ['attempts'] + [f"{s}_{p}" for s in RUBRIC_SKILLS for p in ('sum', 'n')]
+
+# Keyset over grades: (timestamp, primary key), NULL timestamps sort first
+GRADE_TS = "COALESCE(timestamp, TIMESTAMP '1970-01-01')"
+GRADE_ID = f"CAST({TABLES['grades']['primary_key']} AS STRING)"
+
+class RiskFeatureStore:
+    """
+    Running per-student aggregates behind the at-risk features
+    
+    Totals hold additive sums (attempts, rubric sums and counts) plus the
+    latest grade/conversation timestamps, so new rows are merged with a
+    groupby instead of a rescan. The rolling average needs the scores
+    themselves, so the last RISK_CONFIG['rolling_window'] grades per student
+    are kept as a long frame.
+    
+    Grades are counted exactly once by a (timestamp, grade id) keyset
+    watermark; None means no grade has been counted yet.
+    """
+    
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.window = window
+        self._totals = pd.DataFrame(columns=SUM_COLUMNS + ['last_grade', 'last_conversation'],
+                                    index=pd.Index([], name='user_id'))
+        self._recent = pd.DataFrame(columns=['user_id', 'timestamp', 'final_score'])
+        self.grade_watermark = None
+        self.conversation_watermark = None
+        self.refreshed_at = 0.0
+        self.loaded_at = 0.0
+    
+    def __len__(self):
+        return len(self._totals)
+    
+    def load(self, totals: pd.DataFrame, recent: pd.DataFrame, grade_watermark):
+        """Replace the store contents with a full snapshot up to ``grade_watermark``"""
+        totals = totals.set_index('user_id')
+        self._publish(totals, recent, grade_watermark)
+        self.loaded_at = time.time()
+    
+    def apply_grades(self, grades: pd.DataFrame):
+        """Merge raw grade rows past the grade watermark"""
+        if grades.empty:
+            return
+        
+        last = grades.assign(_ts=_utc(grades['timestamp']).fillna(pd.Timestamp(0, tz='UTC')))
+        last = last.sort_values(['_ts', 'grade_id']).iloc[-1]
+        watermark = (last['_ts'], last['grade_id'])
+        
+        delta = grades.assign(attempts=1)
+        for skill in RUBRIC_SKILLS:
+            delta[f"{skill}_sum"] = delta[skill]
+            delta[f"{skill}_n"] = delta[skill].notna().astype(int)
+        delta = delta.groupby('user_id').agg(
+            **{col: (col, 'sum') for col in SUM_COLUMNS}, last_grade=('timestamp', 'max')
+        )
+        
+        totals = self._totals.copy()
+        totals = delta[SUM_COLUMNS].add(totals[SUM_COLUMNS], fill_value=0).join(
+            totals[['last_grade', 'last_conversation']], how='left'
+        )
+        totals['last_grade'] = _latest(totals['last_grade'], delta['last_grade'].reindex(totals.index))
+        
+        scored = grades.loc[grades['final_score'].notna(), ['user_id', 'timestamp', 'final_score']]
+        recent = pd.concat([self._recent, scored], ignore_index=True)
+        recent = recent.sort_values('timestamp').groupby('user_id').tail(self.window)
+        self._publish(totals, recent, watermark)
+    
+    def apply_conversations(self, latest: pd.DataFrame):
+        """Merge per-student latest conversation timestamps"""
+        if latest.empty:
+            return
+        
+        totals = self._totals.reindex(self._totals.index.union(latest['user_id']))
+        totals[SUM_COLUMNS] = totals[SUM_COLUMNS].fillna(0)
+        incoming = latest.set_index('user_id')['last_conversation'].reindex(totals.index)
+        totals['last_conversation'] = _latest(totals['last_conversation'], incoming)
+        self._publish(totals, self._recent, self.grade_watermark)
+    
+    def _publish(self, totals: pd.DataFrame, recent: pd.DataFrame, grade_watermark):
+        with self._lock:
+            self._totals = totals
+            self._recent = recent
+            self.grade_watermark = grade_watermark
+            self.conversation_watermark = _max_timestamp(totals['last_conversation'])
+    
+    def features(self, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Current feature table, one row per student with activity
+        
+        Returns:
+            DataFrame indexed by user_id with attempts, rolling_avg,
+            days_inactive, weakest_skill and weakest_score
+        """
+        with self._lock:
+            totals, recent = self._totals, self._recent
+        now = now or pd.Timestamp.now(tz='UTC')
+        
+        features = pd.DataFrame(index=totals.index)
+        features['attempts'] = totals['attempts'].fillna(0).astype(int)
+        features['rolling_avg'] = recent.groupby('user_id')['final_score'].mean().reindex(totals.index)
+        
+        last_activity = _latest(totals['last_grade'], totals['last_conversation'])
+        features['last_activity'] = last_activity
+        features['days_inactive'] = (now - last_activity).dt.total_seconds() / 86400
+        
+        rubric = pd.DataFrame({
+            label: totals[f"{skill}_sum"] / totals[f"{skill}_n"].replace(0, np.nan)
+            for skill, label in RUBRIC_SKILLS.items()
+        })
+        has_rubric = rubric.notna().any(axis=1)
+        features['weakest_skill'] = rubric[has_rubric].idxmin(axis=1).reindex(totals.index)
+        features['weakest_score'] = rubric.min(axis=1)
+        return features
+
+def _latest(a: pd.Series, b: pd.Series) -> pd.Series:
+    """Element-wise later of two timestamp columns, ignoring missing values"""
+    return pd.concat([_utc(a), _utc(b)], axis=1).max(axis=1)
+
+def _utc(values: pd.Series) -> pd.Series:
+    """Coerce a timestamp column to tz-aware UTC"""
+    return pd.to_datetime(values, utc=True)
+
+def _max_timestamp(values: pd.Series):
+    latest = _utc(values).max() if len(values) else None
+    return None if latest is None or pd.isna(latest) else latest
+
+def score_students(features: pd.DataFrame, thresholds: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Apply the at-risk rules to every student at once
+    
+    Args:
+        features: Output of RiskFeatureStore.features (students with no
+                  activity may be added with NaN features)
+        thresholds: Overrides for RISK_CONFIG keys (passing_score,
+                    min_attempts, inactive_days, dormant_days, rubric_floor, weights)
+    
+    Returns:
+        Copy of ``features`` with one boolean column per rule, risk_score
+        and a human-readable reasons column
+    """
+    cfg = {**RISK_CONFIG, **(thresholds or {})}
+    attempts = features['attempts'].fillna(0)
+    days = features['days_inactive']
+    
+    rules = {
+        'low_score': (attempts > 0) & (features['rolling_avg'] < cfg['passing_score']),
+        'low_engagement': (attempts < cfg['min_attempts']) & (days > cfg['inactive_days']),
+        'inactive': days.isna() | (days > cfg['dormant_days']),
+        'weak_rubric': features['weakest_score'] < cfg['rubric_floor']
+    }
+    
+    scored = features.copy()
+    risk_score = np.zeros(len(scored), dtype=int)
+    reasons = np.full(len(scored), '', dtype=object)
+    for name, mask in rules.items():
+        mask = mask.fillna(False).to_numpy(dtype=bool)
+        scored[name] = mask
+        risk_score += mask * int(cfg['weights'][name])
+        reasons = reasons + np.where(mask, RISK_RULES[name] + '; ', '')
+    
+    scored['risk_score'] = risk_score
+    scored['reasons'] = pd.Series(reasons, index=scored.index).str.rstrip('; ')
+    return scored
+
+def _grade_keyset(op: str, watermark) -> str:
+    """
+    Grade rows after (op '>') or up to (op '<=') a (timestamp, id) watermark
+    
+    Rows sharing the watermark timestamp are split by id, so none is
+    counted twice or skipped.
+    """
+    ts, grade_id = sql_literal(watermark[0].to_pydatetime()), sql_literal(str(watermark[1]))
+    if op == '>':
+        return f"({GRADE_TS} > {ts} OR ({GRADE_TS} = {ts} AND {GRADE_ID} > {grade_id}))"
+    return f"({GRADE_TS} < {ts} OR ({GRADE_TS} = {ts} AND {GRADE_ID} <= {grade_id}))"
+
+def _grade_watermark_query() -> str:
+    """Newest grade key, the upper bound of a full load"""
+    return f"""
+    SELECT {GRADE_TS} as timestamp, {GRADE_ID} as grade_id
+    FROM {get_table_ref('grades')}
+    WHERE user IS NOT NULL
+    ORDER BY timestamp DESC, grade_id DESC
+    LIMIT 1
+    """
+
+def _grade_totals_query(watermark) -> str:
+    """
+    Per-student grade and conversation totals in one pass over each table
+    
+    Grades are limited to the rows up to ``watermark`` (all rows if None).
+    """
+    upto = f" AND {_grade_keyset('<=', watermark)}" if watermark is not None else ""
+    rubric_cols = ",\n        ".join(
+        f"SUM(individual_scores.{s}) as {s}_sum, COUNT(individual_scores.{s}) as {s}_n"
+        for s in RUBRIC_SKILLS
+    )
+    return f"""
+    WITH g AS (
+        SELECT user as user_id, COUNT(*) as attempts,
+        {rubric_cols},
+        MAX(timestamp) as last_grade
+        FROM {get_table_ref('grades')}
+        WHERE user IS NOT NULL{upto}
+        GROUP BY user_id
+    ),
+    c AS (
+        SELECT user as user_id, MAX(timestamp) as last_conversation
+        FROM {get_table_ref('conversation')}
+        WHERE user IS NOT NULL
+        GROUP BY user_id
+    )
+    SELECT * FROM g FULL OUTER JOIN c USING (user_id)
+    """
+
+def _recent_grades_query(window: int, watermark) -> str:
+    """Last ``window`` scored grades per student, up to ``watermark``"""
+    upto = f" AND {_grade_keyset('<=', watermark)}" if watermark is not None else ""
+    return f"""
+    SELECT user as user_id, timestamp, final_score
+    FROM {get_table_ref('grades')}
+    WHERE user IS NOT NULL AND final_score IS NOT NULL{upto}
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY user ORDER BY timestamp DESC) <= {int(window)}
+    """
+
+def _new_grades_query(after) -> str:
+    """Raw grade rows after the grade watermark (every grade if None)"""
+    rubric_cols = ", ".join(f"individual_scores.{s} as {s}" for s in RUBRIC_SKILLS)
+    after = f" AND {_grade_keyset('>', after)}" if after is not None else ""
+    return f"""
+    SELECT user as user_id, timestamp, {GRADE_ID} as grade_id, final_score, {rubric_cols}
+    FROM {get_table_ref('grades')}
+    WHERE user IS NOT NULL{after}
+    """
+
+def _new_conversations_query(since) -> str:
+    """
+    Latest conversation per student from the conversation watermark on
+    
+    Merging a maximum is idempotent, so rows at the watermark timestamp are
+    fetched again rather than risk skipping another student's conversation
+    with the same timestamp. A None watermark fetches every student.
+    """
+    since = f" AND timestamp >= {sql_literal(since.to_pydatetime())}" if since is not None else ""
+    return f"""
+    SELECT user as user_id, MAX(timestamp) as last_conversation
+    FROM {get_table_ref('conversation')}
+    WHERE user IS NOT NULL{since}
+    GROUP BY user_id
+    """
+
+@st.cache_resource
+def get_risk_store() -> RiskFeatureStore:
+    """Process-wide feature store shared by all sessions"""
+    return RiskFeatureStore(RISK_CONFIG['rolling_window'])
+
+def refresh_risk_store(store: Optional[RiskFeatureStore] = None, force: bool = False) -> RiskFeatureStore:
+    """
+    Bring the shared feature store up to date
+    
+    The first call (or ``force``) loads all features; later calls, at most
+    once per RISK_CONFIG['refresh_seconds'], merge only grades and
+    conversations past the store's watermarks. Grades ingested late with
+    an older timestamp are missed by the watermark, so a full reload runs
+    again every RISK_CONFIG['reconcile_seconds'].
+    """
+    if store is None:
+        store = get_risk_store()
+    
+    age = time.time() - store.refreshed_at
+    if not force and store.refreshed_at and age < RISK_CONFIG['refresh_seconds']:
+        return store
+    
+    # Another session is already refreshing; serve the current snapshot
+    if not store.refresh_lock.acquire(blocking=False):
+        return store
+    
+    try:
+        stale = time.time() - store.loaded_at > RISK_CONFIG['reconcile_seconds']
+        _refresh(store, full=force or not store.loaded_at or stale)
+    finally:
+        store.refresh_lock.release()
+    
+    return store
+
+def _refresh(store: RiskFeatureStore, full: bool):
+    """Run one full or incremental load into ``store``"""
+    client = get_bigquery_client()
+    if client is None:
+        return
+    
+    if full:
+        # Pin the load to the newest grade key first; everything after it
+        # is picked up by the next incremental refresh
+        newest = execute_query(_grade_watermark_query(), client)
+        if newest is None:
+            return
+        watermark = None if newest.empty else (_utc(newest['timestamp']).iloc[0], newest['grade_id'].iloc[0])
+        totals = execute_query(_grade_totals_query(watermark), client)
+        recent = execute_query(_recent_grades_query(store.window, watermark), client)
+        if totals is None or recent is None:
+            return
+        store.load(totals, recent, watermark)
+    else:
+        # A None watermark means no grade is counted yet: fetch them all
+        grades = execute_query(_new_grades_query(store.grade_watermark), client)
+        if grades is not None:
+            store.apply_grades(grades)
+        latest = execute_query(_new_conversations_query(store.conversation_watermark), client)
+        if latest is not None:
+            store.apply_conversations(latest)
+    
+    store.refreshed_at = time.time()
+
+def get_at_risk_students(thresholds: Optional[dict] = None, include_all: bool = False) -> pd.DataFrame:
+    """
+    Scored student list for the Faculty dashboard
+    
+    Every student in the user index is included, so students with no grades
+    or conversations at all are reported as inactive.
+    
+    Args:
+        thresholds: Overrides for RISK_CONFIG (see score_students)
+        include_all: Also return students that triggered no rule
+    
+    Returns:
+        DataFrame sorted by risk_score (highest first), then days inactive
+    """
+    features = refresh_risk_store().features()
+    users = refresh_user_index().snapshot()
+    
+    if not users.empty:
+        features = users.set_index('user_id')[['name', 'email']].join(features, how='left')
+    else:
+        features = features.assign(name=None, email=None)
+    
+    scored = score_students(features, thresholds)
+    if not include_all:
+        scored = scored[scored['risk_score'] > 0]
+    
+    scored = scored.sort_values(['risk_score', 'days_inactive'], ascending=[False, False], na_position='first')
+    return scored.reset_index()
@@ -1,10 +1,35 @@
 """
 Authentication module for MIND Dashboard
 Handles login/logout with bcrypt password hashing
+
+bcrypt checks run in a small bounded worker pool so login bursts cannot
+take every core, failed attempts are rate limited per username and per
+client IP, and a signed expiring session token kept in a cookie lets page
+reloads restore the login without another bcrypt check. Logging out
+revokes the token on the server.
 """
 
 import streamlit as st
 import bcrypt
+import base64
+import hashlib
+import hmac
+import ipaddress
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Optional
+from core.settings import AUTH_CONFIG
+from core.dimensions import get_dimension
+
+# Query parameter that carried session tokens in earlier versions; stripped
+# from the URL so old links and bookmarks stop exposing a credential
+LEGACY_TOKEN_PARAM = 'session'
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -25,6 +50,264 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         return False
 
+class PasswordVerifier:
+    """
+    Bounded pool for bcrypt checks
+    
+    bcrypt releases the GIL while hashing, so checks run in parallel with
+    other sessions' script threads; the pool size caps how many cores login
+    traffic can use, and the semaphore caps how many checks may queue.
+    """
+    
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+    
+    def verify(self, plain_password: str, hashed_password: str, timeout: float) -> Optional[bool]:
+        """
+        Check a password in the pool
+        
+        Returns:
+            True/False for the check result, or None when the pool is
+            saturated or the check timed out
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        
+        try:
+            future = self._executor.submit(verify_password, plain_password, hashed_password)
+        except Exception:
+            self._slots.release()
+            return None
+        future.add_done_callback(lambda _: self._slots.release())
+        
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+
+class AttemptLimiter:
+    """Sliding-window count of failed logins per key (username or IP)"""
+    
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._failures = defaultdict(deque)
+    
+    def _prune(self, key: str, now: float) -> deque:
+        failures = self._failures[key]
+        while failures and now - failures[0] > self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+    
+    def blocked(self, key: str, limit: int) -> bool:
+        """True if ``key`` has reached ``limit`` failures within the window"""
+        with self._lock:
+            return len(self._prune(key, time.time())) >= limit
+    
+    def record_failure(self, key: str):
+        with self._lock:
+            self._failures[key].append(time.time())
+    
+    def reset(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
+
+class RevokedSessions:
+    """
+    Session ids revoked before their token expired (logout)
+    
+    Kept in a small SQLite file so revocations survive restarts, like the
+    tokens themselves when [auth] session_secret is configured. Entries are
+    dropped once the token they revoke has expired anyway.
+    """
+    
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS revoked (sid TEXT PRIMARY KEY, exp INTEGER NOT NULL)")
+    
+    def revoke(self, sid: str, exp: int):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO revoked (sid, exp) VALUES (?, ?)", (sid, int(exp)))
+            self._conn.execute("DELETE FROM revoked WHERE exp < ?", (int(time.time()),))
+    
+    def is_revoked(self, sid: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM revoked WHERE sid = ?", (sid,)).fetchone() is not None
+
+@st.cache_resource
+def get_password_verifier() -> PasswordVerifier:
+    """Process-wide bcrypt pool shared by all sessions"""
+    return PasswordVerifier(AUTH_CONFIG['verify_workers'], AUTH_CONFIG['verify_queue'])
+
+@st.cache_resource
+def get_attempt_limiter() -> AttemptLimiter:
+    """Process-wide failed-login limiter shared by all sessions"""
+    return AttemptLimiter(AUTH_CONFIG['attempt_window'])
+
+@st.cache_resource
+def get_revoked_sessions() -> RevokedSessions:
+    """Process-wide revocation list shared by all sessions"""
+    return RevokedSessions(AUTH_CONFIG['revocation_path'])
+
+@st.cache_resource(ttl=AUTH_CONFIG['users_cache_seconds'])
+def get_user_table() -> Optional[dict]:
+    """
+    Parsed users table from Streamlit secrets
+    
+    Returns:
+        Dict of username -> {'password_hash', 'role', 'user_id'}, or None
+        when authentication is not configured; user_id is optional
+    """
+    if 'users' not in st.secrets:
+        return None
+    return {
+        username: {'password_hash': data['password_hash'], 'role': data['role'],
+                   'user_id': data.get('user_id')}
+        for username, data in st.secrets['users'].items()
+    }
+
+def get_session_user_id() -> Optional[str]:
+    """
+    user_id of the logged-in user in the user table
+    
+    Taken from the user_id of their [users.*] secrets entry when set,
+    otherwise matched by email (usernames are emails) against the cached
+    user dimension.
+    
+    Returns:
+        user_id, or None if the login is not linked to a user row
+    """
+    username = st.session_state.get('username')
+    if not username:
+        return None
+    
+    configured = (get_user_table() or {}).get(username, {}).get('user_id')
+    if configured:
+        return str(configured)
+    
+    users = get_dimension('user')
+    matches = users.index[users['email'].str.lower() == username.strip().lower()]
+    return str(matches[0]) if len(matches) else None
+
+@st.cache_resource
+def _token_key() -> bytes:
+    """
+    HMAC key for session tokens
+    
+    Uses [auth] session_secret from secrets when set, so tokens survive
+    restarts and work across replicas; otherwise a per-process random key.
+    """
+    try:
+        configured = st.secrets.get('auth', {}).get('session_secret')
+    except Exception:
+        configured = None
+    return configured.encode('utf-8') if configured else secrets.token_bytes(32)
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def issue_session_token(username: str, role: str) -> str:
+    """Signed token carrying username, role, a random session id and expiry"""
+    payload = _b64(json.dumps({
+        'u': username, 'r': role, 'sid': secrets.token_urlsafe(16),
+        'exp': int(time.time() + AUTH_CONFIG['token_ttl'])
+    }, separators=(',', ':')).encode('utf-8'))
+    signature = _b64(hmac.new(_token_key(), payload.encode('ascii'), hashlib.sha256).digest())
+    return f"{payload}.{signature}"
+
+def _token_claims(token: str) -> Optional[dict]:
+    """Claims of a correctly signed, unexpired token"""
+    try:
+        payload, signature = token.split('.')
+        expected = _b64(hmac.new(_token_key(), payload.encode('ascii'), hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            return None
+        
+        claims = json.loads(_unb64(payload))
+        if claims['exp'] < time.time():
+            return None
+        return claims
+    
+    except Exception:
+        return None
+
+def revoke_session_token(token: str):
+    """Invalidate a token on the server before it expires"""
+    claims = _token_claims(token)
+    if claims and claims.get('sid'):
+        get_revoked_sessions().revoke(claims['sid'], claims['exp'])
+
+def verify_session_token(token: str) -> Optional[tuple]:
+    """
+    Validate a session token
+    
+    The session must not have been revoked by a logout, and the user must
+    still exist in the users table with the same role, so removing or
+    re-roling a user invalidates their tokens.
+    
+    Returns:
+        Tuple of (username, role), or None if invalid, expired or revoked
+    """
+    try:
+        claims = _token_claims(token)
+        if claims is None or not claims.get('sid'):
+            return None
+        if get_revoked_sessions().is_revoked(claims['sid']):
+            return None
+        
+        users = get_user_table() or {}
+        user = users.get(claims['u'])
+        if user is None or user['role'] != claims['r']:
+            return None
+        return claims['u'], claims['r']
+    
+    except Exception:
+        return None
+
+@st.cache_resource
+def _trusted_proxies() -> list:
+    """Networks from AUTH_CONFIG['trusted_proxies']"""
+    return [ipaddress.ip_network(net, strict=False) for net in AUTH_CONFIG['trusted_proxies']]
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in net for net in _trusted_proxies())
+
+def _client_ip() -> str:
+    """
+    Client address for rate limiting
+    
+    X-Forwarded-For is only read when the connection comes from a trusted
+    proxy, and then the right-most hop that is not itself a trusted proxy
+    is used; entries further left are client-supplied and can be forged.
+    """
+    try:
+        # Streamlit reports loopback peers as None
+        peer = st.context.ip_address or '127.0.0.1'
+        if not _is_trusted_proxy(peer):
+            return peer
+        
+        forwarded = st.context.headers.get('X-Forwarded-For')
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()] if forwarded else []
+        for hop in reversed(hops):
+            if not _is_trusted_proxy(hop):
+                return hop
+        return hops[0] if hops else peer
+    except Exception:
+        return 'unknown'
+
 def authenticate_user(username: str, password: str) -> tuple:
     """
     Authenticate user against credentials in Streamlit secrets
@@ -34,31 +317,115 @@ def authenticate_user(username: str, password: str) -> tuple:
         password: Plain text password
     
     Returns:
-        Tuple of (success: bool, role: str or None)
+        Tuple of (success, role or None). success is None when no verdict
+        was reached (not configured, rate limited, verifier busy) and the
+        reason has already been shown
     """
     try:
         # Check if secrets are configured
-        if 'users' not in st.secrets:
+        users = get_user_table()
+        if users is None:
             st.error("⚠️ Authentication not configured. Please contact administrator.")
-            return False, None
+            return None, None
         
-        users = st.secrets['users']
+        limiter = get_attempt_limiter()
+        user_key, ip_key = f"user:{username}", f"ip:{_client_ip()}"
+        if (limiter.blocked(user_key, AUTH_CONFIG['max_user_failures'])
+                or limiter.blocked(ip_key, AUTH_CONFIG['max_ip_failures'])):
+            st.error("⏳ Too many failed attempts. Please wait a few minutes and try again.")
+            return None, None
         
         # Check if user exists
-        if username not in users:
+        user_data = users.get(username)
+        if user_data is None:
+            limiter.record_failure(user_key)
+            limiter.record_failure(ip_key)
             return False, None
         
-        user_data = users[username]
-        
         # Verify password
-        if verify_password(password, user_data['password_hash']):
+        verified = get_password_verifier().verify(password, user_data['password_hash'], AUTH_CONFIG['verify_timeout'])
+        if verified is None:
+            st.warning("⏳ Many people are signing in right now. Please try again in a moment.")
+            return None, None
+        
+        if verified:
+            limiter.reset(user_key)
             return True, user_data['role']
         
+        limiter.record_failure(user_key)
+        limiter.record_failure(ip_key)
         return False, None
     
     except Exception as e:
         st.error(f"Authentication error: {str(e)}")
-        return False, None
+        return None, None
+
+def _write_session_cookie(token: str, max_age: int):
+    """
+    Set (or with max_age 0, delete) the session cookie in the browser
+    
+    Streamlit cannot send Set-Cookie headers from a script, so the cookie
+    is written by a small inline script. It is sent back on the next page
+    load and read from st.context.cookies.
+    
+    A cookie set from document.cookie cannot be HttpOnly: any script on the
+    page can read the token. To limit what a leaked token is worth, tokens
+    live only AUTH_CONFIG['token_ttl'] seconds and restore_session renews
+    them (revoking the old one) while the session is in use.
+    """
+    cookie = json.dumps(f"{AUTH_CONFIG['token_cookie']}={token}")
+    st.html(f"""<script>
+    document.cookie = {cookie} + "; Max-Age={int(max_age)}; Path=/; SameSite=Strict"
+        + (location.protocol === "https:" ? "; Secure" : "");
+    </script>""", unsafe_allow_javascript=True)
+
+def restore_session():
+    """
+    Restore or persist the login via the session cookie
+    
+    Call at the top of every page before the authentication check: a fresh
+    session (e.g. after a page reload) is logged back in from a valid,
+    unrevoked token, and a new login's token is written to the cookie.
+    A logged-in session's token is renewed once half its lifetime is up.
+    """
+    st.query_params.pop(LEGACY_TOKEN_PARAM, None)
+    
+    if st.session_state.get('clear_session_cookie'):
+        _write_session_cookie('', 0)
+        st.session_state.clear_session_cookie = False
+    
+    if st.session_state.get('authenticated'):
+        token = st.session_state.get('session_token')
+        claims = _token_claims(token) if token else None
+        if token and (claims is None or claims['exp'] - time.time() < AUTH_CONFIG['token_ttl'] / 2):
+            # Short-lived token: renewed once half its lifetime has passed
+            revoke_session_token(token)
+            token = issue_session_token(st.session_state.username, st.session_state.role)
+            st.session_state.session_token = token
+        if token and st.session_state.get('session_cookie') != token:
+            _write_session_cookie(token, AUTH_CONFIG['token_ttl'])
+            st.session_state.session_cookie = token
+        return
+    
+    # Request cookies are fixed for the lifetime of a session, so they are
+    # only looked at once (and not again after a logout)
+    if st.session_state.get('session_cookie_checked'):
+        return
+    st.session_state.session_cookie_checked = True
+    
+    token = st.context.cookies.get(AUTH_CONFIG['token_cookie'])
+    if not token:
+        return
+    
+    restored = verify_session_token(token)
+    if restored is None:
+        _write_session_cookie('', 0)
+        return
+    
+    st.session_state.authenticated = True
+    st.session_state.username, st.session_state.role = restored
+    st.session_state.session_token = token
+    st.session_state.session_cookie = token
 
 def check_authentication():
     """
@@ -82,9 +449,10 @@ def check_authentication():
                     st.session_state.authenticated = True
                     st.session_state.username = username
                     st.session_state.role = role
+                    st.session_state.session_token = issue_session_token(username, role)
                     st.success(f"✅ Login successful! Welcome, {username}")
                     st.rerun()
-                else:
+                elif success is False:
                     st.error("❌ Invalid username or password")
     
     # Help text
@@ -98,10 +466,15 @@ def check_authentication():
 
 def logout():
     """
-    Clear session state and log out user
+    Clear session state, revoke the session token and log out user
     """
+    if st.session_state.get('session_token'):
+        revoke_session_token(st.session_state.session_token)
     st.session_state.authenticated = False
     st.session_state.username = None
     st.session_state.role = None
+    st.session_state.session_token = None
+    st.session_state.session_cookie = None
+    st.session_state.clear_session_cookie = True
     st.session_state.current_page = 'Home'
     st.success("✅ Logged out successfully")
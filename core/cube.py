@@ -0,0 +1,244 @@
+"""
+In-memory grade cube for MIND Dashboard
+Grades pre-aggregated by day, case study, cohort, role and session type,
+so the global filters slice and roll up locally instead of querying BigQuery
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from datetime import date, timedelta
+from typing import Optional
+from core.db import get_bigquery_client, execute_query
+from core.settings import get_table_ref, CUBE_CONFIG
+from core.percentiles import GROUPINGS
+from core.sketches import hash_values, hll_registers, hll_estimate
+
+# Categorical dimensions (day is stored separately as days since epoch)
+DIMENSIONS = ['case_study', 'cohort', 'role', 'session_type']
+
+# render_global_filters date presets -> days back from today
+DATE_PRESETS = {'Last 7 Days': 7, 'Last 30 Days': 30, 'Last 90 Days': 90}
+
+EPOCH = date(1970, 1, 1)
+
+class GradeCube:
+    """
+    Columnar grade cube
+    
+    Each cell is one (day, case study, cohort, role, session type)
+    combination with its grade count, scored count, score sum and pass count,
+    plus a HyperLogLog sketch of the students in it. Dimensions are stored
+    as small integer codes into label arrays, so slicing is a boolean mask
+    and roll-ups are bincounts; sketches roll up with an element-wise max.
+    """
+    
+    MEASURES = ['grades', 'scored', 'score_sum', 'passed']
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._state = None
+        self.refreshed_at = 0.0
+    
+    def __len__(self):
+        return 0 if self._state is None else len(self._state['day'])
+    
+    @staticmethod
+    def _build(facts: pd.DataFrame, precision: int) -> dict:
+        """Collapse (cell, student) rows into cells with student sketches"""
+        facts = facts.copy()
+        day = pd.to_datetime(facts['day'])
+        facts['day'] = ((day - pd.Timestamp(EPOCH)).dt.days).astype(np.int32)
+        
+        labels = {}
+        for dim in DIMENSIONS:
+            codes, uniques = pd.factorize(facts[dim].fillna('Unknown').astype(str), sort=True)
+            facts[dim] = codes.astype(np.int16)
+            labels[dim] = pd.Index(uniques)
+        
+        # Group numbers follow the sorted order of the aggregated cells
+        grouped = facts.groupby(['day'] + DIMENSIONS, sort=True)
+        cell = grouped.ngroup().to_numpy()
+        cells = grouped[GradeCube.MEASURES].sum().reset_index()
+        
+        state = {
+            'labels': labels,
+            'day': cells['day'].to_numpy(np.int32),
+            'registers': hll_registers(hash_values(facts['user_id']), cell, len(cells), precision)
+        }
+        for dim in DIMENSIONS:
+            state[dim] = cells[dim].to_numpy(np.int16)
+        for measure in GradeCube.MEASURES:
+            state[measure] = cells[measure].to_numpy(np.float64)
+        return state
+    
+    def load(self, facts: pd.DataFrame, precision: int):
+        """Replace the cube with one built from ``facts``"""
+        state = self._build(facts, precision)
+        with self._lock:
+            self._state = state
+            self.refreshed_at = time.time()
+    
+    def labels(self, dimension: str) -> list:
+        """Values present for a dimension, sorted"""
+        with self._lock:
+            state = self._state
+        return [] if state is None else list(state['labels'][dimension])
+    
+    def day_range(self):
+        """First and last day in the cube, or (None, None) when empty"""
+        with self._lock:
+            state = self._state
+        if state is None or len(state['day']) == 0:
+            return None, None
+        return (EPOCH + timedelta(days=int(state['day'].min())),
+                EPOCH + timedelta(days=int(state['day'].max())))
+    
+    def query(self, start: Optional[date] = None, end: Optional[date] = None,
+              by: Optional[str] = None, **members) -> pd.DataFrame:
+        """
+        Slice the cube and roll it up
+        
+        Args:
+            start: First day to include
+            end: Last day to include
+            by: None for a single total row, 'day', or one of DIMENSIONS
+            **members: Dimension value filters, e.g. case_study='Triage' or
+                       role=['student', 'faculty']; None means all values
+        
+        Returns:
+            DataFrame with grades, avg_score, pass_rate and students
+            (estimated distinct students) per group
+        """
+        with self._lock:
+            state = self._state
+        columns = ([by] if by else []) + ['grades', 'avg_score', 'pass_rate', 'students']
+        if state is None:
+            return pd.DataFrame(columns=columns)
+        
+        mask = np.ones(len(state['day']), dtype=bool)
+        if start is not None:
+            mask &= state['day'] >= (start - EPOCH).days
+        if end is not None:
+            mask &= state['day'] <= (end - EPOCH).days
+        for dim, value in members.items():
+            if value is None:
+                continue
+            wanted = [value] if isinstance(value, str) else list(value)
+            codes = state['labels'][dim].get_indexer(wanted)
+            mask &= np.isin(state[dim], codes[codes >= 0])
+        
+        rows = np.flatnonzero(mask)
+        if by is None:
+            group, group_labels = np.zeros(len(rows), dtype=np.int64), ['All']
+        elif by == 'day':
+            days, group = np.unique(state['day'][rows], return_inverse=True)
+            group_labels = [EPOCH + timedelta(days=int(d)) for d in days]
+        else:
+            present, group = np.unique(state[by][rows], return_inverse=True)
+            group_labels = list(state['labels'][by][present])
+        
+        n_groups = len(group_labels)
+        totals = {m: np.bincount(group, weights=state[m][rows], minlength=n_groups) for m in self.MEASURES}
+        
+        registers = np.zeros((n_groups, state['registers'].shape[1]), dtype=np.uint8)
+        if len(rows):
+            # Sort cells by group and max-reduce each contiguous run (faster
+            # than np.maximum.reduceat on 2D uint8 blocks)
+            order = np.argsort(group, kind='stable')
+            sorted_registers = state['registers'][rows[order]]
+            bounds = np.r_[np.flatnonzero(np.r_[True, np.diff(group[order]) != 0]), len(rows)]
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                registers[group[order[lo]]] = sorted_registers[lo:hi].max(axis=0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = pd.DataFrame({
+                'grades': totals['grades'].astype(np.int64),
+                'avg_score': totals['score_sum'] / totals['scored'],
+                'pass_rate': totals['passed'] / totals['scored'] * 100,
+                'students': np.rint(hll_estimate(registers)).astype(np.int64) if n_groups else []
+            })
+        if by:
+            result.insert(0, by, group_labels)
+        return result[columns]
+
+def filters_to_slice(filters: dict) -> dict:
+    """
+    Translate render_global_filters output into GradeCube.query arguments
+    
+    "All ..." choices become None; date presets become a start date.
+    """
+    query = {}
+    date_range = filters.get('date_range')
+    if date_range in DATE_PRESETS:
+        query['start'] = date.today() - timedelta(days=DATE_PRESETS[date_range] - 1)
+    elif date_range == 'Custom':
+        query['start'] = filters.get('start_date')
+        query['end'] = filters.get('end_date')
+    
+    for dim in DIMENSIONS:
+        value = filters.get(dim)
+        query[dim] = None if value is None or str(value).startswith('All ') else value
+    return query
+
+def _cube_facts_query() -> str:
+    """Grades at (day, case study, cohort, role, session type, student) grain"""
+    passing = CUBE_CONFIG['passing_score']
+    return f"""
+    WITH session_type AS (
+        SELECT distinct_id, APPROX_TOP_COUNT(derived_session_type, 1)[OFFSET(0)].value as session_type
+        FROM {get_table_ref('session_analytics')}
+        WHERE derived_session_type IS NOT NULL
+        GROUP BY distinct_id
+    )
+    SELECT
+        DATE(g.timestamp) as day,
+        COALESCE(c.title, g.case_study) as case_study,
+        {GROUPINGS['cohort']} as cohort,
+        LOWER(COALESCE(u.role, 'student')) as role,
+        st.session_type as session_type,
+        g.user as user_id,
+        COUNT(*) as grades,
+        COUNT(g.final_score) as scored,
+        SUM(g.final_score) as score_sum,
+        COUNTIF(g.final_score >= {passing}) as passed
+    FROM {get_table_ref('grades')} g
+    LEFT JOIN {get_table_ref('user')} u ON g.user = u.user_id
+    LEFT JOIN {get_table_ref('casestudy')} c ON g.case_study = c.case_study_id
+    LEFT JOIN session_type st ON st.distinct_id = u.posthog_distinct_email
+    WHERE g.timestamp IS NOT NULL
+    GROUP BY day, case_study, cohort, role, session_type, user_id
+    """
+
+@st.cache_resource
+def get_grade_cube() -> GradeCube:
+    """Process-wide cube shared by all sessions"""
+    return GradeCube()
+
+def refresh_grade_cube(cube: Optional[GradeCube] = None, force: bool = False) -> GradeCube:
+    """
+    Rebuild the shared cube when it is older than CUBE_CONFIG['refresh_seconds']
+    
+    Sessions arriving during a rebuild keep reading the previous cube.
+    """
+    if cube is None:
+        cube = get_grade_cube()
+    
+    age = time.time() - cube.refreshed_at
+    if not force and cube.refreshed_at and age < CUBE_CONFIG['refresh_seconds']:
+        return cube
+    
+    if not cube.refresh_lock.acquire(blocking=False):
+        return cube
+    
+    try:
+        facts = execute_query(_cube_facts_query(), get_bigquery_client())
+        if facts is not None:
+            cube.load(facts, CUBE_CONFIG['hll_precision'])
+    finally:
+        cube.refresh_lock.release()
+    
+    return cube
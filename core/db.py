@@ -7,8 +7,13 @@ import streamlit as st
 from google.cloud import bigquery
 from google.oauth2 import service_account
 import pandas as pd
-from typing import Optional
-from core.settings import BIGQUERY_CONFIG, get_table_ref
+import numbers
+import threading
+import time
+from datetime import date, datetime
+from typing import Optional, List, Any
+from core.settings import BIGQUERY_CONFIG, TABLES, REFRESH_INTERVALS, get_table_ref
+from core.rbac import get_cache_partition
 
 @st.cache_resource
 def get_bigquery_client():
@@ -38,11 +43,79 @@ def get_bigquery_client():
         st.info("Please ensure your secrets are configured correctly in Streamlit Cloud.")
         return None
 
-@st.cache_data(ttl=300)
-def run_query(query: str, _client: Optional[bigquery.Client] = None) -> Optional[pd.DataFrame]:
+def run_query(query: str, _client: Optional[bigquery.Client] = None,
+              row_scope: Optional[str] = None) -> Optional[pd.DataFrame]:
     """
     Execute a BigQuery SQL query and return results as DataFrame
     
+    Results are cached for 5 minutes per (partition, query string), the
+    partition coming from core.rbac.get_cache_partition: 'global' unless
+    the result is limited by row-level access the SQL does not name.
+    
+    Args:
+        query: SQL query string
+        _client: BigQuery client (will be initialized if None)
+        row_scope: Row-level access the result is limited to (e.g. a
+                   user_id); None for role-independent queries
+    
+    Returns:
+        pandas DataFrame with query results, or None on error
+    """
+    partition = get_cache_partition(query, row_scope)
+    get_cache_stats().record_call(partition)
+    return _cached_query(query, partition, _client)
+
+@st.cache_data(ttl=300)
+def _cached_query(query: str, partition: str, _client: Optional[bigquery.Client] = None) -> Optional[pd.DataFrame]:
+    """Cached body of run_query; only runs on a cache miss"""
+    get_cache_stats().record_miss(partition)
+    return execute_query(query, _client)
+
+class CacheStats:
+    """Call and miss counts of run_query per scope (global, rows)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._misses = {}
+    
+    @staticmethod
+    def _scope(partition: str) -> str:
+        return partition.split(':', 1)[0]
+    
+    def record_call(self, partition: str):
+        scope = self._scope(partition)
+        with self._lock:
+            self._calls[scope] = self._calls.get(scope, 0) + 1
+    
+    def record_miss(self, partition: str):
+        scope = self._scope(partition)
+        with self._lock:
+            self._misses[scope] = self._misses.get(scope, 0) + 1
+    
+    def summary(self) -> pd.DataFrame:
+        """Calls, hits and hit rate per scope"""
+        with self._lock:
+            calls, misses = dict(self._calls), dict(self._misses)
+        rows = []
+        for scope, count in sorted(calls.items()):
+            hits = max(count - misses.get(scope, 0), 0)
+            rows.append({'scope': scope, 'calls': count, 'hits': hits,
+                         'hit_rate': round(hits / count * 100, 1) if count else 0.0})
+        return pd.DataFrame(rows, columns=['scope', 'calls', 'hits', 'hit_rate'])
+
+@st.cache_resource
+def get_cache_stats() -> CacheStats:
+    """Process-wide query cache statistics"""
+    return CacheStats()
+
+def execute_query(query: str, _client: Optional[bigquery.Client] = None) -> Optional[pd.DataFrame]:
+    """
+    Execute a BigQuery SQL query without result caching
+    
+    Used by incremental loaders whose queries change on every call (e.g. a
+    moving watermark), where caching would only hold stale results.
+    
     Args:
         query: SQL query string
         _client: BigQuery client (will be initialized if None)
@@ -57,6 +130,8 @@ def run_query(query: str, _client: Optional[bigquery.Client] = None) -> Optional
         if _client is None:
             return None
         
+        record_query(query)
+        
         # Run query
         query_job = _client.query(query)
         results = query_job.result()
@@ -163,6 +238,230 @@ def get_table_schema(table_name: str, _client: Optional[bigquery.Client] = None)
         st.warning(f"Could not fetch schema for {table_name}: {str(e)}")
         return None
 
+@st.cache_data(ttl=3600)
+def get_table_metadata(table_name: str, _client: Optional[bigquery.Client] = None) -> Optional[dict]:
+    """
+    Get size and storage layout of a table
+    
+    Args:
+        table_name: Name of the table
+        _client: BigQuery client
+    
+    Returns:
+        Dict with num_rows, num_bytes, partition_type, partition_field
+        (None for ingestion-time partitioning), range_partition_field,
+        clustering_fields and require_partition_filter, or None
+    """
+    try:
+        if _client is None:
+            _client = get_bigquery_client()
+        
+        if _client is None:
+            return None
+        
+        table_ref = f"{BIGQUERY_CONFIG['project_id']}.{BIGQUERY_CONFIG['dataset']}.{table_name}"
+        table = _client.get_table(table_ref)
+        time_partitioning = table.time_partitioning
+        range_partitioning = table.range_partitioning
+        
+        return {
+            'num_rows': table.num_rows,
+            'num_bytes': table.num_bytes,
+            'partition_type': time_partitioning.type_ if time_partitioning else None,
+            'partition_field': time_partitioning.field if time_partitioning else None,
+            'range_partition_field': range_partitioning.field if range_partitioning else None,
+            'clustering_fields': list(table.clustering_fields or []),
+            'require_partition_filter': bool(table.require_partition_filter)
+        }
+    
+    except Exception as e:
+        st.warning(f"Could not fetch metadata for {table_name}: {str(e)}")
+        return None
+
+# SQL interval units accepted by time_filter -> pandas Timedelta units
+INTERVAL_UNITS = {'MINUTE': 'min', 'HOUR': 'h', 'DAY': 'D', 'WEEK': 'W'}
+
+@st.cache_resource
+def get_query_registry() -> dict:
+    """Process-wide record of executed query texts, used by core.layout"""
+    return {'lock': threading.Lock(), 'queries': {}}
+
+def record_query(query: str, max_entries: int = 500):
+    """Remember a query text (whitespace-normalized) and how often it ran"""
+    registry = get_query_registry()
+    normalized = " ".join(query.split())
+    with registry['lock']:
+        queries = registry['queries']
+        entry = queries.get(normalized)
+        if entry is None:
+            if len(queries) >= max_entries:
+                return
+            entry = queries[normalized] = {'runs': 0, 'last_run': None}
+        entry['runs'] += 1
+        entry['last_run'] = time.time()
+
+def time_filter(table_name: str, interval: Optional[str] = None,
+                start: Optional[datetime] = None, end: Optional[datetime] = None,
+                alias: Optional[str] = None) -> str:
+    """
+    Build a partition-pruning time predicate for a table
+    
+    Bounds are compared directly against the table's time column (no
+    functions wrapped around it) as TIMESTAMP literals, so BigQuery can
+    prune partitions. Relative windows are anchored to the start of the
+    current REFRESH_INTERVALS['standard'] bucket, which keeps the SQL text
+    (and therefore run_query's cache key) stable between refreshes.
+    Ingestion-time partitioned tables also get a _PARTITIONTIME bound.
+    
+    Args:
+        table_name: Key of core.settings.TABLES with a time_column
+        interval: Relative window such as '7 DAY' or '1 HOUR'
+        start: Absolute lower bound (used when no interval is given)
+        end: Optional absolute upper bound (exclusive)
+        alias: Table alias used in the query
+    
+    Returns:
+        Predicate without the WHERE keyword
+    """
+    prefix = f"{alias}." if alias else ""
+    column = f"{prefix}{TABLES[table_name]['time_column']}"
+    
+    if interval is not None:
+        amount, unit = interval.split()
+        now = pd.Timestamp.now(tz='UTC').floor(f"{REFRESH_INTERVALS['standard']}s")
+        start = now - pd.Timedelta(int(amount), unit=INTERVAL_UNITS[unit.upper().rstrip('S')])
+    
+    conditions = []
+    if start is not None:
+        conditions.append(f"{column} >= {sql_literal(pd.Timestamp(start).to_pydatetime())}")
+    if end is not None:
+        conditions.append(f"{column} < {sql_literal(pd.Timestamp(end).to_pydatetime())}")
+    
+    metadata = get_table_metadata(table_name)
+    if start is not None and metadata and metadata['partition_type'] and metadata['partition_field'] is None:
+        # Ingestion-time partitions: rows are ingested at or after their event time
+        conditions.append(
+            f"{prefix}_PARTITIONTIME >= TIMESTAMP_TRUNC({sql_literal(pd.Timestamp(start).to_pydatetime())}, "
+            f"{metadata['partition_type']})"
+        )
+    
+    return " AND ".join(conditions) if conditions else "TRUE"
+
+def sql_literal(value: Any) -> str:
+    """
+    Render a Python value as a BigQuery SQL literal
+    
+    Strings are quoted and escaped, so values read back from query results
+    (e.g. keyset cursors) can be embedded safely.
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, numbers.Number):
+        return str(value)
+    if isinstance(value, datetime):
+        return f"TIMESTAMP '{pd.Timestamp(value).isoformat()}'"
+    if isinstance(value, date):
+        return f"DATE '{value.isoformat()}'"
+    
+    escaped = str(value).replace('\\', '\\\\').replace("'", "\\'")
+    return f"'{escaped}'"
+
+def build_keyset_query(table_name: str, columns: List[str], page_size: int,
+                       after: Any = None, where: Optional[str] = None,
+                       interval: Optional[str] = None) -> str:
+    """
+    Build one page of a keyset-paginated scan ordered by the table's primary key
+    
+    Args:
+        table_name: Key of core.settings.TABLES
+        columns: Columns to select (the primary key is always included)
+        page_size: Rows per page
+        after: Last primary key of the previous page, or None for the first page
+        where: Optional extra filter condition without the WHERE keyword
+        interval: Optional time window (e.g. '7 DAY') emitted via time_filter
+    
+    Returns:
+        SQL query string
+    """
+    pk = TABLES[table_name]['primary_key']
+    select_cols = list(dict.fromkeys([pk] + list(columns)))
+    
+    conditions = []
+    if where:
+        conditions.append(f"({where})")
+    if interval:
+        conditions.append(time_filter(table_name, interval))
+    if after is not None:
+        conditions.append(f"{pk} > {sql_literal(after)}")
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    return f"""
+    SELECT {', '.join(select_cols)}
+    FROM {get_table_ref(table_name)}
+    {where_clause}
+    ORDER BY {pk}
+    LIMIT {int(page_size)}
+    """
+
+def build_transcript_query(table_name: str, key: Any, locator: Optional[dict] = None) -> str:
+    """
+    Build a lookup of one row's transcript by primary key
+    
+    Args:
+        table_name: Key of core.settings.TABLES with a transcript column
+        key: Primary key value of the row
+        locator: Known values of the table's cluster columns for this row;
+                 matching on them lets BigQuery prune clustered blocks
+    
+    Returns:
+        SQL query string returning the transcript column
+    """
+    pk = TABLES[table_name]['primary_key']
+    conditions = [f"{pk} = {sql_literal(key)}"]
+    for column, value in (locator or {}).items():
+        if column in TABLES[table_name].get('cluster_columns', []) and value is not None and not pd.isna(value):
+            conditions.append(f"{column} = {sql_literal(value)}")
+    
+    return f"""
+    SELECT CAST(transcript AS STRING) as transcript
+    FROM {get_table_ref(table_name)}
+    WHERE {' AND '.join(conditions)}
+    LIMIT 1
+    """
+
+def build_heatmap_query(table_name: str, x_expr: str, y_expr: str, z_expr: str,
+                        agg: str = 'AVG', where: Optional[str] = None,
+                        interval: Optional[str] = None) -> str:
+    """
+    Build a query that aggregates a heatmap grid in BigQuery
+    
+    Only one row per (x, y) cell is returned, so the result size depends on
+    the grid, not on the table. Feed it to render_heatmap with x='x', y='y', z='z'.
+    
+    Args:
+        table_name: Table to aggregate
+        x_expr: SQL expression for the x axis (e.g. 'EXTRACT(HOUR FROM created_at)')
+        y_expr: SQL expression for the y axis
+        z_expr: SQL expression aggregated per cell
+        agg: SQL aggregate function (AVG, SUM, COUNT, MAX, ...)
+        where: Optional filter condition without the WHERE keyword
+        interval: Optional time window (e.g. '7 DAY') emitted via time_filter
+    
+    Returns:
+        SQL query string
+    """
+    conditions = [f"({where})" if where else None, time_filter(table_name, interval) if interval else None]
+    conditions = [c for c in conditions if c]
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+    SELECT {x_expr} as x, {y_expr} as y, {agg}({z_expr}) as z
+    FROM {get_table_ref(table_name)}
+    {where_clause}
+    GROUP BY x, y
+    """
+
 @st.cache_data(ttl=3600)
 def get_available_tables(_client: Optional[bigquery.Client] = None) -> list:
     """
@@ -0,0 +1,162 @@
+"""
+Dimension table cache for MIND Dashboard
+Keeps the small user and casestudy tables in memory, indexed by primary key,
+so pages can query fact aggregates by ID and join names and titles locally
+"""
+
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from typing import Optional, List
+from core.db import get_bigquery_client, execute_query, run_query
+from core.settings import BIGQUERY_CONFIG, TABLES, DIMENSION_CONFIG, get_table_ref
+
+class DimensionTable:
+    """
+    In-memory copy of one dimension table
+    
+    Change detection uses the table's last-modified time from BigQuery
+    metadata (a free API call), so the table is only re-read when it has
+    actually been written to.
+    """
+    
+    def __init__(self, table_name: str, columns: List[str]):
+        self.table_name = table_name
+        self.columns = columns
+        self.primary_key = TABLES[table_name]['primary_key']
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._frame = pd.DataFrame(columns=columns).set_index(self.primary_key)
+        self.modified = None
+        self.checked_at = 0.0
+    
+    def __len__(self):
+        return len(self._frame)
+    
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Current rows indexed by primary key (shared; do not mutate)"""
+        with self._lock:
+            return self._frame
+    
+    def load(self, rows: pd.DataFrame, modified):
+        """Replace the cached rows"""
+        frame = rows.drop_duplicates(self.primary_key, keep='last').set_index(self.primary_key)
+        with self._lock:
+            self._frame = frame
+            self.modified = modified
+
+@st.cache_resource
+def get_dimension_tables() -> dict:
+    """Process-wide dimension copies shared by all sessions"""
+    return {
+        name: DimensionTable(name, columns)
+        for name, columns in DIMENSION_CONFIG['columns'].items()
+    }
+
+def refresh_dimension(table_name: str, force: bool = False) -> DimensionTable:
+    """
+    Reload a dimension if its BigQuery table changed since the last load
+    
+    Metadata is checked at most once per DIMENSION_CONFIG['check_seconds'].
+    """
+    dim = get_dimension_tables()[table_name]
+    
+    age = time.time() - dim.checked_at
+    if not force and dim.checked_at and age < DIMENSION_CONFIG['check_seconds']:
+        return dim
+    
+    # Another session is already checking; serve the current copy
+    if not dim.refresh_lock.acquire(blocking=False):
+        return dim
+    
+    try:
+        client = get_bigquery_client()
+        if client is None:
+            return dim
+        
+        try:
+            table_ref = f"{BIGQUERY_CONFIG['project_id']}.{BIGQUERY_CONFIG['dataset']}.{table_name}"
+            modified = client.get_table(table_ref).modified
+        except Exception:
+            modified = None
+        
+        if force or modified is None or modified != dim.modified or not dim.checked_at:
+            rows = execute_query(f"SELECT {', '.join(dim.columns)} FROM {get_table_ref(table_name)}", client)
+            if rows is not None:
+                dim.load(rows, modified)
+        dim.checked_at = time.time()
+    finally:
+        dim.refresh_lock.release()
+    
+    return dim
+
+def get_dimension(table_name: str) -> pd.DataFrame:
+    """Up-to-date dimension rows indexed by primary key"""
+    return refresh_dimension(table_name).frame
+
+def join_dimension(facts: pd.DataFrame, table_name: str, on: str,
+                   columns: Optional[List[str]] = None, keep_all: bool = False,
+                   fill_value=0) -> pd.DataFrame:
+    """
+    Attach dimension attributes to a fact aggregate grouped by ID
+    
+    Args:
+        facts: Aggregate with one row per dimension key
+        table_name: 'user' or 'casestudy'
+        on: Column in ``facts`` holding the dimension key
+        columns: Dimension columns to attach (all cached columns by default)
+        keep_all: Keep every dimension row, like a SQL LEFT JOIN from the
+                  dimension; members without facts get ``fill_value``
+        fill_value: Fill for fact columns of members without facts
+    
+    Returns:
+        New DataFrame with ``on``, the fact columns and the dimension columns
+    """
+    dim = get_dimension(table_name)
+    if columns is not None:
+        dim = dim[columns]
+    
+    if not keep_all:
+        return facts.join(dim, on=on)
+    
+    fact_cols = [c for c in facts.columns if c != on]
+    joined = dim.join(facts.set_index(on), how='left')
+    joined[fact_cols] = joined[fact_cols].fillna(fill_value)
+    # Restore integer counts that the outer join widened to float
+    for col in fact_cols:
+        if pd.api.types.is_integer_dtype(facts[col]):
+            joined[col] = joined[col].astype(facts[col].dtype)
+    return joined.rename_axis(on).reset_index()
+
+def get_case_activity(_client=None) -> Optional[pd.DataFrame]:
+    """
+    Per-case activity shared by the Faculty and Admin pages
+    
+    Two fact aggregates keyed by case_study_id (both cached by run_query
+    and shared across pages), joined to case study titles locally.
+    
+    Returns:
+        DataFrame with case_study_id, title, students, grades, avg_score
+        and sessions for every case study
+    """
+    grades = run_query(f"""
+    SELECT case_study as case_study_id, COUNT(DISTINCT user) as students,
+           COUNT(_id) as grades, AVG(final_score) as avg_score
+    FROM {get_table_ref('grades')}
+    GROUP BY case_study_id
+    """, _client)
+    sessions = run_query(f"""
+    SELECT case_study_id, COUNT(_id) as sessions
+    FROM {get_table_ref('sessions')}
+    GROUP BY case_study_id
+    """, _client)
+    if grades is None or sessions is None:
+        return None
+    
+    facts = grades.merge(sessions, on='case_study_id', how='outer')
+    activity = join_dimension(facts, 'casestudy', on='case_study_id', columns=['title'], keep_all=True)
+    # AVG over no grades is NULL in SQL; keep it missing rather than 0
+    activity['avg_score'] = activity['case_study_id'].map(grades.set_index('case_study_id')['avg_score'])
+    return activity
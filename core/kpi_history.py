@@ -0,0 +1,138 @@
+"""
+KPI snapshot store for MIND Dashboard
+Every tracked KPI value is written to a small local SQLite time series, so
+deltas against an earlier period and sparklines come from local history
+instead of extra "previous period" BigQuery queries
+"""
+
+import sqlite3
+import threading
+import time
+import numpy as np
+import streamlit as st
+from pathlib import Path
+from typing import Optional
+from core.settings import KPI_HISTORY_CONFIG
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kpi_snapshots (
+    kpi TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (kpi, scope, recorded_at)
+) WITHOUT ROWID
+"""
+
+class KpiHistory:
+    """
+    SQLite-backed KPI time series
+    
+    One connection is shared by all sessions behind a lock. Writes are
+    throttled per (kpi, scope) to one per KPI_HISTORY_CONFIG['min_interval_seconds'],
+    which matches how often the underlying cached queries can change.
+    """
+    
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._last_write = {}
+    
+    def record(self, kpi: str, value: float, scope: str = 'global', at: Optional[float] = None) -> bool:
+        """
+        Store a KPI value unless one was stored for it recently
+        
+        Returns:
+            True if a snapshot was written
+        """
+        at = time.time() if at is None else at
+        key = (kpi, scope)
+        with self._lock:
+            if at - self._last_write.get(key, 0.0) < KPI_HISTORY_CONFIG['min_interval_seconds']:
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kpi_snapshots (kpi, scope, recorded_at, value) VALUES (?, ?, ?, ?)",
+                (kpi, scope, at, float(value))
+            )
+            self._last_write[key] = at
+        return True
+    
+    def value_at(self, kpi: str, at: float, scope: str = 'global') -> Optional[float]:
+        """Latest value recorded at or before ``at``"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kpi_snapshots WHERE kpi = ? AND scope = ? AND recorded_at <= ? "
+                "ORDER BY recorded_at DESC LIMIT 1",
+                (kpi, scope, at)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def series(self, kpi: str, since: float, scope: str = 'global', points: Optional[int] = None) -> list:
+        """
+        Values recorded since ``since``, oldest first
+        
+        Args:
+            points: Keep at most this many values, evenly spaced (always
+                    including the newest)
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value FROM kpi_snapshots WHERE kpi = ? AND scope = ? AND recorded_at >= ? "
+                "ORDER BY recorded_at",
+                (kpi, scope, since)
+            ).fetchall()
+        values = [row[0] for row in rows]
+        if points and len(values) > points:
+            keep = np.linspace(0, len(values) - 1, points).round().astype(int)
+            values = [values[i] for i in keep]
+        return values
+    
+    def prune(self, before: float) -> int:
+        """Delete snapshots older than ``before``; returns rows removed"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM kpi_snapshots WHERE recorded_at < ?", (before,)).rowcount
+
+@st.cache_resource
+def get_kpi_history() -> KpiHistory:
+    """Process-wide KPI store shared by all sessions"""
+    history = KpiHistory(KPI_HISTORY_CONFIG['path'])
+    history.prune(time.time() - KPI_HISTORY_CONFIG['retention_days'] * 86400)
+    return history
+
+def track_kpi(kpi: str, value: Optional[float], scope: str = 'global',
+              period: Optional[float] = None) -> dict:
+    """
+    Record a freshly computed KPI and look up its trend
+    
+    Args:
+        kpi: Stable KPI identifier, e.g. 'faculty.pass_rate'
+        value: Current value (None or NaN is not recorded)
+        scope: Data scope the value was computed in, so values computed
+               over different rows never mix
+        period: Compare against the value this many seconds ago
+                (KPI_HISTORY_CONFIG['compare_seconds'] by default)
+    
+    Returns:
+        Dict with previous (value one period ago, or None when history is
+        shorter than that), delta and series (sparkline values)
+    """
+    history = get_kpi_history()
+    now = time.time()
+    period = KPI_HISTORY_CONFIG['compare_seconds'] if period is None else period
+    
+    if value is not None and np.isnan(value):
+        value = None
+    if value is not None:
+        history.record(kpi, value, scope, now)
+    
+    previous = history.value_at(kpi, now - period, scope)
+    series = history.series(kpi, now - KPI_HISTORY_CONFIG['sparkline_days'] * 86400, scope,
+                            points=KPI_HISTORY_CONFIG['sparkline_points'])
+    return {
+        'previous': previous,
+        'delta': value - previous if previous is not None and value is not None else None,
+        'series': series
+    }
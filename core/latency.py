@@ -0,0 +1,218 @@
+"""
+Latency quantile sketches for MIND Dashboard
+Response times from backend_telemetry bucketed per hour and endpoint group
+into mergeable DDSketch histograms, so p50/p95/p99 for any window are
+answered by adding bucket counts instead of rescanning telemetry rows
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from datetime import datetime
+from typing import Optional, List
+from core.db import get_bigquery_client, execute_query, sql_literal
+from core.settings import get_table_ref, LATENCY_CONFIG
+from core.sketches import dd_gamma, dd_key_count, dd_quantiles
+
+HOUR = pd.Timedelta(hours=1)
+
+def _hour_number(ts) -> int:
+    """Hours since epoch of a timestamp (naive values are taken as UTC)"""
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    return int(ts.value // HOUR.value)
+
+def _quantile_column(q: float) -> str:
+    return f"p{q * 100:g}"
+
+class LatencySketches:
+    """
+    Sparse store of (hour, endpoint, bucket key, count) entries
+    
+    Each (hour, endpoint) cell is a DDSketch histogram kept as its nonzero
+    buckets only. Closed hours never change; a refresh replaces the last
+    (possibly partial) hour and appends newer ones.
+    """
+    
+    def __init__(self, relative_accuracy: float, min_ms: float, max_ms: float):
+        self.relative_accuracy = relative_accuracy
+        self.min_ms = min_ms
+        self.n_keys = dd_key_count(relative_accuracy, min_ms, max_ms)
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._state = {
+            'labels': pd.Index([], dtype=object),
+            'hour': np.zeros(0, dtype=np.int64),
+            'endpoint': np.zeros(0, dtype=np.int32),
+            'key': np.zeros(0, dtype=np.int32),
+            'count': np.zeros(0, dtype=np.int64)
+        }
+        self.refreshed_at = 0.0
+    
+    def __len__(self):
+        return len(self._state['count'])
+    
+    @property
+    def last_hour(self) -> Optional[int]:
+        """Newest hour held, as hours since epoch"""
+        with self._lock:
+            hours = self._state['hour']
+        return int(hours.max()) if len(hours) else None
+    
+    def endpoints(self) -> list:
+        """Endpoint groups present, sorted"""
+        with self._lock:
+            labels = self._state['labels']
+        return sorted(labels)
+    
+    def load(self, rows: pd.DataFrame, since_hour: int, keep_from_hour: int):
+        """
+        Replace hours >= since_hour with ``rows`` and drop hours before keep_from_hour
+        
+        Args:
+            rows: hour, endpoint, key and n columns from _sketch_query
+        """
+        with self._lock:
+            state = self._state
+        
+        labels = state['labels']
+        endpoints = rows['endpoint'].astype(str).to_numpy(object)
+        new_labels = pd.Index(pd.unique(endpoints)).difference(labels)
+        labels = labels.append(new_labels) if len(new_labels) else labels
+        
+        keep = (state['hour'] < since_hour) & (state['hour'] >= keep_from_hour)
+        hours = pd.to_datetime(rows['hour'], utc=True).to_numpy('datetime64[h]').astype(np.int64)
+        state = {
+            'labels': labels,
+            'hour': np.concatenate([state['hour'][keep], hours]),
+            'endpoint': np.concatenate([state['endpoint'][keep], labels.get_indexer(endpoints).astype(np.int32)]),
+            'key': np.concatenate([state['key'][keep], rows['key'].to_numpy(np.int32)]),
+            'count': np.concatenate([state['count'][keep], rows['n'].to_numpy(np.int64)])
+        }
+        with self._lock:
+            self._state = state
+            self.refreshed_at = time.time()
+    
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              by: Optional[List[str]] = None, endpoints: Optional[List[str]] = None,
+              quantiles: Optional[List[float]] = None) -> pd.DataFrame:
+        """
+        Merge the sketches of a window and estimate quantiles
+        
+        Windows are resolved to whole hours: every hour overlapping
+        [start, end) is included.
+        
+        Args:
+            start: Window start (None for everything held)
+            end: Window end, exclusive (None for now)
+            by: Grouping columns, any of 'hour' and 'endpoint'; None for a
+                single row over the whole window
+            endpoints: Restrict to these endpoint groups
+            quantiles: Quantiles to estimate (LATENCY_CONFIG['quantiles'] by default)
+        
+        Returns:
+            DataFrame with the ``by`` columns, requests and one pXX column per quantile
+        """
+        by = list(by or [])
+        quantiles = quantiles or LATENCY_CONFIG['quantiles']
+        q_columns = [_quantile_column(q) for q in quantiles]
+        with self._lock:
+            state = self._state
+        
+        mask = np.ones(len(state['count']), dtype=bool)
+        if start is not None:
+            mask &= state['hour'] >= _hour_number(start)
+        if end is not None:
+            mask &= state['hour'] <= _hour_number(pd.Timestamp(end) - pd.Timedelta(microseconds=1))
+        if endpoints is not None:
+            codes = state['labels'].get_indexer(list(endpoints))
+            mask &= np.isin(state['endpoint'], codes[codes >= 0])
+        rows = np.flatnonzero(mask)
+        
+        if not by:
+            group, n_groups = np.zeros(len(rows), dtype=np.int64), 1
+            groups = pd.DataFrame(index=[0])
+        else:
+            keys = pd.DataFrame({col: state[col][rows] for col in by})
+            grouped = keys.groupby(by, sort=True)
+            group = grouped.ngroup().to_numpy()
+            groups = grouped.size().reset_index()[by]
+            n_groups = len(groups)
+        
+        counts = np.bincount(group * self.n_keys + state['key'][rows], weights=state['count'][rows],
+                             minlength=n_groups * self.n_keys).reshape(n_groups, self.n_keys)
+        estimates = dd_quantiles(counts, quantiles, self.relative_accuracy, self.min_ms)
+        
+        result = groups.reset_index(drop=True)
+        if 'hour' in by:
+            result['hour'] = pd.to_datetime(result['hour'] * HOUR.value, utc=True)
+        if 'endpoint' in by:
+            result['endpoint'] = state['labels'][result['endpoint'].to_numpy()]
+        result['requests'] = counts.sum(axis=1).astype(np.int64)
+        for i, col in enumerate(q_columns):
+            result[col] = estimates[:, i]
+        return result[by + ['requests'] + q_columns]
+
+def _sketch_query(since: datetime, n_keys: int) -> str:
+    """Per hour, endpoint and bucket request counts since ``since``"""
+    accuracy, min_ms = LATENCY_CONFIG['relative_accuracy'], LATENCY_CONFIG['min_ms']
+    # Same bucketing as core.sketches.dd_keys, done in BigQuery so only
+    # nonzero buckets come back
+    key = (f"CAST(CEIL(LN(GREATEST(derived_response_time_ms, {min_ms}) / {min_ms}) "
+           f"/ LN({dd_gamma(accuracy)!r})) AS INT64)")
+    return f"""
+    SELECT
+        TIMESTAMP_TRUNC(created_at, HOUR) as hour,
+        COALESCE(derived_endpoint_group, 'unknown') as endpoint,
+        LEAST({key}, {n_keys - 1}) as key,
+        COUNT(*) as n
+    FROM {get_table_ref('backend_telemetry')}
+    WHERE created_at >= {sql_literal(pd.Timestamp(since).to_pydatetime())}
+      AND derived_response_time_ms IS NOT NULL
+    GROUP BY hour, endpoint, key
+    """
+
+@st.cache_resource
+def get_latency_sketches() -> LatencySketches:
+    """Process-wide sketch store shared by all sessions"""
+    return LatencySketches(LATENCY_CONFIG['relative_accuracy'], LATENCY_CONFIG['min_ms'], LATENCY_CONFIG['max_ms'])
+
+def refresh_latency_sketches(store: Optional[LatencySketches] = None, force: bool = False) -> LatencySketches:
+    """
+    Bring the shared sketches up to date
+    
+    The first call sketches LATENCY_CONFIG['retention_days'] of telemetry;
+    later calls (at most once per LATENCY_CONFIG['refresh_seconds']) only
+    re-sketch the newest held hour and anything after it.
+    """
+    if store is None:
+        store = get_latency_sketches()
+    
+    age = time.time() - store.refreshed_at
+    if not force and store.refreshed_at and age < LATENCY_CONFIG['refresh_seconds']:
+        return store
+    
+    # Another session is already refreshing; serve the current sketches
+    if not store.refresh_lock.acquire(blocking=False):
+        return store
+    
+    try:
+        client = get_bigquery_client()
+        if client is None:
+            return store
+        
+        now = pd.Timestamp.now(tz='UTC')
+        keep_from = now.floor('h') - pd.Timedelta(days=LATENCY_CONFIG['retention_days'])
+        last_hour = store.last_hour
+        since = keep_from if last_hour is None else pd.Timestamp(last_hour * HOUR.value, tz='UTC')
+        since = max(since, keep_from)
+        
+        rows = execute_query(_sketch_query(since, store.n_keys), client)
+        if rows is not None:
+            store.load(rows, _hour_number(since), _hour_number(keep_from))
+    finally:
+        store.refresh_lock.release()
+    
+    return store
@@ -0,0 +1,247 @@
+"""
+Table layout advisor for MIND Dashboard
+Reports partitioning/clustering per table, checks executed dashboard queries
+for partition-filter coverage, generates DDL for optimized table copies and
+checks that the keys the query builders use exist in FIELD_MAPPINGS
+
+Run `python -m core.layout` for a console report.
+"""
+
+import re
+import pandas as pd
+from typing import Optional, List
+from core.db import (
+    get_bigquery_client, get_table_metadata, get_table_schema, get_query_registry,
+    build_keyset_query, build_transcript_query
+)
+from core.settings import BIGQUERY_CONFIG, TABLES, FIELD_MAPPINGS, LAYOUT_CONFIG, TRANSCRIPT_CONFIG
+
+# `project.dataset.table` [AS] alias
+TABLE_REF_PATTERN = re.compile(r"`[\w-]+\.[\w-]+\.(\w+)`(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+# Words that can follow a table reference but are not aliases
+SQL_KEYWORDS = {
+    'where', 'group', 'order', 'limit', 'left', 'right', 'inner', 'outer', 'full',
+    'cross', 'join', 'on', 'using', 'union', 'qualify', 'having', 'window', 'as'
+}
+
+TIME_TYPES = {'TIMESTAMP', 'DATETIME', 'DATE'}
+
+def _partition_column(table_name: str, metadata: Optional[dict]) -> Optional[str]:
+    """Column queries must filter on to prune: actual partition field, else the recommended one"""
+    if metadata and metadata['partition_type']:
+        return metadata['partition_field'] or '_PARTITIONTIME'
+    if metadata and metadata['range_partition_field']:
+        return metadata['range_partition_field']
+    return TABLES[table_name].get('time_column')
+
+def describe_layout(metadata: Optional[dict]) -> str:
+    """Human-readable partitioning summary"""
+    if not metadata:
+        return "unknown"
+    if metadata['partition_type']:
+        field = metadata['partition_field'] or "ingestion time"
+        return f"{metadata['partition_type']} on {field}"
+    if metadata['range_partition_field']:
+        return f"RANGE on {metadata['range_partition_field']}"
+    return "none"
+
+def recommend(table_name: str, metadata: Optional[dict]) -> str:
+    """Layout recommendation for one table"""
+    spec = TABLES[table_name]
+    if not spec.get('time_column'):
+        return "No time column; leave as is"
+    if not metadata:
+        return "Metadata unavailable"
+    
+    partitioned = bool(metadata['partition_type'] or metadata['range_partition_field'])
+    wanted_clusters = spec.get('cluster_columns', [])
+    clustered_ok = metadata['clustering_fields'][:len(wanted_clusters)] == wanted_clusters
+    
+    if (metadata['num_bytes'] or 0) < LAYOUT_CONFIG['min_partition_bytes']:
+        if metadata['clustering_fields']:
+            return "OK (small table, clustered)"
+        return f"Small table: cluster by {', '.join([spec['time_column']] + wanted_clusters)}"
+    if not partitioned:
+        return f"Partition by {spec['time_column']}" + (f", cluster by {', '.join(wanted_clusters)}" if wanted_clusters else "")
+    if wanted_clusters and not clustered_ok:
+        return f"Cluster by {', '.join(wanted_clusters)}"
+    return "OK"
+
+def table_report(_client=None) -> pd.DataFrame:
+    """
+    Partitioning and clustering of every table in core.settings.TABLES
+    
+    Returns:
+        DataFrame with table, rows, size_gb, partitioning, clustering,
+        require_filter and recommendation
+    """
+    rows = []
+    for table_name in TABLES:
+        metadata = get_table_metadata(table_name, _client)
+        rows.append({
+            'table': table_name,
+            'rows': metadata['num_rows'] if metadata else None,
+            'size_gb': round((metadata['num_bytes'] or 0) / 1024 ** 3, 3) if metadata else None,
+            'partitioning': describe_layout(metadata),
+            'clustering': ", ".join(metadata['clustering_fields']) if metadata else "",
+            'require_filter': metadata['require_partition_filter'] if metadata else None,
+            'recommendation': recommend(table_name, metadata)
+        })
+    return pd.DataFrame(rows)
+
+def check_query(query: str, _client=None) -> List[dict]:
+    """
+    Check whether a query's time predicates can prune partitions
+    
+    Heuristic text check per referenced table: a comparison against the bare
+    (optionally alias-qualified) partition column counts as prunable; the
+    column wrapped in a function (e.g. DATE(created_at) >= ...) may not
+    prune; no predicate at all scans every partition.
+    
+    Returns:
+        One dict per table reference with table, column, partitioned and
+        status ('prunable', 'wrapped', 'missing')
+    """
+    findings = []
+    for match in TABLE_REF_PATTERN.finditer(query):
+        table_name, alias = match.group(1), match.group(2)
+        if table_name not in TABLES:
+            continue
+        if alias and alias.lower() in SQL_KEYWORDS:
+            alias = None
+        
+        metadata = get_table_metadata(table_name, _client)
+        column = _partition_column(table_name, metadata)
+        if column is None:
+            continue
+        
+        qualifier = rf"(?:\b{re.escape(alias)}\.|(?<![\w.]))" if alias else r"(?:\b\w+\.|(?<![\w.]))"
+        col = rf"{qualifier}{re.escape(column)}\b"
+        compare = r"\s*(?:>=|<=|>|<|=|BETWEEN\b|IN\b)"
+        
+        if re.search(col + compare, query, re.IGNORECASE):
+            status = 'prunable'
+        elif re.search(r"\w+\(\s*" + col, query, re.IGNORECASE):
+            status = 'wrapped'
+        else:
+            status = 'missing'
+        
+        findings.append({
+            'table': table_name,
+            'column': column,
+            'partitioned': bool(metadata and (metadata['partition_type'] or metadata['range_partition_field'])),
+            'status': status
+        })
+    return findings
+
+def query_coverage(_client=None) -> pd.DataFrame:
+    """
+    Partition-filter coverage of every query executed by this process
+    
+    Returns:
+        DataFrame with query, runs, table, column, partitioned and status,
+        unprunable queries on partitioned tables first
+    """
+    registry = get_query_registry()
+    with registry['lock']:
+        queries = dict(registry['queries'])
+    
+    rows = []
+    for query, entry in queries.items():
+        for finding in check_query(query, _client):
+            rows.append({'query': query, 'runs': entry['runs'], **finding})
+    
+    coverage = pd.DataFrame(rows, columns=['query', 'runs', 'table', 'column', 'partitioned', 'status'])
+    if coverage.empty:
+        return coverage
+    
+    severity = coverage['status'].map({'missing': 0, 'wrapped': 1, 'prunable': 2})
+    order = pd.DataFrame({'partitioned': ~coverage['partitioned'], 'severity': severity, 'runs': -coverage['runs']})
+    return coverage.loc[order.sort_values(['partitioned', 'severity', 'runs']).index].reset_index(drop=True)
+
+def recommended_ddl(table_name: str, _client=None) -> Optional[str]:
+    """
+    CREATE TABLE ... AS SELECT for a partitioned and clustered copy
+    
+    Returns None when the table has no usable time column.
+    """
+    spec = TABLES[table_name]
+    time_column = spec.get('time_column')
+    schema = get_table_schema(table_name, _client)
+    if not time_column or not schema:
+        return None
+    
+    types = {field['name']: field['type'] for field in schema}
+    column_type = types.get(time_column)
+    if column_type not in TIME_TYPES:
+        return None
+    
+    granularity = LAYOUT_CONFIG['partition_granularity']
+    if column_type == 'DATE':
+        partition = time_column if granularity == 'DAY' else f"DATE_TRUNC({time_column}, {granularity})"
+    else:
+        partition = f"{column_type}_TRUNC({time_column}, {granularity})"
+    
+    clusters = [c for c in spec.get('cluster_columns', []) if c in types][:4]
+    dataset = f"{BIGQUERY_CONFIG['project_id']}.{BIGQUERY_CONFIG['dataset']}"
+    
+    lines = [
+        f"CREATE TABLE `{dataset}.{table_name}{LAYOUT_CONFIG['copy_suffix']}`",
+        f"PARTITION BY {partition}"
+    ]
+    if clusters:
+        lines.append(f"CLUSTER BY {', '.join(clusters)}")
+    lines.append(f"AS SELECT * FROM `{dataset}.{table_name}`;")
+    return "\n".join(lines)
+
+def _query_columns(query: str) -> set:
+    """Lower-case identifiers in a generated query: its columns, since keywords are upper case"""
+    query = re.sub(r"`[^`]*`|'(?:[^'\\]|\\.)*'", ' ', query)
+    return set(re.findall(r'\b[a-z_][a-z0-9_]*\b', query)) - {'as'}
+
+def check_key_columns() -> List[str]:
+    """
+    Columns the query builders would use that the schema does not have
+    
+    Every mapped table's primary key must be in FIELD_MAPPINGS, and the
+    transcript browser's list and lookup queries are built and checked
+    column by column. Needs no BigQuery client.
+    
+    Returns:
+        One message per missing column; empty if all are present
+    """
+    problems = []
+    for table_name, fields in FIELD_MAPPINGS.items():
+        pk = TABLES[table_name]['primary_key']
+        if pk not in fields:
+            problems.append(f"{table_name}: primary key {pk} is not in FIELD_MAPPINGS")
+    
+    for table_name, columns in TRANSCRIPT_CONFIG['list_columns'].items():
+        locator = {column: 'x' for column in TABLES[table_name].get('cluster_columns', [])}
+        queries = [build_keyset_query(table_name, columns, 2, after='x'),
+                   build_transcript_query(table_name, 'x', locator)]
+        for column in sorted(set().union(*map(_query_columns, queries)) - set(FIELD_MAPPINGS[table_name])):
+            problems.append(f"{table_name}: transcript browser queries use unknown column {column}")
+    return problems
+
+def main():
+    """Print key column problems, the layout report and recommended DDL"""
+    for problem in check_key_columns():
+        print(f"Schema mismatch: {problem}")
+    
+    client = get_bigquery_client()
+    if client is None:
+        print("BigQuery client unavailable; check .streamlit/secrets.toml")
+        return
+    
+    with pd.option_context('display.max_columns', None, 'display.width', 160):
+        print(table_report(client).to_string(index=False))
+    
+    for table_name in TABLES:
+        ddl = recommended_ddl(table_name, client)
+        if ddl:
+            print(f"\n-- {table_name}\n{ddl}")
+
+if __name__ == "__main__":
+    main()
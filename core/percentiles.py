@@ -0,0 +1,164 @@
+"""
+Percentile rank engine for MIND Dashboard
+Sorts score arrays once and answers whole batches of rank lookups with
+np.searchsorted, optionally within groups (case study, department, cohort)
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from typing import Optional
+from core.db import get_bigquery_client, run_query
+from core.dimensions import join_dimension
+from core.settings import get_table_ref
+
+# Grouping dimensions as SQL over grades g / user u (also used by core.cube)
+GROUPINGS = {
+    'case_study': "g.case_study",
+    'department': "COALESCE(u.department, 'No Department')",
+    # Intake cohort derived from registration date, e.g. 2024-A (Jan-Jun) / 2024-B
+    'cohort': "CONCAT(CAST(EXTRACT(YEAR FROM u.date_added) AS STRING), "
+              "IF(EXTRACT(MONTH FROM u.date_added) <= 6, '-A', '-B'))"
+}
+
+def _cohort(date_added: pd.Series) -> pd.Series:
+    """Same cohort labels as GROUPINGS['cohort'], computed locally"""
+    dates = pd.to_datetime(date_added, utc=True, errors='coerce')
+    labels = dates.dt.year.astype('Int64').astype(str) + np.where(dates.dt.month <= 6, '-A', '-B')
+    return labels.where(dates.notna(), None)
+
+# User-attribute groupings, resolved from the cached user dimension
+LOCAL_GROUPINGS = {
+    'department': lambda users: users['department'].fillna('No Department'),
+    'cohort': lambda users: _cohort(users['date_added'])
+}
+
+class PercentileRanker:
+    """
+    Sorted score arrays for batch percentile ranks
+    
+    A value's percentile is the share of scores strictly below it (the same
+    definition as components.ui.calculate_percentile). Grouped rankers sort
+    by (group, score) once, so a batch of lookups across all groups is a
+    single searchsorted and ranking n students costs O(n log n) overall.
+    """
+    
+    def __init__(self, scores, groups=None):
+        scores = np.asarray(scores, dtype=float)
+        valid = np.isfinite(scores)
+        
+        if groups is None:
+            self.group_labels = None
+            self._sorted = np.sort(scores[valid])
+            return
+        
+        codes, labels = pd.factorize(pd.Series(groups)[valid].to_numpy(), use_na_sentinel=False)
+        order = np.lexsort((scores[valid], codes))
+        self.group_labels = pd.Index(labels)
+        self._sorted = scores[valid][order]
+        sorted_codes = codes[order]
+        group_ids = np.arange(len(labels))
+        self._starts = np.searchsorted(sorted_codes, group_ids, side='left')
+        self._ends = np.searchsorted(sorted_codes, group_ids, side='right')
+        
+        # Shift each group into its own non-overlapping band so one global
+        # searchsorted answers lookups for every group at once
+        self._min = self._sorted.min() if len(self._sorted) else 0.0
+        self._span = (self._sorted.max() - self._min + 1.0) if len(self._sorted) else 1.0
+        self._banded = sorted_codes * self._span + (self._sorted - self._min)
+    
+    def __len__(self):
+        return len(self._sorted)
+    
+    def rank(self, values, groups=None) -> np.ndarray:
+        """
+        Percentile (0-100) of each value within its group
+        
+        Args:
+            values: Scores to rank
+            groups: Group label per value (required for grouped rankers);
+                    unknown groups get NaN
+        
+        Returns:
+            Float array of percentiles
+        """
+        values = np.asarray(values, dtype=float)
+        
+        if self.group_labels is None:
+            if len(self._sorted) == 0:
+                return np.full(len(values), np.nan)
+            below = np.searchsorted(self._sorted, values, side='left')
+            return below / len(self._sorted) * 100
+        
+        codes = self.group_labels.get_indexer(pd.Series(groups).to_numpy())
+        known = codes >= 0
+        result = np.full(len(values), np.nan)
+        if not known.any():
+            return result
+        
+        group_codes = codes[known]
+        starts = self._starts[group_codes]
+        ends = self._ends[group_codes]
+        offsets = np.clip(values[known] - self._min, 0.0, self._span - 0.5)
+        below = np.searchsorted(self._banded, group_codes * self._span + offsets, side='left') - starts
+        
+        result[known] = below / (ends - starts) * 100
+        return result
+
+def _student_scores_query(group_by: Optional[str]) -> str:
+    """Average final score per student (and per case study when grouping by it)"""
+    group_expr = GROUPINGS['case_study'] if group_by == 'case_study' else "'All'"
+    return f"""
+    SELECT g.user as user_id, {group_expr} as grp, AVG(g.final_score) as score
+    FROM {get_table_ref('grades')} g
+    WHERE g.final_score IS NOT NULL
+    GROUP BY user_id, grp
+    """
+
+def _student_scores(group_by: Optional[str]) -> Optional[pd.DataFrame]:
+    """
+    Student averages with their group label
+    
+    Department and cohort come from the cached user dimension
+    (core.dimensions) instead of a user join in BigQuery, so the scores
+    query stays the same for every user grouping.
+    """
+    scores = run_query(_student_scores_query(group_by), get_bigquery_client())
+    if scores is None or group_by not in LOCAL_GROUPINGS:
+        return scores
+    
+    users = join_dimension(scores[['user_id']], 'user', on='user_id', columns=['department', 'date_added'])
+    return scores.assign(grp=LOCAL_GROUPINGS[group_by](users))
+
+@st.cache_resource(ttl=300)
+def get_score_ranker(group_by: Optional[str] = None) -> Optional[PercentileRanker]:
+    """
+    Ranker over student average scores, cached with the same TTL as run_query
+    
+    Args:
+        group_by: None for institution-wide ranks, or a key of GROUPINGS
+    """
+    scores = _student_scores(group_by)
+    if scores is None:
+        return None
+    return PercentileRanker(scores['score'], scores['grp'] if group_by else None)
+
+@st.cache_data(ttl=300)
+def get_student_standings(group_by: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Percentile standing of every student
+    
+    Args:
+        group_by: None for institution-wide ranks, or a key of GROUPINGS
+    
+    Returns:
+        DataFrame with user_id, grp, score and percentile, best first per group
+    """
+    scores = _student_scores(group_by)
+    ranker = get_score_ranker(group_by)
+    if scores is None or ranker is None:
+        return None
+    
+    scores = scores.copy()
+    scores['percentile'] = ranker.rank(scores['score'], scores['grp'] if group_by else None)
+    return scores.sort_values(['grp', 'percentile'], ascending=[True, False], ignore_index=True)
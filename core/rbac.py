@@ -3,6 +3,8 @@ Role-Based Access Control (RBAC) module
 Defines which pages each role can access
 """
 
+from typing import Optional
+
 # Role definitions and permissions
 ROLE_PERMISSIONS = {
     'Student': ['Home', 'Student'],
@@ -54,3 +56,28 @@ def get_role_description(role: str) -> str:
         'Admin': 'Full access to all dashboards and administrative functions'
     }
     return descriptions.get(role, 'Limited access')
+
+def get_cache_partition(query: str, row_scope: Optional[str] = None) -> str:
+    """
+    Get the cache partition of one query's result, derived from the query
+    
+    A result depends only on its SQL text, so role-independent queries
+    share one 'global' entry whichever page or role runs them. Only a
+    result narrowed by row-level access that the SQL does not spell out
+    needs its own partition; when the SQL already names the scope (e.g.
+    WHERE user = '<id>'), the text itself keeps the entries apart.
+    
+    Args:
+        query: SQL query string
+        row_scope: Row-level access the result is limited to (e.g. a
+                   user_id), or None for role-independent queries
+    
+    Returns:
+        'global' or 'rows:<row_scope>'
+    """
+    if row_scope is None:
+        return 'global'
+    literal = str(row_scope).replace('\\', '\\\\').replace("'", "\\'")
+    if f"'{literal}'" in query:
+        return 'global'
+    return f"rows:{row_scope}"
@@ -0,0 +1,358 @@
+"""
+Bulk student progress reports for MIND Dashboard
+Builds the Student dashboard's content (score trend, rubric radar, cases
+attempted) for many students at once: data comes from a few set-based
+queries, HTML is rendered across a process pool and each report is
+streamed into a zip archive as soon as it is ready
+
+From the command line:
+    python -m core.reports --department "Computer Science" --out reports.zip
+"""
+
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+import pandas as pd
+import plotly.graph_objects as go
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from plotly.offline import get_plotlyjs
+from core.db import get_bigquery_client, execute_query, sql_literal
+from core.settings import get_table_ref, COLORS, REPORT_CONFIG
+from core.percentiles import get_score_ranker
+
+RUBRIC = [('comm', 'Communication'), ('comp', 'Comprehension'), ('crit', 'Critical Thinking')]
+
+def _text(value, default: str = '') -> str:
+    return default if value is None or pd.isna(value) else str(value)
+
+def _day(value) -> str:
+    return '' if pd.isna(value) else pd.Timestamp(value).strftime('%Y-%m-%d')
+
+def fetch_report_data(client=None, department: Optional[str] = None) -> Optional[dict]:
+    """
+    Everything the reports need, in set-based queries over all selected students
+    
+    Args:
+        client: BigQuery client
+        department: Only students of this department (all students if None)
+    
+    Returns:
+        Dict with students (user_id, name, email, department) and grades
+        (one row per graded attempt with case title and rubric scores),
+        or None if a query failed
+    """
+    client = client or get_bigquery_client()
+    where = "role = 'student'"
+    if department:
+        where += f" AND department = {sql_literal(department)}"
+    
+    students = execute_query(f"""
+    SELECT user_id, name, email, department
+    FROM {get_table_ref('user')}
+    WHERE {where}
+    ORDER BY name
+    """, client)
+    if students is None:
+        return None
+    
+    grades = execute_query(f"""
+    WITH students AS (
+        SELECT user_id FROM {get_table_ref('user')} WHERE {where}
+    )
+    SELECT g.user as user_id, g.timestamp, g.final_score as score,
+           COALESCE(c.title, g.case_study) as case_title,
+           g.individual_scores.communication as comm,
+           g.individual_scores.comprehension as comp,
+           g.individual_scores.critical_thinking as crit
+    FROM {get_table_ref('grades')} g
+    JOIN students s ON s.user_id = g.user
+    LEFT JOIN {get_table_ref('casestudy')} c ON c.case_study_id = g.case_study
+    WHERE g.final_score IS NOT NULL
+    ORDER BY g.user, g.timestamp
+    """, client)
+    if grades is None:
+        return None
+    
+    return {'students': students, 'grades': grades}
+
+def build_payloads(data: dict, passing_score: Optional[float] = None) -> Iterator[dict]:
+    """
+    Split the fetched frames into one plain, picklable payload per student
+    
+    Percentiles come from the institution-wide ranker used by the Student
+    dashboard, ranked for all students in one batch.
+    """
+    students, grades = data['students'], data['grades']
+    passing_score = REPORT_CONFIG['passing_score'] if passing_score is None else passing_score
+    generated = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+    
+    # All per-student aggregates in one grouped pass each
+    per_student = grades.groupby('user_id').agg(avg_score=('score', 'mean'),
+                                                **{column: (column, 'mean') for column, _ in RUBRIC})
+    ranker = get_score_ranker()
+    if ranker is not None and len(ranker):
+        per_student['percentile'] = ranker.rank(per_student['avg_score'].to_numpy())
+    else:
+        per_student['percentile'] = float('nan')
+    
+    cases = (grades.groupby(['user_id', 'case_title'], dropna=False)
+             .agg(attempts=('score', 'size'), best=('score', 'max'), last=('timestamp', 'max'))
+             .reset_index()
+             .sort_values(['user_id', 'last'], ascending=[True, False]))
+    cases_by_student = {
+        user_id: [(_text(title, 'Unknown'), int(attempts), float(best), _day(last))
+                  for title, attempts, best, last in zip(rows['case_title'], rows['attempts'], rows['best'], rows['last'])]
+        for user_id, rows in cases.groupby('user_id', sort=False)
+    }
+    trend_by_student = {
+        user_id: {'date': [_day(ts) for ts in rows['timestamp']], 'score': rows['score'].astype(float).tolist()}
+        for user_id, rows in grades.groupby('user_id', sort=False)
+    }
+    stats = per_student.to_dict('index')
+    
+    def optional(row, column):
+        return None if row is None or pd.isna(row[column]) else float(row[column])
+    
+    for student in students.itertuples(index=False):
+        row = stats.get(student.user_id)
+        yield {
+            'user_id': str(student.user_id),
+            'name': _text(student.name, str(student.user_id)),
+            'email': _text(student.email),
+            'department': _text(student.department),
+            'generated': generated,
+            'passing_score': passing_score,
+            'avg_score': optional(row, 'avg_score'),
+            'percentile': optional(row, 'percentile'),
+            'trend': trend_by_student.get(student.user_id, {'date': [], 'score': []}),
+            'rubric': {column: optional(row, column) for column, _ in RUBRIC},
+            'cases': cases_by_student.get(student.user_id, [])
+        }
+
+def report_filename(payload: dict) -> str:
+    """File name inside the archive: readable name plus the unique user_id"""
+    name = re.sub(r'[^A-Za-z0-9]+', '_', payload['name']).strip('_') or 'student'
+    user_id = re.sub(r'[^A-Za-z0-9_-]+', '_', payload['user_id'])
+    return f"{name}_{user_id}.html"
+
+def render_report(payload: dict) -> tuple:
+    """
+    Worker: payload -> (file name, HTML bytes)
+    
+    Reports load plotly.js from REPORT_CONFIG['plotly_js'] next to them in
+    the archive instead of embedding ~3.5 MB in every file.
+    """
+    figures = []
+    
+    if payload['trend']['score']:
+        trend = go.Figure(go.Scatter(x=payload['trend']['date'], y=payload['trend']['score'],
+                                     mode='lines+markers', line=dict(color=COLORS['primary'], width=3)))
+        trend.add_hline(y=payload['passing_score'], line_dash="dash", line_color="red",
+                        annotation_text="Passing Threshold")
+        trend.update_layout(title="Progress Over Time", height=380, yaxis_title="Score")
+        figures.append(trend)
+    
+    rubric = [payload['rubric'][column] for column, _ in RUBRIC]
+    if any(score is not None for score in rubric):
+        values = [score or 0 for score in rubric]
+        labels = [label for _, label in RUBRIC]
+        radar = go.Figure(go.Scatterpolar(r=values + values[:1], theta=labels + labels[:1], fill='toself',
+                                          line=dict(color=COLORS['primary'])))
+        radar.update_layout(title="Rubric Scores", height=380, polar=dict(radialaxis=dict(range=[0, 100])))
+        figures.append(radar)
+    
+    charts = "\n".join(fig.to_html(full_html=False, include_plotlyjs=False, config={'displaylogo': False})
+                       for fig in figures) or "<p>No graded attempts yet.</p>"
+    
+    def fmt(value):
+        return '–' if value is None else f"{value:.1f}"
+    
+    case_rows = "\n".join(
+        f"<tr><td>{html.escape(str(title))}</td><td>{attempts}</td><td>{best:.1f}</td><td>{last}</td></tr>"
+        for title, attempts, best, last in payload['cases']
+    )
+    e = {key: html.escape(str(payload[key])) for key in ('name', 'email', 'department', 'user_id', 'generated')}
+    
+    document = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Progress Report - {e['name']}</title>
+<script src="{REPORT_CONFIG['plotly_js']}"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 960px; color: {COLORS['light_text']}; }}
+h1 {{ color: {COLORS['primary']}; margin-bottom: 0; }}
+.kpis {{ display: flex; gap: 1rem; margin: 1.5rem 0; }}
+.kpi {{ flex: 1; padding: 1rem; background: {COLORS['light_secondary']}; border-radius: 8px; }}
+.kpi b {{ display: block; font-size: 1.8rem; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ text-align: left; padding: 0.4rem; border-bottom: 1px solid {COLORS['light_secondary']}; }}
+</style>
+</head>
+<body>
+<h1>{e['name']}</h1>
+<p>{e['email']} · {e['department']} · {e['user_id']}</p>
+<div class="kpis">
+<div class="kpi">Cases Attempted<b>{len(payload['cases'])}</b></div>
+<div class="kpi">Average Score<b>{fmt(payload['avg_score'])}</b></div>
+<div class="kpi">Percentile<b>{fmt(payload['percentile'])}</b></div>
+</div>
+{charts}
+<h2>Cases Attempted</h2>
+<table>
+<tr><th>Case Study</th><th>Attempts</th><th>Best Score</th><th>Last Attempt</th></tr>
+{case_rows}
+</table>
+<p><small>Generated {e['generated']} · MIND Analytics</small></p>
+</body>
+</html>
+"""
+    return report_filename(payload), document.encode('utf-8')
+
+def write_report_archive(payloads: list, output, workers: Optional[int] = None,
+                         progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Render reports in a process pool and stream them into a zip archive
+    
+    Each report is written as soon as its worker returns, so memory holds
+    only the reports in flight, not the whole archive's contents. Workers
+    are spawned rather than forked, which is safe from a multi-threaded
+    caller; the Streamlit server still goes through run_report_job so it
+    never starts workers itself.
+    
+    Args:
+        payloads: From build_payloads
+        output: Path or writable binary file object for the archive
+        workers: Worker processes (REPORT_CONFIG['workers'], else all cores)
+        progress: Called with (done, total) after each report
+    
+    Returns:
+        Number of reports written
+    """
+    workers = workers or REPORT_CONFIG['workers'] or os.cpu_count() or 1
+    total = len(payloads)
+    chunksize = max(1, min(REPORT_CONFIG['chunksize'], total // (workers * 4) or 1))
+    index_rows = []
+    
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(REPORT_CONFIG['plotly_js'], get_plotlyjs())
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = executor.map(render_report, payloads, chunksize=chunksize)
+            for done, (payload, (filename, document)) in enumerate(zip(payloads, results), start=1):
+                archive.writestr(filename, document)
+                index_rows.append(f'<li><a href="{html.escape(filename)}">{html.escape(payload["name"])}</a> '
+                                  f'({html.escape(payload["email"])})</li>')
+                if progress is not None:
+                    progress(done, total)
+        
+        archive.writestr('index.html', "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+                                       "<title>Student Reports</title></head><body>"
+                                       f"<h1>Student Reports ({total})</h1><ul>\n"
+                                       + "\n".join(index_rows) + "\n</ul></body></html>")
+    return total
+
+def report_archive_path() -> Path:
+    """
+    Fresh temporary file for an archive generated from the Admin page
+    
+    Archives are kept on disk rather than in session memory and live in
+    REPORT_CONFIG['archive_dir'] under the system temp directory; ones
+    older than REPORT_CONFIG['archive_ttl'] seconds are deleted here.
+    """
+    folder = Path(tempfile.gettempdir()) / REPORT_CONFIG['archive_dir']
+    folder.mkdir(parents=True, exist_ok=True)
+    
+    cutoff = time.time() - REPORT_CONFIG['archive_ttl']
+    for old in folder.glob('*.zip'):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+    
+    fd, path = tempfile.mkstemp(suffix='.zip', dir=folder)
+    os.close(fd)
+    return Path(path)
+
+def run_report_job(output: Path, department: Optional[str] = None,
+                   progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Generate an archive by running ``python -m core.reports`` as a child process
+    
+    Used by the Admin page: the process pool lives in the child, so the
+    Streamlit server never forks or spawns workers from its own threads,
+    and the server's memory only sees progress lines.
+    
+    Args:
+        output: Archive path (from report_archive_path)
+        department: Only students of this department (all students if None)
+        progress: Called with (done, total) as reports are rendered
+    
+    Returns:
+        Number of reports written
+    
+    Raises:
+        RuntimeError: With the command's error message if it failed
+    """
+    command = [sys.executable, '-m', 'core.reports', '--out', str(output)]
+    if department:
+        command += ['--department', department]
+    
+    # Text mode turns the "\rRendered done/total" updates into lines
+    with subprocess.Popen(command, cwd=Path(__file__).resolve().parent.parent,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as job:
+        errors = []
+        for line in job.stderr:
+            rendered = re.match(r'Rendered (\d+)/(\d+)', line.strip())
+            if rendered and progress is not None:
+                progress(int(rendered.group(1)), int(rendered.group(2)))
+            elif not rendered and line.strip():
+                errors.append(line.strip())
+        output_lines = job.stdout.read().splitlines()
+    
+    written = next((re.match(r'Wrote (\d+)', line) for line in output_lines if line.startswith('Wrote ')), None)
+    if job.returncode != 0 or written is None:
+        message = next((line[len('Error: '):] for line in output_lines if line.startswith('Error: ')), None)
+        raise RuntimeError(message or (errors[-1] if errors else f"exit status {job.returncode}"))
+    return int(written.group(1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate per-student progress reports into a zip archive")
+    parser.add_argument('--department', help="Only students of this department")
+    parser.add_argument('--out', default='student_reports.zip', help="Zip archive to write")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+    
+    started = time.time()
+    data = fetch_report_data(department=args.department)
+    if data is None:
+        print("Error: could not load report data")
+        sys.exit(1)
+    payloads = list(build_payloads(data))
+    if not payloads:
+        print("Error: no matching students")
+        sys.exit(1)
+    print(f"Loaded {len(payloads)} students in {time.time() - started:.1f}s")
+    
+    def progress(done, total):
+        if done == total or done % max(1, total // 100) == 0:
+            elapsed = time.time() - started
+            print(f"\rRendered {done}/{total} ({done / elapsed:.1f}/s)", end='', file=sys.stderr, flush=True)
+    
+    written = write_report_archive(payloads, args.out, args.workers, progress)
+    print(file=sys.stderr)
+    print(f"Wrote {written} reports to {args.out} in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Streaming sessionization for MIND Dashboard
+Rebuilds sessions from raw event_stream rows with a configurable inactivity
+gap, instead of relying on the externally derived session_analytics
+columns. Events are read in time-ordered Arrow batches and closed sessions
+are emitted batch by batch, so memory holds one batch plus the sessions
+still open; progress is checkpointed as a watermark per gap
+
+Backfill or catch up from the command line:
+    python -m core.sessionize --gap 30 --days 30
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from core.db import get_bigquery_client, record_query, sql_literal
+from core.settings import get_table_ref, SESSIONIZE_CONFIG
+
+MINUTE_US = 60_000_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    gap_minutes INTEGER NOT NULL,
+    distinct_id TEXT NOT NULL,
+    session_start INTEGER NOT NULL,
+    session_end INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    pageviews INTEGER NOT NULL,
+    PRIMARY KEY (gap_minutes, session_start, distinct_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS open_sessions (
+    gap_minutes INTEGER NOT NULL,
+    distinct_id TEXT NOT NULL,
+    session_start INTEGER NOT NULL,
+    session_end INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    pageviews INTEGER NOT NULL,
+    PRIMARY KEY (gap_minutes, distinct_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watermarks (
+    gap_minutes INTEGER PRIMARY KEY,
+    watermark INTEGER NOT NULL
+);
+"""
+
+SESSION_COLUMNS = ['distinct_id', 'session_start', 'session_end', 'events', 'pageviews']
+
+class Sessionizer:
+    """
+    Incremental gap-based sessionizer
+    
+    Feed it event batches in timestamp order; each call returns the
+    sessions that can no longer grow. A session closes when its user's next
+    event is more than ``gap_minutes`` later, or when the stream has moved
+    more than ``gap_minutes`` past its last event. Only open sessions are
+    kept between batches, one row per active user.
+    """
+    
+    def __init__(self, gap_minutes: int, open_sessions: Optional[pd.DataFrame] = None):
+        self.gap_minutes = gap_minutes
+        self.gap_us = gap_minutes * MINUTE_US
+        if open_sessions is None:
+            open_sessions = pd.DataFrame({col: pd.Series(dtype=object if col == 'distinct_id' else np.int64)
+                                          for col in SESSION_COLUMNS})
+        self.open = open_sessions.set_index('distinct_id')
+    
+    def push(self, distinct_id: np.ndarray, ts: np.ndarray, is_pageview: np.ndarray) -> pd.DataFrame:
+        """
+        Add one batch of events and return the sessions it closes
+        
+        Args:
+            distinct_id: User of each event
+            ts: Event time, microseconds since epoch (batches must not go back in time)
+            is_pageview: Whether each event is a pageview
+        """
+        if len(ts) == 0:
+            return pd.DataFrame(columns=SESSION_COLUMNS)
+        
+        codes, users = pd.factorize(distinct_id)
+        order = np.lexsort((ts, codes))
+        code, t, pv = codes[order], ts[order].astype(np.int64), is_pageview[order].astype(np.int64)
+        
+        first = np.r_[True, code[1:] != code[:-1]]
+        last = np.r_[code[1:] != code[:-1], True]
+        
+        # Open session (if any) of each user in the batch
+        held = self.open.index.get_indexer(users)
+        has_open = held >= 0
+        open_rows = self.open.iloc[held[has_open]]
+        
+        # A user's first event continues their open session unless the gap is exceeded
+        prev = np.r_[np.int64(0), t[:-1]]
+        open_end = np.full(len(users), np.iinfo(np.int64).min // 2, dtype=np.int64)
+        open_end[has_open] = open_rows['session_end'].to_numpy(np.int64)
+        prev[first] = open_end[code[first]]
+        new = (t - prev) > self.gap_us
+        
+        boundary = new | first
+        segment = np.cumsum(boundary) - 1
+        seg_user = code[boundary]
+        seg_first_row = np.flatnonzero(boundary)
+        seg_last_row = np.r_[seg_first_row[1:] - 1, len(t) - 1]
+        sessions = pd.DataFrame({
+            'code': seg_user,
+            'session_start': t[seg_first_row],
+            'session_end': t[seg_last_row],
+            'events': np.bincount(segment),
+            'pageviews': np.bincount(segment, weights=pv).astype(np.int64)
+        })
+        
+        # Segments that continue an open session absorb it
+        continues = ~new[seg_first_row]
+        carried = np.zeros(len(users), dtype=bool)
+        carried[seg_user[continues]] = True
+        if continues.any():
+            base = self.open.iloc[held[seg_user[continues]]]
+            sessions.loc[continues, 'session_start'] = base['session_start'].to_numpy(np.int64)
+            sessions.loc[continues, 'events'] += base['events'].to_numpy(np.int64)
+            sessions.loc[continues, 'pageviews'] += base['pageviews'].to_numpy(np.int64)
+        sessions.insert(0, 'distinct_id', users[sessions['code'].to_numpy()])
+        sessions = sessions.drop(columns='code')
+        
+        # Each user's last segment stays open; open sessions of batch users
+        # that were not continued are finished
+        still_open = last[seg_last_row]
+        finished_open = open_rows[~carried[np.flatnonzero(has_open)]]
+        
+        # Users absent from this batch: close sessions the stream has moved past
+        absent = self.open[~self.open.index.isin(users)]
+        expired = absent['session_end'].to_numpy(np.int64) < int(t.max()) - self.gap_us
+        
+        self.open = pd.concat([
+            absent[~expired],
+            sessions[still_open].set_index('distinct_id')
+        ])
+        closed = pd.concat([
+            finished_open.reset_index(),
+            absent[expired].reset_index(),
+            sessions[~still_open]
+        ], ignore_index=True)
+        return closed[SESSION_COLUMNS]
+    
+    def open_sessions(self) -> pd.DataFrame:
+        """Sessions that may still grow, for checkpointing"""
+        return self.open.reset_index()[SESSION_COLUMNS]
+
+def read_event_batches(since_us: int, until_us: int, client=None,
+                       batch_rows: Optional[int] = None) -> Iterator:
+    """
+    Stream events in [since, until) as time-ordered Arrow record batches
+    
+    Yields:
+        pyarrow.RecordBatch with distinct_id, ts (µs) and is_pageview
+    """
+    client = client or get_bigquery_client()
+    query = f"""
+    SELECT CAST(distinct_id AS STRING) as distinct_id,
+           UNIX_MICROS(timestamp) as ts,
+           COALESCE(event = {sql_literal(SESSIONIZE_CONFIG['pageview_event'])}, FALSE) as is_pageview
+    FROM {get_table_ref('event_stream')}
+    WHERE timestamp >= TIMESTAMP_MICROS({int(since_us)})
+      AND timestamp < TIMESTAMP_MICROS({int(until_us)})
+      AND distinct_id IS NOT NULL
+    ORDER BY ts
+    """
+    record_query(query)
+    rows = client.query(query).result(page_size=batch_rows or SESSIONIZE_CONFIG['batch_rows'])
+    yield from rows.to_arrow_iterable()
+
+def sessionize(batches: Iterable, sessionizer: Sessionizer) -> Iterator[pd.DataFrame]:
+    """
+    Run Arrow batches through a sessionizer
+    
+    Yields:
+        Closed sessions of each batch (batches that close none are skipped)
+    """
+    for batch in batches:
+        closed = sessionizer.push(
+            batch.column('distinct_id').to_numpy(zero_copy_only=False),
+            batch.column('ts').to_numpy(),
+            batch.column('is_pageview').to_numpy(zero_copy_only=False)
+        )
+        if len(closed):
+            yield closed
+
+class SessionStore:
+    """
+    SQLite store of closed sessions, open sessions and watermarks per gap
+    
+    Closed sessions are keyed by (gap, start, user), so re-running a window
+    after an interrupted run overwrites rather than duplicates them.
+    """
+    
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.refreshed_at = {}
+    
+    def watermark(self, gap_minutes: int) -> Optional[int]:
+        """Events before this time (µs) have been sessionized for the gap"""
+        with self._lock:
+            row = self._conn.execute("SELECT watermark FROM watermarks WHERE gap_minutes = ?",
+                                     (gap_minutes,)).fetchone()
+        return row[0] if row else None
+    
+    def load_sessionizer(self, gap_minutes: int) -> Sessionizer:
+        """Sessionizer resumed with the open sessions of the last checkpoint"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SESSION_COLUMNS)} FROM open_sessions WHERE gap_minutes = ?",
+                (gap_minutes,)
+            ).fetchall()
+        open_sessions = pd.DataFrame(rows, columns=SESSION_COLUMNS) if rows else None
+        return Sessionizer(gap_minutes, open_sessions)
+    
+    @staticmethod
+    def _records(gap_minutes: int, sessions: pd.DataFrame) -> list:
+        return [(gap_minutes, str(user), int(start), int(end), int(events), int(pageviews))
+                for user, start, end, events, pageviews in sessions[SESSION_COLUMNS].itertuples(index=False, name=None)]
+    
+    def add_sessions(self, gap_minutes: int, sessions: pd.DataFrame):
+        """Store closed sessions"""
+        records = self._records(gap_minutes, sessions)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?)", records)
+            self._conn.execute("COMMIT")
+    
+    def checkpoint(self, sessionizer: Sessionizer, watermark: int):
+        """Replace the open sessions and advance the watermark in one transaction"""
+        gap = sessionizer.gap_minutes
+        records = self._records(gap, sessionizer.open_sessions())
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM open_sessions WHERE gap_minutes = ?", (gap,))
+            self._conn.executemany("INSERT INTO open_sessions VALUES (?, ?, ?, ?, ?, ?)", records)
+            self._conn.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?)", (gap, int(watermark)))
+            self._conn.execute("COMMIT")
+    
+    def daily(self, gap_minutes: int, since_us: int) -> pd.DataFrame:
+        """
+        Per-day session metrics for closed sessions starting since ``since_us``
+        
+        Returns:
+            DataFrame with day, sessions, users, avg_minutes, avg_events and bounce_rate
+        """
+        query = """
+        SELECT DATE(session_start / 1000000, 'unixepoch') as day,
+               COUNT(*) as sessions,
+               COUNT(DISTINCT distinct_id) as users,
+               AVG((session_end - session_start) / 60000000.0) as avg_minutes,
+               AVG(events) as avg_events,
+               AVG(pageviews <= 1 AND session_end - session_start < ?) * 100 as bounce_rate
+        FROM sessions
+        WHERE gap_minutes = ? AND session_start >= ?
+        GROUP BY day ORDER BY day
+        """
+        params = (SESSIONIZE_CONFIG['bounce_seconds'] * 1_000_000, gap_minutes, int(since_us))
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        daily = pd.DataFrame(rows, columns=['day', 'sessions', 'users', 'avg_minutes', 'avg_events', 'bounce_rate'])
+        daily['day'] = pd.to_datetime(daily['day'])
+        return daily
+
+def run_sessionization(gap_minutes: int, store: 'SessionStore', until_us: Optional[int] = None,
+                       since_us: Optional[int] = None, client=None) -> dict:
+    """
+    Sessionize events from the gap's watermark (or ``since_us``) up to ``until_us``
+    
+    ``until_us`` defaults to SESSIONIZE_CONFIG['lag_seconds'] before now so
+    events still being ingested are left for the next run. Closed sessions
+    are written as each batch is processed; the open sessions and the new
+    watermark are checkpointed together at the end.
+    
+    Returns:
+        Dict with events, sessions and seconds
+    """
+    now_us = int(time.time() * 1_000_000)
+    until_us = until_us or now_us - SESSIONIZE_CONFIG['lag_seconds'] * 1_000_000
+    watermark = store.watermark(gap_minutes)
+    if watermark is None:
+        watermark = since_us or now_us - SESSIONIZE_CONFIG['backfill_days'] * 86400 * 1_000_000
+    if watermark >= until_us:
+        return {'events': 0, 'sessions': 0, 'seconds': 0.0}
+    
+    started = time.time()
+    sessionizer = store.load_sessionizer(gap_minutes)
+    stats = {'events': 0, 'sessions': 0}
+    
+    def counted(batches):
+        for batch in batches:
+            stats['events'] += batch.num_rows
+            yield batch
+    
+    batches = read_event_batches(watermark, until_us, client)
+    for closed in sessionize(counted(batches), sessionizer):
+        store.add_sessions(gap_minutes, closed)
+        stats['sessions'] += len(closed)
+    
+    store.checkpoint(sessionizer, until_us)
+    stats['seconds'] = time.time() - started
+    return stats
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Process-wide session store shared by all sessions"""
+    return SessionStore(SESSIONIZE_CONFIG['path'])
+
+def refresh_sessions(gap_minutes: int, store: Optional[SessionStore] = None, force: bool = False) -> SessionStore:
+    """
+    Catch the gap's sessions up with event_stream
+    
+    Runs at most once per SESSIONIZE_CONFIG['refresh_seconds'] per gap;
+    the first run for a gap backfills SESSIONIZE_CONFIG['backfill_days'].
+    """
+    if store is None:
+        store = get_session_store()
+    
+    age = time.time() - store.refreshed_at.get(gap_minutes, 0.0)
+    if not force and gap_minutes in store.refreshed_at and age < SESSIONIZE_CONFIG['refresh_seconds']:
+        return store
+    
+    # Another session is already sessionizing; serve the stored sessions
+    if not store.refresh_lock.acquire(blocking=False):
+        return store
+    
+    try:
+        client = get_bigquery_client()
+        if client is None:
+            return store
+        run_sessionization(gap_minutes, store, client=client)
+        store.refreshed_at[gap_minutes] = time.time()
+    except Exception as e:
+        st.error(f"❌ Sessionization error: {str(e)}")
+    finally:
+        store.refresh_lock.release()
+    
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Sessionize event_stream into the local session store")
+    parser.add_argument('--gap', type=int, action='append',
+                        help=f"Inactivity gap in minutes, repeatable (default {SESSIONIZE_CONFIG['default_gap_minutes']})")
+    parser.add_argument('--days', type=int, default=SESSIONIZE_CONFIG['backfill_days'],
+                        help="History to backfill for a gap without a watermark")
+    args = parser.parse_args()
+    
+    store = SessionStore(SESSIONIZE_CONFIG['path'])
+    since_us = int((time.time() - args.days * 86400) * 1_000_000)
+    for gap in args.gap or [SESSIONIZE_CONFIG['default_gap_minutes']]:
+        stats = run_sessionization(gap, store, since_us=since_us)
+        rate = stats['events'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"Gap {gap} min: {stats['events']:,} events -> {stats['sessions']:,} sessions "
+              f"in {stats['seconds']:.1f}s ({rate:,.0f} events/s)")
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,9 @@ TABLES = {
         'name': 'user',
         'display_name': 'Users',
         'description': 'Platform users (students, instructors, admins)',
-        'primary_key': 'user_id'
+        'primary_key': 'user_id',
+        'time_column': 'date_added',
+        'cluster_columns': []
     },
     'casestudy': {
         'name': 'casestudy',
@@ -41,19 +43,25 @@ TABLES = {
         'name': 'sessions',
         'display_name': 'Sessions',
         'description': 'User engagement sessions',
-        'primary_key': 'session_pk'
+        'primary_key': '_id',
+        'time_column': 'start_time',
+        'cluster_columns': ['case_study_id', 'user_email']
     },
     'conversation': {
         'name': 'conversation',
         'display_name': 'Conversations',
         'description': 'AI-learner interactions',
-        'primary_key': 'conversation_id'
+        'primary_key': 'conversation_id',
+        'time_column': 'timestamp',
+        'cluster_columns': ['user', 'case_study']
     },
     'grades': {
         'name': 'grades',
         'display_name': 'Grades',
         'description': 'Rubric-based evaluations',
-        'primary_key': 'grade_id'
+        'primary_key': '_id',
+        'time_column': 'timestamp',
+        'cluster_columns': ['case_study', 'user']
     },
     'session_analytics': {
         'name': 'session_analytics',
@@ -65,13 +73,17 @@ TABLES = {
         'name': 'event_stream',
         'display_name': 'Event Stream',
         'description': 'PostHog event-level data',
-        'primary_key': 'event_id'
+        'primary_key': 'event_id',
+        'time_column': 'timestamp',
+        'cluster_columns': ['distinct_id']
     },
     'backend_telemetry': {
         'name': 'backend_telemetry',
         'display_name': 'Backend Telemetry',
         'description': 'Backend and AI observability data',
-        'primary_key': 'telemetry_id'
+        'primary_key': 'telemetry_id',
+        'time_column': 'created_at',
+        'cluster_columns': ['derived_endpoint_group', 'derived_is_error']
     }
 }
 
@@ -165,3 +177,170 @@ REFRESH_INTERVALS = {
     'standard': 300,
     'batch': 3600
 }
+
+# Chart rendering limits
+CHART_CONFIG = {
+    'figure_cache_size': 256,    # Built Plotly figures kept in memory (LRU)
+    'lttb_max_points': 2000,     # Points per line/area series before LTTB downsampling
+    'scattergl_threshold': 5000,            # Scatter points before switching to WebGL
+    'scatter_density_threshold': 200000     # Scatter points before 2D binning
+}
+
+# Table export limits (render_data_table)
+EXPORT_CONFIG = {
+    'cache_entries': 16,         # Generated export files kept in memory (LRU)
+    'excel_max_rows': 100000,    # Larger tables are offered as CSV/Parquet only
+    'excel_workers': 2           # Concurrent Excel workbook builds (others wait)
+}
+
+# Student search index (core.user_index)
+USER_INDEX_CONFIG = {
+    'refresh_seconds': 60,       # Minimum gap between incremental refreshes
+    'max_results': 20            # Matches shown by the student selector
+}
+
+# At-risk student detection (core.at_risk)
+RISK_CONFIG = {
+    'refresh_seconds': 120,      # Minimum gap between incremental feature refreshes
+    'reconcile_seconds': 21600,  # Full reload interval, catches late-ingested grades
+    'rolling_window': 5,         # Most recent grades in the rolling average
+    'passing_score': 70,         # Rolling average below this flags low performance
+    'min_attempts': 3,           # Fewer attempts plus inactivity flags low engagement
+    'inactive_days': 14,         # Days without activity for the low engagement rule
+    'dormant_days': 30,          # Days without activity flags the student as inactive
+    'rubric_floor': 60,          # Weakest rubric average below this flags a skill gap
+    'weights': {                 # Risk score contribution per triggered rule
+        'low_score': 3,
+        'low_engagement': 2,
+        'inactive': 2,
+        'weak_rubric': 1
+    }
+}
+
+# Filter cube behind render_global_filters (core.cube)
+CUBE_CONFIG = {
+    'refresh_seconds': 900,      # Full cube rebuild interval
+    'hll_precision': 8,          # Distinct-student sketch size: 2**p bytes per cell
+    'passing_score': 70          # Grades at or above this count as passed
+}
+
+# Dimension cache for user / casestudy joins (core.dimensions)
+DIMENSION_CONFIG = {
+    'check_seconds': 60,         # Minimum gap between table metadata checks
+    'columns': {                 # Columns kept in memory per dimension table
+        'user': ['user_id', 'name', 'email', 'role', 'department', 'date_added'],
+        'casestudy': ['case_study_id', 'title', 'description', 'agent_id', 'avatar_id']
+    }
+}
+
+# Table layout advisor (core.layout)
+LAYOUT_CONFIG = {
+    'min_partition_bytes': 1024 ** 3,   # Smaller tables are advised to cluster instead of partition
+    'partition_granularity': 'DAY',     # Time partitioning unit in generated DDL
+    'copy_suffix': '_optimized'         # Name suffix for recommended table copies
+}
+
+# Login throttling and session tokens (core.auth)
+AUTH_CONFIG = {
+    'verify_workers': 2,         # Concurrent bcrypt checks (each uses one core)
+    'verify_queue': 32,          # Pending checks beyond the workers before logins are refused
+    'verify_timeout': 15,        # Seconds a login waits for its bcrypt check
+    'attempt_window': 300,       # Sliding window for failed attempt counts (seconds)
+    'max_user_failures': 5,      # Failed attempts per username per window
+    'max_ip_failures': 20,       # Failed attempts per client IP per window
+    'users_cache_seconds': 300,  # How long the parsed users table is reused
+    'token_ttl': 3600,           # Session token lifetime (seconds), renewed while in use
+    'token_cookie': 'mind_session',                       # Cookie carrying the session token
+    'revocation_path': 'data/revoked_sessions.sqlite',    # Session ids revoked by logout
+    'trusted_proxies': ['127.0.0.1/32', '::1/128']        # Proxies whose X-Forwarded-For is trusted
+}
+
+# Developer dashboard live mode (core.telemetry)
+TAIL_CONFIG = {
+    'poll_seconds': 5,           # Minimum gap between BigQuery polls (shared by all viewers)
+    'window_seconds': 300,       # Rolling window for request rate, error rate and latency
+    'capacity': 100000,          # Rows kept in the ring buffer
+    'max_rows_per_poll': 20000,  # Rows fetched per poll; the rest follow on the next tick
+    'history_points': 360,       # Per-poll stats kept for the live chart
+    'recent_rows': 50            # Newest requests listed under the live chart
+}
+
+# Latency quantile sketches behind the Developer dashboard (core.latency)
+LATENCY_CONFIG = {
+    'refresh_seconds': 300,      # Minimum gap between incremental sketch refreshes
+    'retention_days': 14,        # Hours of sketches kept (longest selectable window)
+    'relative_accuracy': 0.01,   # Quantile estimates are within 1% of a true value
+    'min_ms': 1,                 # Latencies at or below this share the first bucket
+    'max_ms': 600000,            # Latencies above this share the last bucket
+    'quantiles': [0.5, 0.95, 0.99]
+}
+
+# Daily distinct-count sketches for DAU/WAU/MAU and the funnel (core.uniques)
+UNIQUES_CONFIG = {
+    'refresh_seconds': 600,      # Minimum gap between incremental sketch refreshes
+    'precision': 11              # 2**p registers per day: ~2.3% standard error, 2 KB per day
+}
+
+# KPI snapshot history behind metric deltas and sparklines (core.kpi_history)
+KPI_HISTORY_CONFIG = {
+    'path': 'data/kpi_history.sqlite',  # Local SQLite file (created on first use)
+    'min_interval_seconds': 300,        # At most one snapshot per KPI and scope per interval
+    'compare_seconds': 86400,           # Deltas compare against the value this long ago
+    'retention_days': 90,               # Older snapshots are pruned at startup
+    'sparkline_days': 30,               # History shown in KPI sparklines
+    'sparkline_points': 30              # Values per sparkline
+}
+
+# Transcript viewer (components.ui.render_transcript_browser)
+TRANSCRIPT_CONFIG = {
+    'chunk_chars': 20000,        # Characters shown per transcript page
+    'cache_transcripts': 256,    # Whole transcripts kept in memory (LRU)
+    'cache_chars': 16000000,     # Total transcript characters kept in memory
+    'page_size': 25,             # Rows per page in the transcript list
+    'list_columns': {            # Lightweight columns listed instead of the transcript
+        'conversation': ['timestamp', 'user', 'case_study'],
+        'sessions': ['start_time', 'user_email', 'case_study_id', 'end_time']
+    }
+}
+
+# Local full-text transcript search (core.transcript_index)
+TRANSCRIPT_INDEX_CONFIG = {
+    'path': 'data/transcript_index.sqlite',  # Local SQLite FTS5 file (created on first use)
+    'refresh_seconds': 300,      # Minimum gap between incremental indexing runs
+    'batch_rows': 2000,          # New conversations a page view may index (more runs in the background)
+    'page_size': 2000,           # Rows per result page of a backfill scan
+    'max_results': 50,           # Matches returned per search
+    'snippet_tokens': 16         # Words of context in each result snippet
+}
+
+# Sessions rebuilt from event_stream (core.sessionize)
+SESSIONIZE_CONFIG = {
+    'path': 'data/sessions.sqlite',  # Local SQLite store of sessions and watermarks
+    'gap_minutes': [15, 30, 60],     # Selectable inactivity gaps
+    'default_gap_minutes': 30,
+    'batch_rows': 100000,        # Events per Arrow batch
+    'backfill_days': 30,         # History sessionized on a gap's first run
+    'lag_seconds': 300,          # Events newer than this are left for the next run
+    'refresh_seconds': 600,      # Minimum gap between incremental runs per gap
+    'bounce_seconds': 10,        # Sessions shorter than this with at most one pageview bounce
+    'pageview_event': '$pageview'
+}
+
+# Bulk student progress reports (core.reports)
+REPORT_CONFIG = {
+    'workers': None,               # Rendering processes (None: all cores)
+    'chunksize': 16,               # Reports handed to a worker at a time
+    'passing_score': 70,           # Threshold line on the score trend
+    'plotly_js': 'plotly.min.js',  # Shared plotly.js file in each archive
+    'archive_dir': 'mind_reports', # Admin page archives, under the system temp dir
+    'archive_ttl': 3600            # Seconds an Admin page archive stays downloadable
+}
+
+# Static dashboard snapshots for read-only viewers (core.snapshots)
+SNAPSHOT_CONFIG = {
+    'static_root': 'static',             # Streamlit static folder, served at app/static/
+    'folder': 'static/snapshots',        # Where snapshot HTML files are written
+    'manifest': 'data/snapshots.json',   # Latest snapshot per page (kept out of the static folder)
+    'plotly_js': 'plotly.min.js',        # Shared plotly.js next to the snapshots
+    'timeout_seconds': 300               # Longest a page may take to render
+}
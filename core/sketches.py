@@ -0,0 +1,130 @@
+"""
+Mergeable sketches for MIND Dashboard
+Vectorized HyperLogLog registers for distinct counts (combined with an
+element-wise max) and DDSketch-style log-bucket histograms for quantiles
+(combined by adding counts), both built per group and estimated in bulk
+"""
+
+import numpy as np
+import pandas as pd
+
+def hash_values(values) -> np.ndarray:
+    """Stable 64-bit hashes of arbitrary values (ids, emails, ...)"""
+    return pd.util.hash_array(np.asarray(values, dtype=object).astype(str))
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length of each uint64, exact for the full 64-bit range"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+def hll_observations(hashes: np.ndarray, precision: int):
+    """
+    Split hashes into (register index, rank) pairs
+    
+    The top ``precision`` bits pick the register; the rank is the position
+    of the first set bit in the remaining bits.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    tail_bits = 64 - precision
+    index = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+    tail = hashes & np.uint64((1 << tail_bits) - 1)
+    rank = (tail_bits + 1 - _bit_length(tail)).astype(np.uint8)
+    return index, rank
+
+def hll_registers(hashes: np.ndarray, groups: np.ndarray, n_groups: int, precision: int) -> np.ndarray:
+    """
+    Build one HyperLogLog register row per group
+    
+    Args:
+        hashes: 64-bit value hashes (see hash_values)
+        groups: Group code (0..n_groups-1) of each hash
+        n_groups: Number of register rows
+        precision: Register index bits (2**precision registers per row)
+    
+    Returns:
+        uint8 array of shape (n_groups, 2**precision)
+    """
+    registers = np.zeros((n_groups, 1 << precision), dtype=np.uint8)
+    if len(hashes):
+        index, rank = hll_observations(hashes, precision)
+        np.maximum.at(registers, (np.asarray(groups, dtype=np.int64), index), rank)
+    return registers
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """
+    Distinct-count estimate for each register row
+    
+    Uses the standard HyperLogLog estimator with linear counting for small
+    cardinalities. Accepts a single row or a 2D array of rows.
+    """
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    
+    raw = alpha * m * m / np.exp2(-registers.astype(np.float64)).sum(axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+def hll_standard_error(precision: int) -> float:
+    """Relative standard error of a HyperLogLog estimate (1.04 / sqrt(m))"""
+    return 1.04 / np.sqrt(1 << precision)
+
+def hll_merge(registers: np.ndarray, axis: int = 0) -> np.ndarray:
+    """Union of register rows (element-wise max)"""
+    if registers.shape[axis] == 0:
+        return np.zeros(registers.shape[1 - axis], dtype=np.uint8)
+    return registers.max(axis=axis)
+
+def dd_gamma(relative_accuracy: float) -> float:
+    """Bucket growth factor for a DDSketch with the given relative accuracy"""
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+def dd_key_count(relative_accuracy: float, min_value: float, max_value: float) -> int:
+    """Number of buckets needed to cover [min_value, max_value]"""
+    return int(np.ceil(np.log(max_value / min_value) / np.log(dd_gamma(relative_accuracy)))) + 1
+
+def dd_keys(values, relative_accuracy: float, min_value: float, n_keys: int) -> np.ndarray:
+    """
+    Bucket key of each value
+    
+    Key k > 0 holds values in (min_value * gamma**(k-1), min_value * gamma**k];
+    key 0 holds everything at or below min_value and the last key everything
+    above the covered range.
+    """
+    values = np.maximum(np.asarray(values, dtype=np.float64), min_value)
+    keys = np.ceil(np.log(values / min_value) / np.log(dd_gamma(relative_accuracy)))
+    return np.clip(keys, 0, n_keys - 1).astype(np.int64)
+
+def dd_values(keys, relative_accuracy: float, min_value: float) -> np.ndarray:
+    """Representative value of each bucket key (within relative_accuracy of any value in it)"""
+    gamma = dd_gamma(relative_accuracy)
+    keys = np.asarray(keys, dtype=np.float64)
+    return np.where(keys > 0, min_value * 2 * gamma ** keys / (gamma + 1), min_value)
+
+def dd_quantiles(counts: np.ndarray, quantiles, relative_accuracy: float, min_value: float) -> np.ndarray:
+    """
+    Quantile estimates for each histogram row
+    
+    Args:
+        counts: Bucket counts of shape (n_groups, n_keys); merge sketches by
+                summing rows before calling
+        quantiles: Quantiles in [0, 1]
+    
+    Returns:
+        float array of shape (n_groups, len(quantiles)), NaN for empty rows
+    """
+    counts = np.atleast_2d(counts)
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1] if counts.shape[1] else np.zeros(len(counts))
+    
+    result = np.full((len(counts), len(quantiles)), np.nan)
+    for i, q in enumerate(quantiles):
+        # First bucket whose cumulative count passes rank q * (n - 1)
+        rank = q * (total - 1)
+        keys = np.count_nonzero(cumulative <= rank[:, None], axis=1)
+        keys = np.minimum(keys, counts.shape[1] - 1)
+        result[:, i] = np.where(total > 0, dd_values(keys, relative_accuracy, min_value), np.nan)
+    return result
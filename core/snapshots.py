@@ -0,0 +1,293 @@
+"""
+Static dashboard snapshots for MIND Dashboard
+Runs the Admin and Faculty pages headlessly (streamlit.testing AppTest),
+walks the rendered element tree and writes it out as static HTML with the
+Plotly figure JSON embedded. Snapshots are served by Streamlit's static
+file serving (text/html only since Streamlit 1.57), so read-only viewers
+cost no reruns or queries
+
+Static files are served without login, so snapshots are aggregate-only:
+just the sections listed in PAGES, with their metrics, charts and text,
+and never a table
+
+Render once, or keep re-rendering on a schedule:
+    python -m core.snapshots
+    python -m core.snapshots --every 900
+"""
+
+import argparse
+import html
+import json
+import re
+import secrets
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from plotly.offline import get_plotlyjs
+from core.settings import COLORS, SNAPSHOT_CONFIG
+from core.theme import get_theme_colors
+
+# Snapshot name -> (page script, role the page is rendered as, sections
+# kept). Sections are matched by heading text; anything else on the page,
+# such as standings, at-risk lists and transcripts, is left out
+PAGES = {
+    'admin': ('pages/4 admin dashboard', 'Admin',
+              ['Executive Summary', 'User Growth', 'Learning Performance', 'Explore Grades',
+               'Engagement Sessions', 'Learning Funnel']),
+    'faculty': ('pages/2 faculty dashboard', 'Faculty',
+                ['Teaching Metrics', 'User Growth', 'Activity by Case', 'Grade Distribution',
+                 'Rubric Analysis'])
+}
+
+STYLE = f"""
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1200px; padding: 0 1rem; color: {COLORS['light_text']}; }}
+h1, h2, h3 {{ color: {COLORS['primary']}; }}
+.row {{ display: flex; gap: 1rem; }}
+.row > .col {{ flex: 1; min-width: 0; }}
+.metric {{ padding: 0.8rem; background: {COLORS['light_secondary']}; border-radius: 8px; margin: 0.5rem 0; }}
+.metric b {{ display: block; font-size: 1.6rem; }}
+.up {{ color: {COLORS['success']}; }} .down {{ color: {COLORS['danger']}; }}
+.alert {{ padding: 0.8rem; border-radius: 8px; background: {COLORS['light_secondary']}; margin: 0.5rem 0; }}
+.caption {{ color: #808495; font-size: 0.85rem; }}
+.banner {{ padding: 0.6rem 1rem; background: {COLORS['light_secondary']}; border-left: 4px solid {COLORS['primary']}; }}
+"""
+
+# Streamlit's default chart palettes, standing in for the placeholders its
+# Plotly template uses (#000001-#000030)
+CATEGORICAL = ['#0068c9', '#83c9ff', '#ff2b2b', '#ffabab', '#29b09d',
+               '#7defa1', '#ff8700', '#ffd16a', '#6d3fc0', '#d5dae5']
+SEQUENTIAL = ['#e4f5ff', '#c7ebff', '#a6dcff', '#83c9ff', '#60b4ff',
+              '#3d9df3', '#1c83e1', '#0068c9', '#0054a3', '#004280']
+DIVERGING = ['#8e0152', '#c51b7d', '#de77ae', '#f1b6da', '#fde0ef',
+             '#e6f5d0', '#b8e186', '#7fbc41', '#4d9221', '#276419']
+
+def plotly_theme_colors() -> dict:
+    """
+    Streamlit's Plotly theme placeholders -> real colors
+    
+    st.plotly_chart writes its theme into the figure spec as placeholder
+    colors that only the Streamlit frontend fills in; a snapshot must fill
+    them in itself or traces and axes come out near-black.
+    """
+    theme = get_theme_colors()
+    colors = {f"#{index:06d}": color
+              for offset, palette in ((1, CATEGORICAL), (11, SEQUENTIAL), (21, DIVERGING))
+              for index, color in enumerate(palette, start=offset)}
+    colors.update({
+        '#000032': COLORS['success'],       # Increasing
+        '#000033': COLORS['danger'],        # Decreasing
+        '#000034': COLORS['info'],          # Total
+        '#000036': theme['text_secondary'], # Axis lines and ticks
+        '#000037': theme['text'],           # Text
+        '#000038': theme['bg'],             # Background
+        '#000039': theme['border'],         # Grid lines
+        '#000040': theme['secondary_bg']    # Hover labels
+    })
+    return colors
+
+def _inline(text: str) -> str:
+    """Escape text, then apply bold, italic and code markdown"""
+    text = html.escape(text)
+    text = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', text)
+    text = re.sub(r'(?<!\*)\*(?!\s)(.+?)\*', r'<i>\1</i>', text)
+    return re.sub(r'`(.+?)`', r'<code>\1</code>', text)
+
+def markdown_to_html(text: str) -> str:
+    """
+    Minimal markdown for page text: headings, rules, bullets and paragraphs
+    
+    Raw HTML tags in the source are dropped, keeping their text.
+    """
+    parts, bullets = [], []
+    for line in re.sub(r'<[^>]+>', '', text).strip().splitlines() + ['']:
+        line = line.strip()
+        if line.startswith(('- ', '* ')):
+            bullets.append(f"<li>{_inline(line[2:])}</li>")
+            continue
+        if bullets:
+            parts.append("<ul>" + "".join(bullets) + "</ul>")
+            bullets = []
+        heading = re.match(r'(#{1,6})\s+(.*)', line)
+        if heading:
+            level = len(heading.group(1))
+            parts.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif line in ('---', '***'):
+            parts.append("<hr>")
+        elif line:
+            parts.append(f"<p>{_inline(line)}</p>")
+    return "\n".join(parts)
+
+class SnapshotWriter:
+    """
+    Element tree -> HTML
+    
+    Layout blocks (columns, tabs, expanders) become flex rows, sections
+    and <details>; widgets are left out since snapshots are read-only.
+    Elements are kept only under a heading (levels 1-3) that names one of
+    ``sections``, and tables never, so per-student rows stay out.
+    """
+    
+    def __init__(self, sections: list):
+        self.figures = 0
+        self.colors = plotly_theme_colors()
+        self.sections = sections
+        self.included = False
+    
+    def node(self, node) -> str:
+        kind = getattr(node, 'type', None)
+        
+        if kind == 'markdown':
+            heading = re.match(r'\s*#{1,3}\s+(.*)', node.value)
+            if heading:
+                self.included = any(section in heading.group(1) for section in self.sections)
+        if kind in ('markdown', 'caption', 'divider', 'info', 'success', 'warning', 'error',
+                    'metric', 'plotly_chart') and not self.included:
+            return ''
+        
+        if kind == 'markdown':
+            return markdown_to_html(node.value)
+        if kind == 'caption':
+            return f'<p class="caption">{_inline(node.value)}</p>'
+        if kind == 'divider':
+            return "<hr>"
+        if kind in ('info', 'success', 'warning', 'error'):
+            return f'<div class="alert {kind}">{_inline(node.value)}</div>'
+        if kind == 'metric':
+            delta = ''
+            if node.delta:
+                direction = 'down' if str(node.delta).lstrip().startswith('-') else 'up'
+                delta = f' <span class="{direction}">{html.escape(str(node.delta))}</span>'
+            return (f'<div class="metric">{html.escape(node.label)}'
+                    f'<b>{html.escape(str(node.value))}</b>{delta}</div>')
+        if kind == 'plotly_chart':
+            self.figures += 1
+            spec = json.loads(re.sub(r'#0000[0-4]\d', lambda m: self.colors.get(m.group(0), m.group(0)),
+                                     node.proto.spec))
+            div = f"figure-{self.figures}"
+            payload = json.dumps(spec).replace('</', '<\\/')
+            return (f'<div id="{div}"></div>\n<script>(function() {{ var f = {payload}; '
+                    f'Plotly.newPlot("{div}", f.data, f.layout, {{displaylogo: false, responsive: true}}); }})();</script>')
+        if kind == 'dataframe':
+            return ''
+        
+        children = [child for child in getattr(node, 'children', {}).values()]
+        inner = [self.node(child) for child in children]
+        inner = [part for part in inner if part]
+        if not inner:
+            return ''
+        if kind == 'flex_container' and children and all(getattr(c, 'type', None) == 'column' for c in children):
+            return '<div class="row">' + "".join(f'<div class="col">{part}</div>' for part in inner) + '</div>'
+        if kind == 'tab':
+            return f"<section><h4>{html.escape(node.label)}</h4>\n" + "\n".join(inner) + "</section>"
+        if kind == 'expander':
+            return f"<details open><summary>{html.escape(node.label)}</summary>\n" + "\n".join(inner) + "</details>"
+        return "\n".join(inner)
+
+def run_page(script: str, role: str):
+    """Run a page script headlessly as a logged-in user of ``role``"""
+    from streamlit.testing.v1 import AppTest
+    
+    app = AppTest.from_file(script, default_timeout=SNAPSHOT_CONFIG['timeout_seconds'])
+    app.session_state['authenticated'] = True
+    app.session_state['username'] = 'snapshot'
+    app.session_state['role'] = role
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{script} failed: {app.exception[0].message}")
+    return app
+
+def render_snapshot(name: str) -> str:
+    """Run one of PAGES and return its snapshot HTML"""
+    script, role, sections = PAGES[name]
+    app = run_page(script, role)
+    body = SnapshotWriter(sections).node(app.main)
+    generated = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>MIND {name.title()} Dashboard - Snapshot {generated}</title>
+<script src="{SNAPSHOT_CONFIG['plotly_js']}"></script>
+<style>{STYLE}</style>
+</head>
+<body>
+<p class="banner">📸 Read-only snapshot generated {generated} · figures are interactive, data is not live</p>
+<h1>MIND {name.title()} Dashboard</h1>
+{body}
+</body>
+</html>
+"""
+
+def _manifest_path() -> Path:
+    return Path(SNAPSHOT_CONFIG['manifest'])
+
+def latest_snapshots() -> dict:
+    """
+    Newest snapshot per page, from the manifest
+    
+    Returns:
+        Dict of page name -> {'url', 'generated'}; empty if none were written
+    """
+    try:
+        return json.loads(_manifest_path().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+def write_snapshots(names: Optional[list] = None) -> dict:
+    """
+    Render snapshots into the static folder and update the manifest
+    
+    File names carry a random token: the static folder is served without
+    login, so a snapshot is only reachable through the link shown to users
+    whose role may open that page. Each render gets a new token and the
+    page's previous files are removed, so an old link stops working at
+    the next render.
+    """
+    folder = Path(SNAPSHOT_CONFIG['folder'])
+    folder.mkdir(parents=True, exist_ok=True)
+    plotly_js = folder / SNAPSHOT_CONFIG['plotly_js']
+    if not plotly_js.exists():
+        plotly_js.write_text(get_plotlyjs(), encoding='utf-8')
+    
+    manifest = latest_snapshots()
+    for name in names or list(PAGES):
+        document = render_snapshot(name)
+        target = folder / f"{name}-{secrets.token_urlsafe(16)}.html"
+        target.write_text(document, encoding='utf-8')
+        
+        for old in folder.glob(f"{name}-*.html"):
+            if old != target:
+                old.unlink(missing_ok=True)
+        
+        url = f"app/static/{target.relative_to(SNAPSHOT_CONFIG['static_root']).as_posix()}"
+        manifest[name] = {'url': url, 'generated': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+    
+    _manifest_path().parent.mkdir(parents=True, exist_ok=True)
+    _manifest_path().write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Render static Admin and Faculty dashboard snapshots")
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), help="Snapshots to render (default: all)")
+    parser.add_argument('--every', type=int, metavar='SECONDS', help="Keep re-rendering at this interval")
+    args = parser.parse_args()
+    
+    while True:
+        started = time.time()
+        try:
+            manifest = write_snapshots(args.pages)
+            for name in args.pages or list(PAGES):
+                print(f"{name}: {manifest[name]['url']}")
+            print(f"Rendered in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            if not args.every:
+                sys.exit(1)
+        if not args.every:
+            break
+        time.sleep(max(args.every - (time.time() - started), 0))
+
+if __name__ == "__main__":
+    main()
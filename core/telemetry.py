@@ -0,0 +1,235 @@
+"""
+Live telemetry tail for MIND Dashboard
+Polls backend_telemetry past a (created_at, telemetry_id) watermark into a
+fixed-size NumPy ring buffer, keeping rolling request, error and latency
+totals up to date as rows enter and leave the window
+"""
+
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+import streamlit as st
+from typing import Optional, Tuple
+from core.db import get_bigquery_client, execute_query, sql_literal
+from core.settings import get_table_ref, TAIL_CONFIG
+
+# Tiebreak for rows sharing a created_at; NULL ids sort first
+TAIL_ID = "COALESCE(CAST(telemetry_id AS STRING), '')"
+
+# Ring buffer columns and their dtypes
+COLUMNS = {
+    'ts': np.int64,             # created_at, microseconds since epoch (UTC)
+    'latency_ms': np.float64,   # NaN when not recorded
+    'is_error': np.bool_,
+    'status': np.int32,         # -1 when not recorded
+    'endpoint': object
+}
+
+class TelemetryTail:
+    """
+    Fixed-size ring buffer of recent telemetry rows
+    
+    Rows are addressed by absolute position (total rows ever appended);
+    slot = position % capacity. Rows arrive in created_at order, so the
+    rolling window is the contiguous run [start, written). Totals are
+    updated only for rows appended or retired on each tick, never by
+    re-aggregating the window.
+    """
+    
+    def __init__(self, capacity: int, window_seconds: float, history_points: int):
+        self.capacity = capacity
+        self.window_us = int(window_seconds * 1_000_000)
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._history = deque(maxlen=history_points)
+        self.reset()
+    
+    def __len__(self):
+        return min(self._written, self.capacity)
+    
+    def reset(self):
+        """Drop all rows and totals, e.g. after nobody watched for a while"""
+        with self._lock:
+            self._written = 0
+            self._start = 0
+            self._totals = {'requests': 0, 'errors': 0, 'latency_sum': 0.0, 'latency_n': 0}
+            self._history.clear()
+            self.watermark = None
+            self.polled_at = 0.0
+    
+    def _slots(self, lo: int, hi: int) -> np.ndarray:
+        return np.arange(lo, hi) % self.capacity
+    
+    def _accumulate(self, slots: np.ndarray, sign: int):
+        """Add (sign=1) or remove (sign=-1) rows from the rolling totals"""
+        latency = self._columns['latency_ms'][slots]
+        recorded = ~np.isnan(latency)
+        self._totals['requests'] += sign * len(slots)
+        self._totals['errors'] += sign * int(np.count_nonzero(self._columns['is_error'][slots]))
+        self._totals['latency_sum'] += sign * float(latency[recorded].sum())
+        self._totals['latency_n'] += sign * int(np.count_nonzero(recorded))
+    
+    def _retire(self, upto: int):
+        """Remove window rows before absolute position ``upto``"""
+        if upto > self._start:
+            self._accumulate(self._slots(self._start, upto), -1)
+            self._start = upto
+    
+    def append(self, rows: dict):
+        """
+        Append rows sorted by ts
+        
+        Args:
+            rows: Column name -> array, one entry per COLUMNS key
+        """
+        n = len(rows['ts'])
+        if n > self.capacity:
+            rows = {name: values[-self.capacity:] for name, values in rows.items()}
+            n = self.capacity
+        if n == 0:
+            return
+        
+        with self._lock:
+            # Rows about to be overwritten leave the window first
+            self._retire(self._written + n - self.capacity)
+            
+            slots = self._slots(self._written, self._written + n)
+            for name, column in self._columns.items():
+                column[slots] = rows[name]
+            self._accumulate(slots, 1)
+            self._written += n
+    
+    def expire(self, now_us: int):
+        """Retire rows older than the window, binary searching the ordered run"""
+        cutoff = now_us - self.window_us
+        ts = self._columns['ts']
+        with self._lock:
+            lo, hi = self._start, self._written
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if ts[mid % self.capacity] < cutoff:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            self._retire(lo)
+    
+    def stats(self) -> dict:
+        """Rolling request rate, error rate and mean latency over the window"""
+        with self._lock:
+            totals = dict(self._totals)
+        minutes = self.window_us / 60_000_000
+        return {
+            'requests': totals['requests'],
+            'errors': totals['errors'],
+            'requests_per_min': totals['requests'] / minutes,
+            'error_rate': totals['errors'] / totals['requests'] * 100 if totals['requests'] else 0.0,
+            'avg_latency_ms': totals['latency_sum'] / totals['latency_n'] if totals['latency_n'] else None
+        }
+    
+    def record_tick(self, at: float):
+        """Append the current stats to the short history behind the live chart"""
+        stats = self.stats()
+        with self._lock:
+            self._history.append((at, stats['requests_per_min'], stats['error_rate'], stats['avg_latency_ms']))
+    
+    def history(self) -> pd.DataFrame:
+        """Stats recorded per poll, oldest first"""
+        with self._lock:
+            points = list(self._history)
+        history = pd.DataFrame(points, columns=['time', 'requests_per_min', 'error_rate', 'avg_latency_ms'])
+        history['time'] = pd.to_datetime(history['time'], unit='s', utc=True)
+        return history
+    
+    def recent(self, limit: int) -> pd.DataFrame:
+        """Newest ``limit`` rows, newest first"""
+        with self._lock:
+            lo = max(self._written - min(limit, len(self)), 0)
+            slots = self._slots(lo, self._written)[::-1]
+            frame = pd.DataFrame({name: column[slots] for name, column in self._columns.items()})
+        
+        frame['ts'] = pd.to_datetime(frame['ts'], unit='us', utc=True)
+        frame['status'] = frame['status'].where(frame['status'] >= 0)
+        return frame.rename(columns={'ts': 'created_at'})
+
+def _to_columns(rows: pd.DataFrame) -> dict:
+    """Query rows -> ring buffer column arrays"""
+    created = pd.to_datetime(rows['created_at'], utc=True).dt.tz_convert(None)
+    return {
+        'ts': created.to_numpy('datetime64[us]').astype(np.int64),
+        'latency_ms': pd.to_numeric(rows['latency_ms'], errors='coerce').to_numpy(np.float64),
+        'is_error': rows['is_error'].fillna(False).to_numpy(bool),
+        'status': pd.to_numeric(rows['status'], errors='coerce').fillna(-1).to_numpy(np.int32),
+        'endpoint': rows['endpoint'].to_numpy(object)
+    }
+
+def _tail_query(watermark: Optional[Tuple[int, str]], window_seconds: int, limit: int) -> str:
+    """New telemetry rows in (created_at, telemetry_id) order: after the watermark, or the last window on a cold start"""
+    if watermark is None:
+        where = f"created_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {int(window_seconds)} SECOND)"
+    else:
+        # Keyset on (created_at, id): rows sharing the watermark timestamp are
+        # neither skipped nor fetched twice, however many there are
+        since = sql_literal(pd.Timestamp(watermark[0], unit='us', tz='UTC').to_pydatetime())
+        where = (f"(created_at > {since} OR (created_at = {since} "
+                 f"AND {TAIL_ID} > {sql_literal(watermark[1])}))")
+    return f"""
+    SELECT {TAIL_ID} as telemetry_id, created_at,
+           derived_response_time_ms as latency_ms, derived_is_error as is_error,
+           http_status_code as status, derived_endpoint_group as endpoint
+    FROM {get_table_ref('backend_telemetry')}
+    WHERE {where}
+    ORDER BY created_at, telemetry_id
+    LIMIT {int(limit)}
+    """
+
+@st.cache_resource
+def get_telemetry_tail() -> TelemetryTail:
+    """Process-wide ring buffer shared by all sessions watching live mode"""
+    return TelemetryTail(TAIL_CONFIG['capacity'], TAIL_CONFIG['window_seconds'], TAIL_CONFIG['history_points'])
+
+def poll_telemetry_tail(tail: Optional[TelemetryTail] = None) -> TelemetryTail:
+    """
+    Fetch rows newer than the watermark, at most once per TAIL_CONFIG['poll_seconds']
+    
+    Only called from the live fragment, so polling stops by itself when no
+    session has live mode open. A tail left unwatched for longer than the
+    window is reset and starts again from the last window.
+    """
+    if tail is None:
+        tail = get_telemetry_tail()
+    
+    now = time.time()
+    if tail.polled_at and now - tail.polled_at < TAIL_CONFIG['poll_seconds']:
+        return tail
+    
+    # Another session is already polling; serve the current buffer
+    if not tail.refresh_lock.acquire(blocking=False):
+        return tail
+    
+    try:
+        if tail.polled_at and now - tail.polled_at > TAIL_CONFIG['window_seconds']:
+            tail.reset()
+        
+        client = get_bigquery_client()
+        if client is None:
+            return tail
+        
+        query = _tail_query(tail.watermark, TAIL_CONFIG['window_seconds'], TAIL_CONFIG['max_rows_per_poll'])
+        rows = execute_query(query, client)
+        if rows is not None:
+            rows = rows[rows['created_at'].notna()]
+            columns = _to_columns(rows)
+            tail.append(columns)
+            if len(columns['ts']):
+                tail.watermark = (int(columns['ts'][-1]), rows['telemetry_id'].iloc[-1])
+        
+        tail.expire(int(now * 1_000_000))
+        tail.record_tick(now)
+        tail.polled_at = now
+    finally:
+        tail.refresh_lock.release()
+    
+    return tail
@@ -147,14 +147,17 @@ def apply_theme_css():
     st.markdown(css, unsafe_allow_html=True)
 
 def render_theme_toggle():
-    """Render theme toggle button in sidebar"""
+    """
+    Render theme toggle button in sidebar
+    
+    The theme is flipped in the click callback, before the rerun, so one
+    rerun restyles the app instead of a rerun followed by st.rerun().
+    """
     theme = get_current_theme()
     icon = "🌙" if theme == 'light' else "☀️"
     label = "Dark Mode" if theme == 'light' else "Light Mode"
     
-    if st.button(f"{icon} {label}", key="theme_toggle", use_container_width=True):
-        toggle_theme()
-        st.rerun()
+    st.button(f"{icon} {label}", key="theme_toggle", on_click=toggle_theme, use_container_width=True)
 
 def get_theme_colors():
     """Get color scheme based on current theme"""
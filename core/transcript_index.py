@@ -0,0 +1,292 @@
+"""
+Full-text transcript index for MIND Dashboard
+Conversation transcripts are copied incrementally (by timestamp) into a
+local SQLite FTS5 index, so transcript searches return matching
+conversations with snippets without touching BigQuery
+
+Build or catch up from the command line (pages otherwise build a missing
+index in a background thread):
+    python -m core.transcript_index
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from core.db import get_bigquery_client, execute_query, record_query, sql_literal
+from core.settings import get_table_ref, TRANSCRIPT_INDEX_CONFIG
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    rowid INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL UNIQUE,
+    user TEXT,
+    case_study TEXT,
+    ts INTEGER NOT NULL,
+    transcript TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_ts ON transcripts (ts, conversation_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcript_fts USING fts5(
+    transcript, content='transcripts', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcript_fts (rowid, transcript) VALUES (new.rowid, new.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_ad AFTER DELETE ON transcripts BEGIN
+    INSERT INTO transcript_fts (transcript_fts, rowid, transcript) VALUES ('delete', old.rowid, old.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS transcripts_au AFTER UPDATE ON transcripts BEGIN
+    INSERT INTO transcript_fts (transcript_fts, rowid, transcript) VALUES ('delete', old.rowid, old.transcript);
+    INSERT INTO transcript_fts (rowid, transcript) VALUES (new.rowid, new.transcript);
+END;
+"""
+
+def match_expression(text: str) -> Optional[str]:
+    """
+    Turn a search box entry into an FTS5 query
+    
+    Words are matched as terms (all must appear), "quoted text" as a phrase
+    and a trailing * as a prefix. FTS5 operators typed by the user are
+    treated as plain words, so no input can make the query invalid.
+    
+    Returns:
+        MATCH expression, or None if the input has no searchable text
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        prefix = word.endswith('*')
+        term = (phrase or word.rstrip('*')).strip()
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms) or None
+
+class TranscriptIndex:
+    """
+    SQLite FTS5 index over conversation transcripts
+    
+    Transcripts are kept once in a content table; the FTS5 table holds only
+    the positional inverted index and is maintained by triggers, so
+    re-indexing a conversation is a single upsert.
+    """
+    
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.refreshed_at = 0.0
+        self.building = False
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+    
+    def watermark(self) -> Optional[Tuple[int, str]]:
+        """(timestamp in µs, conversation_id) of the newest indexed conversation"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts, conversation_id FROM transcripts ORDER BY ts DESC, conversation_id DESC LIMIT 1"
+            ).fetchone()
+        return tuple(row) if row else None
+    
+    def upsert(self, rows: pd.DataFrame):
+        """
+        Add or re-index conversations
+        
+        Args:
+            rows: conversation_id, user, case_study, ts (µs) and transcript columns
+        """
+        rows = rows[['conversation_id', 'user', 'case_study', 'ts', 'transcript']]
+        records = list(rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO transcripts (conversation_id, user, case_study, ts, transcript) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (conversation_id) DO UPDATE SET user = excluded.user, "
+                    "case_study = excluded.case_study, ts = excluded.ts, transcript = excluded.transcript",
+                    records
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def search(self, text: str, limit: Optional[int] = None, user: Optional[str] = None,
+               case_study: Optional[str] = None) -> pd.DataFrame:
+        """
+        Conversations whose transcript matches ``text``, best match first
+        
+        Args:
+            text: Search box entry (see match_expression)
+            limit: Maximum results (TRANSCRIPT_INDEX_CONFIG['max_results'] by default)
+            user: Restrict to one learner
+            case_study: Restrict to one case study
+        
+        Returns:
+            DataFrame with conversation_id, user, case_study, timestamp and snippet
+        """
+        columns = ['conversation_id', 'user', 'case_study', 'timestamp', 'snippet']
+        expression = match_expression(text)
+        if expression is None:
+            return pd.DataFrame(columns=columns)
+        
+        conditions, params = ["transcript_fts MATCH ?"], [expression]
+        if user:
+            conditions.append("t.user = ?")
+            params.append(user)
+        if case_study:
+            conditions.append("t.case_study = ?")
+            params.append(case_study)
+        params.append(limit or TRANSCRIPT_INDEX_CONFIG['max_results'])
+        
+        query = f"""
+        SELECT t.conversation_id, t.user, t.case_study, t.ts,
+               snippet(transcript_fts, 0, '«', '»', ' … ', {int(TRANSCRIPT_INDEX_CONFIG['snippet_tokens'])})
+        FROM transcript_fts JOIN transcripts t ON t.rowid = transcript_fts.rowid
+        WHERE {' AND '.join(conditions)}
+        ORDER BY bm25(transcript_fts)
+        LIMIT ?
+        """
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        
+        results = pd.DataFrame(rows, columns=['conversation_id', 'user', 'case_study', 'ts', 'snippet'])
+        results['timestamp'] = pd.to_datetime(results['ts'], unit='us', utc=True)
+        return results[columns]
+
+def _transcripts_query(after: Optional[Tuple[int, str]], limit: Optional[int] = None) -> str:
+    """Conversations in (timestamp, conversation_id) order after a watermark, at most ``limit``"""
+    ts = "COALESCE(timestamp, TIMESTAMP '1970-01-01')"
+    where = "transcript IS NOT NULL AND conversation_id IS NOT NULL"
+    if after is not None:
+        watermark = sql_literal(pd.Timestamp(after[0], unit='us', tz='UTC').to_pydatetime())
+        # Keyset on (timestamp, id): rows sharing the watermark timestamp are
+        # neither skipped nor fetched twice
+        where += (f" AND ({ts} > {watermark} OR ({ts} = {watermark} "
+                  f"AND CAST(conversation_id AS STRING) > {sql_literal(after[1])}))")
+    return f"""
+    SELECT CAST(conversation_id AS STRING) as conversation_id,
+           CAST(user AS STRING) as user, CAST(case_study AS STRING) as case_study,
+           UNIX_MICROS({ts}) as ts, CAST(transcript AS STRING) as transcript
+    FROM {get_table_ref('conversation')}
+    WHERE {where}
+    ORDER BY ts, conversation_id
+    {f"LIMIT {int(limit)}" if limit else ""}
+    """
+
+def read_transcript_batches(after: Optional[Tuple[int, str]], client=None,
+                            page_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream every conversation after a watermark from one ordered scan
+    
+    The query runs once; its result is read page by page, so a backfill
+    bills one scan of the transcript column instead of one per batch.
+    
+    Yields:
+        DataFrames of TRANSCRIPT_INDEX_CONFIG['page_size'] rows in index order
+    """
+    client = client or get_bigquery_client()
+    query = _transcripts_query(after)
+    record_query(query)
+    rows = client.query(query).result(page_size=page_size or TRANSCRIPT_INDEX_CONFIG['page_size'])
+    yield from rows.to_dataframe_iterable()
+
+@st.cache_resource
+def get_transcript_index() -> TranscriptIndex:
+    """Process-wide transcript index shared by all sessions"""
+    return TranscriptIndex(TRANSCRIPT_INDEX_CONFIG['path'])
+
+def _backfill(index: TranscriptIndex, client) -> int:
+    """Index everything after the watermark; the caller holds refresh_lock"""
+    indexed = 0
+    for rows in read_transcript_batches(index.watermark(), client):
+        if not rows.empty:
+            index.upsert(rows)
+            indexed += len(rows)
+    index.refreshed_at = time.time()
+    return indexed
+
+def start_backfill(index: TranscriptIndex, client) -> bool:
+    """
+    Catch the index up in a background thread
+    
+    Returns:
+        False if indexing is already running
+    """
+    if not index.refresh_lock.acquire(blocking=False):
+        return False
+    
+    def run():
+        index.building = True
+        try:
+            _backfill(index, client)
+        finally:
+            index.building = False
+            index.refresh_lock.release()
+    
+    threading.Thread(target=run, name="transcript-backfill", daemon=True).start()
+    return True
+
+def refresh_transcript_index(index: Optional[TranscriptIndex] = None, force: bool = False) -> TranscriptIndex:
+    """
+    Index conversations added since the newest indexed one
+    
+    Runs at most once per TRANSCRIPT_INDEX_CONFIG['refresh_seconds'] and
+    fetches at most TRANSCRIPT_INDEX_CONFIG['batch_rows'] new transcripts.
+    An empty index, or one further behind than that, is caught up by
+    start_backfill in a background thread, so searches never wait for it.
+    """
+    if index is None:
+        index = get_transcript_index()
+    
+    age = time.time() - index.refreshed_at
+    if not force and index.refreshed_at and age < TRANSCRIPT_INDEX_CONFIG['refresh_seconds']:
+        return index
+    
+    client = get_bigquery_client()
+    if client is None:
+        return index
+    
+    if index.watermark() is None:
+        start_backfill(index, client)
+        return index
+    
+    # Another session (or a backfill) is already indexing; search the current index
+    if not index.refresh_lock.acquire(blocking=False):
+        return index
+    
+    batch = TRANSCRIPT_INDEX_CONFIG['batch_rows']
+    try:
+        rows = execute_query(_transcripts_query(index.watermark(), batch), client)
+        if rows is None:
+            return index
+        if not rows.empty:
+            index.upsert(rows)
+        index.refreshed_at = time.time()
+    finally:
+        index.refresh_lock.release()
+    
+    if len(rows) >= batch:
+        start_backfill(index, client)
+    return index
+
+if __name__ == "__main__":
+    started = time.time()
+    client = get_bigquery_client()
+    if client is None:
+        print("Error: no BigQuery connection")
+        raise SystemExit(1)
+    index = get_transcript_index()
+    with index.refresh_lock:
+        indexed = _backfill(index, client)
+    print(f"Indexed {indexed:,} new conversations ({len(index):,} total) in {time.time() - started:.1f}s "
+          f"({TRANSCRIPT_INDEX_CONFIG['path']})")
@@ -0,0 +1,210 @@
+"""
+Daily distinct-count sketches for MIND Dashboard
+One HyperLogLog register row per table per day, built in BigQuery and
+merged locally, so DAU/WAU/MAU, rolling uniques and funnel stages cost
+the same however much history the tables hold
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from datetime import date, timedelta
+from typing import Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from core.db import get_bigquery_client, execute_query, sql_literal
+from core.settings import TABLES, get_table_ref, UNIQUES_CONFIG
+from core.sketches import hll_estimate, hll_merge, hll_standard_error
+
+# Sketched source -> (table, column counted); days come from the table's time_column
+SOURCES = {
+    'registered': ('user', 'user_id'),
+    'sessions': ('sessions', '_id'),
+    'conversations': ('conversation', 'user'),
+    'graded': ('grades', 'user')
+}
+
+EPOCH = date(1970, 1, 1)
+
+def _day_number(day) -> int:
+    return (pd.Timestamp(day).date() - EPOCH).days
+
+class UniqueSketches:
+    """
+    Per-source daily HyperLogLog registers
+    
+    Each source holds a (days, 2**precision) uint8 register matrix for the
+    days that have rows, plus its running element-wise max, so all-time
+    uniques are a single row and any window is a max over at most that
+    many rows.
+    """
+    
+    def __init__(self, precision: int):
+        self.precision = precision
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._state = {source: self._empty() for source in SOURCES}
+        self.refreshed_at = 0.0
+    
+    def _empty(self) -> dict:
+        registers = np.zeros((0, 1 << self.precision), dtype=np.uint8)
+        return {'day': np.zeros(0, dtype=np.int32), 'registers': registers, 'cumulative': registers}
+    
+    @property
+    def standard_error(self) -> float:
+        return hll_standard_error(self.precision)
+    
+    def last_day(self, source: str) -> Optional[int]:
+        """Newest day held for a source, as days since epoch"""
+        with self._lock:
+            days = self._state[source]['day']
+        return int(days[-1]) if len(days) else None
+    
+    def load(self, source: str, rows: pd.DataFrame, since_day: int):
+        """
+        Replace days >= since_day with ``rows`` (day, idx, rank register maxima)
+        """
+        with self._lock:
+            state = self._state[source]
+        
+        days = pd.to_datetime(rows['day']).to_numpy('datetime64[D]').astype(np.int32)
+        new_days, row = np.unique(days, return_inverse=True)
+        registers = np.zeros((len(new_days), 1 << self.precision), dtype=np.uint8)
+        np.maximum.at(registers, (row, rows['idx'].to_numpy(np.int64)), rows['rank'].to_numpy(np.uint8))
+        
+        keep = state['day'] < since_day
+        day = np.concatenate([state['day'][keep], new_days])
+        registers = np.concatenate([state['registers'][keep], registers])
+        cumulative = np.maximum.accumulate(registers, axis=0) if len(day) else registers
+        
+        with self._lock:
+            self._state[source] = {'day': day, 'registers': registers, 'cumulative': cumulative}
+    
+    def total(self, source: str, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        Estimated distinct values over [start, end] (inclusive days)
+        
+        Without bounds this reads the last running-max row, so it does not
+        grow with history.
+        """
+        with self._lock:
+            state = self._state[source]
+        if len(state['day']) == 0:
+            return 0
+        
+        if start is None and end is None:
+            merged = state['cumulative'][-1]
+        else:
+            lo = np.searchsorted(state['day'], _day_number(start) if start else np.iinfo(np.int32).min)
+            hi = np.searchsorted(state['day'], _day_number(end), side='right') if end else len(state['day'])
+            if start is None:
+                merged = state['cumulative'][hi - 1] if hi else np.zeros(state['registers'].shape[1], np.uint8)
+            else:
+                merged = hll_merge(state['registers'][lo:hi])
+        return int(np.rint(hll_estimate(merged)[0]))
+    
+    def rolling(self, source: str, start: date, end: date, window: int = 1) -> pd.DataFrame:
+        """
+        Distinct values in the ``window`` days ending on each day
+        
+        window=1 gives daily uniques (DAU), 7 weekly (WAU), 30 monthly (MAU).
+        
+        Returns:
+            DataFrame with day and uniques, one row per calendar day in [start, end]
+        """
+        with self._lock:
+            state = self._state[source]
+        
+        first, last = _day_number(start) - (window - 1), _day_number(end)
+        calendar = np.zeros((max(last - first + 1, 0), state['registers'].shape[1]), dtype=np.uint8)
+        held = (state['day'] >= first) & (state['day'] <= last)
+        calendar[state['day'][held] - first] = state['registers'][held]
+        
+        if len(calendar) >= window:
+            merged = sliding_window_view(calendar, window, axis=0).max(axis=-1)
+            uniques = np.rint(hll_estimate(merged)).astype(np.int64)
+        else:
+            uniques = np.zeros(0, dtype=np.int64)
+        
+        days = [EPOCH + timedelta(days=int(d)) for d in range(first + window - 1, last + 1)]
+        return pd.DataFrame({'day': days, 'uniques': uniques})
+
+def _registers_query(source: str, precision: int, since: Optional[date] = None) -> str:
+    """
+    HyperLogLog register maxima per day for a source
+    
+    Values are hashed with FARM_FINGERPRINT; the top ``precision`` bits pick
+    the register and the rank is the leading-zero count of the remaining
+    bits plus one. The bit length is a LOG2 estimate corrected by one step
+    either way, so it is exact for every 64-bit value.
+    """
+    table_name, column = SOURCES[source]
+    time_column = TABLES[table_name]['time_column']
+    tail_bits = 64 - precision
+    where = f"{column} IS NOT NULL"
+    if since is not None:
+        where += f" AND {time_column} >= {sql_literal(pd.Timestamp(since).to_pydatetime())}"
+    return f"""
+    WITH hashed AS (
+        SELECT
+            DATE(COALESCE({time_column}, TIMESTAMP '1970-01-01')) as day,
+            FARM_FINGERPRINT(CAST({column} AS STRING)) as h
+        FROM {get_table_ref(table_name)}
+        WHERE {where}
+    ),
+    split AS (
+        SELECT day, (h >> {tail_bits}) & {(1 << precision) - 1} as idx, h & {(1 << tail_bits) - 1} as tail
+        FROM hashed
+    ),
+    estimated AS (
+        SELECT day, idx, tail, CAST(FLOOR(LOG(GREATEST(tail, 1), 2)) AS INT64) + 1 as approx
+        FROM split
+    )
+    SELECT day, idx,
+           MAX({tail_bits + 1} - IF(tail = 0, 0,
+               approx + IF(tail >= (1 << approx), 1, 0) - IF(tail < (1 << (approx - 1)), 1, 0))) as rank
+    FROM estimated
+    GROUP BY day, idx
+    """
+
+@st.cache_resource
+def get_unique_sketches() -> UniqueSketches:
+    """Process-wide sketches shared by all sessions"""
+    return UniqueSketches(UNIQUES_CONFIG['precision'])
+
+def refresh_unique_sketches(sketches: Optional[UniqueSketches] = None, force: bool = False) -> UniqueSketches:
+    """
+    Bring the shared sketches up to date
+    
+    The first call sketches each source's full history; later calls (at
+    most once per UNIQUES_CONFIG['refresh_seconds']) re-sketch only the
+    newest held day and anything after it.
+    """
+    if sketches is None:
+        sketches = get_unique_sketches()
+    
+    age = time.time() - sketches.refreshed_at
+    if not force and sketches.refreshed_at and age < UNIQUES_CONFIG['refresh_seconds']:
+        return sketches
+    
+    # Another session is already refreshing; serve the current sketches
+    if not sketches.refresh_lock.acquire(blocking=False):
+        return sketches
+    
+    try:
+        client = get_bigquery_client()
+        if client is None:
+            return sketches
+        
+        for source in SOURCES:
+            last_day = sketches.last_day(source)
+            since = None if last_day is None else EPOCH + timedelta(days=last_day)
+            rows = execute_query(_registers_query(source, sketches.precision, since), client)
+            if rows is not None:
+                sketches.load(source, rows, last_day if last_day is not None else np.iinfo(np.int32).min)
+        sketches.refreshed_at = time.time()
+    finally:
+        sketches.refresh_lock.release()
+    
+    return sketches
@@ -0,0 +1,218 @@
+"""
+In-memory user search index for MIND Dashboard
+Sorted name/email arrays with prefix and substring lookup, refreshed
+incrementally from the user table's date_updated column
+"""
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from typing import Optional
+from core.db import get_bigquery_client, execute_query, sql_literal
+from core.settings import get_table_ref, USER_INDEX_CONFIG
+
+# Roles the student selector should list (NULL role counts as student)
+STUDENT_ROLES = ('student', None)
+
+class UserIndex:
+    """
+    Searchable snapshot of the user dimension
+    
+    Rows are kept sorted by lower-cased name, so row order is alphabetical
+    order. Lookups use two structures built once per refresh:
+    
+    - a sorted token array (full name, each name word, email, email local
+      part) answered with np.searchsorted for prefix matches
+    - one concatenated lower-case haystack scanned with str.find for
+      substring matches, stopping as soon as enough rows are found
+    """
+    
+    COLUMNS = ['user_id', 'name', 'email', 'updated_at']
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self._users = pd.DataFrame(columns=self.COLUMNS)
+        self._state = self._build(self._users)
+        self.watermark = None
+        self.refreshed_at = 0.0
+    
+    def __len__(self):
+        return len(self._users)
+    
+    @staticmethod
+    def _build(users: pd.DataFrame) -> dict:
+        """Build the lookup arrays for a user frame"""
+        users = users.copy()
+        users['name'] = users['name'].fillna('').astype(str)
+        users['email'] = users['email'].fillna('').astype(str)
+        users = users.sort_values('name', key=lambda s: s.str.lower(), kind='stable')
+        users = users.reset_index(drop=True)
+        
+        names_lc = users['name'].str.lower().to_numpy(dtype=object)
+        emails_lc = users['email'].str.lower().to_numpy(dtype=object)
+        
+        tokens, token_rows = [], []
+        for row, (name, email) in enumerate(zip(names_lc, emails_lc)):
+            keys = {name, email, email.split('@')[0], *name.split()}
+            keys.discard('')
+            tokens.extend(keys)
+            token_rows.extend([row] * len(keys))
+        
+        # Object dtype: a fixed-width str array would pad every token to the
+        # longest name or email
+        tokens = np.array(tokens, dtype=object)
+        token_rows = np.array(token_rows, dtype=np.int64)
+        order = np.argsort(tokens, kind='stable')
+        
+        lines = [f"{name}\t{email}" for name, email in zip(names_lc, emails_lc)]
+        lengths = np.fromiter((len(line) + 1 for line in lines), dtype=np.int64, count=len(lines))
+        
+        return {
+            'sorted': users,
+            'tokens': tokens[order],
+            'token_rows': token_rows[order],
+            'haystack': "\n".join(lines),
+            'offsets': np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lines) else np.array([0])
+        }
+    
+    def _swap(self, users: pd.DataFrame, watermark):
+        """Build new arrays outside the lock, then publish them atomically"""
+        state = self._build(users)
+        with self._lock:
+            self._users = users
+            self._state = state
+            self.watermark = watermark
+            self.refreshed_at = time.time()
+    
+    def load(self, users: pd.DataFrame):
+        """Replace the index contents with a full snapshot"""
+        users = users[self.COLUMNS].drop_duplicates('user_id', keep='last')
+        self._swap(users, users['updated_at'].max() if not users.empty else None)
+    
+    def apply_changes(self, changes: pd.DataFrame, keep: pd.Series):
+        """
+        Merge changed user rows into the index
+        
+        Args:
+            changes: Rows updated since the watermark (all roles)
+            keep: Boolean mask over ``changes``; False rows are removed
+                  (e.g. users whose role is no longer student)
+        """
+        if changes.empty:
+            self.refreshed_at = time.time()
+            return
+        
+        remaining = self._users[~self._users['user_id'].isin(changes['user_id'])]
+        users = pd.concat([remaining, changes.loc[keep, self.COLUMNS]], ignore_index=True)
+        watermark = max(filter(pd.notna, [self.watermark, changes['updated_at'].max()]), default=None)
+        self._swap(users, watermark)
+    
+    def snapshot(self) -> pd.DataFrame:
+        """Current user rows (user_id, name, email, updated_at)"""
+        with self._lock:
+            return self._users
+    
+    def search(self, query: str, limit: int = 20) -> pd.DataFrame:
+        """
+        Find users whose name or email matches ``query``
+        
+        Word/email prefix matches rank first, then substring matches, each in
+        alphabetical order. An empty query returns the first users by name.
+        
+        Returns:
+            DataFrame with user_id, name and email (at most ``limit`` rows)
+        """
+        with self._lock:
+            state = self._state
+        users, tokens, token_rows = state['sorted'], state['tokens'], state['token_rows']
+        haystack, offsets = state['haystack'], state['offsets']
+        
+        query = (query or '').strip().lower()
+        if not query:
+            return users[['user_id', 'name', 'email']].head(limit)
+        
+        lo = np.searchsorted(tokens, query, side='left')
+        hi = np.searchsorted(tokens, query + '\uffff', side='left')
+        prefix_rows = np.unique(token_rows[lo:hi])[:limit]
+        
+        rows = list(prefix_rows)
+        if len(rows) < limit:
+            # Haystack order is alphabetical, so the first hits are the best
+            seen = set(rows)
+            pos = haystack.find(query)
+            while pos != -1 and len(rows) < limit:
+                row = int(np.searchsorted(offsets, pos, side='right') - 1)
+                if row not in seen:
+                    rows.append(row)
+                    seen.add(row)
+                # Continue from the start of the next row
+                next_start = offsets[row + 1] if row + 1 < len(offsets) else len(haystack)
+                pos = haystack.find(query, next_start)
+        
+        return users.iloc[rows][['user_id', 'name', 'email']]
+
+def _student_users_query(since=None) -> str:
+    """Query for user rows, optionally only those changed at or after ``since``"""
+    updated = "COALESCE(date_updated, date_added)"
+    if since is None:
+        where = "WHERE LOWER(role) = 'student' OR role IS NULL"
+    else:
+        # All roles, so users moved out of the student role can be dropped;
+        # >= re-reads the watermark instant, catching rows that arrived with
+        # the same timestamp after the last fetch (apply_changes is idempotent)
+        where = f"WHERE {updated} >= {sql_literal(pd.Timestamp(since).to_pydatetime())}"
+    return f"""
+    SELECT user_id, name, email, role, {updated} as updated_at
+    FROM {get_table_ref('user')}
+    {where}
+    """
+
+@st.cache_resource
+def get_user_index() -> UserIndex:
+    """Process-wide student index shared by all sessions"""
+    return UserIndex()
+
+def refresh_user_index(index: Optional[UserIndex] = None, force: bool = False) -> UserIndex:
+    """
+    Bring the shared index up to date
+    
+    The first call loads every student; later calls (at most once per
+    USER_INDEX_CONFIG['refresh_seconds']) fetch only rows whose
+    date_updated/date_added is at or after the index watermark.
+    """
+    if index is None:
+        index = get_user_index()
+    
+    age = time.time() - index.refreshed_at
+    if not force and index.refreshed_at and age < USER_INDEX_CONFIG['refresh_seconds']:
+        return index
+    
+    # Another session is already refreshing; serve the current snapshot
+    if not index.refresh_lock.acquire(blocking=False):
+        return index
+    
+    try:
+        _refresh(index)
+    finally:
+        index.refresh_lock.release()
+    
+    return index
+
+def _refresh(index: UserIndex):
+    """Run one full or incremental load into ``index``"""
+    client = get_bigquery_client()
+    if client is None:
+        return
+    
+    if not index.refreshed_at or index.watermark is None:
+        users = execute_query(_student_users_query(), client)
+        if users is not None:
+            index.load(users)
+    else:
+        changes = execute_query(_student_users_query(since=index.watermark), client)
+        if changes is not None:
+            roles = changes['role'].str.lower()
+            index.apply_changes(changes, keep=roles.isna() | roles.isin([r for r in STUDENT_ROLES if r]))
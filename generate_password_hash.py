@@ -2,25 +2,166 @@
 """
 Password Hash Generator for MIND Dashboard
 Generates bcrypt password hashes for user authentication
+
+Single password:
+    python generate_password_hash.py [password]
+
+Bulk provisioning from a CSV with username, role and (optional) password
+columns, hashed in parallel across all cores:
+    python generate_password_hash.py --bulk users.csv --out users.toml
 """
 
+import argparse
 import bcrypt
+import csv
+import os
+import re
+import secrets
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core.rbac import ROLE_PERMISSIONS
+
+DEFAULT_ROUNDS = 12
 
-def generate_hash(password):
+def generate_hash(password, rounds=DEFAULT_ROUNDS):
     """Generate bcrypt hash for a password"""
-    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
     return hashed.decode('utf-8')
 
-def main():
+def _hash_entry(entry):
+    """Worker: (username, role, password, rounds) -> (username, role, hash)"""
+    username, role, password, rounds = entry
+    return username, role, generate_hash(password, rounds)
+
+def toml_key(name):
+    """Bare TOML key when possible, quoted otherwise"""
+    if re.fullmatch(r'[A-Za-z0-9_-]+', name):
+        return name
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def read_users(path, generate_missing):
+    """
+    Read username, role, password rows from a CSV file
+    
+    Returns:
+        List of (username, role, password, generated) tuples
+    """
+    roles = {role.lower(): role for role in ROLE_PERMISSIONS}
+    users, seen = [], set()
+    
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = {'username', 'role'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+        
+        for line, row in enumerate(reader, start=2):
+            username = (row.get('username') or '').strip()
+            role = roles.get((row.get('role') or '').strip().lower())
+            password = row.get('password') or ''
+            
+            if not username:
+                raise ValueError(f"Line {line}: empty username")
+            if username in seen:
+                raise ValueError(f"Line {line}: duplicate username '{username}'")
+            if role is None:
+                raise ValueError(f"Line {line}: unknown role '{row.get('role')}' "
+                                 f"(expected one of {', '.join(ROLE_PERMISSIONS)})")
+            
+            generated = False
+            if not password:
+                if not generate_missing:
+                    raise ValueError(f"Line {line}: no password for '{username}' "
+                                     "(use --generate-passwords)")
+                password, generated = secrets.token_urlsafe(12), True
+            
+            seen.add(username)
+            users.append((username, role, password, generated))
+    
+    return users
+
+def bulk_hash(users, rounds, workers):
+    """Hash all passwords in a process pool, printing progress"""
+    entries = [(username, role, password, rounds) for username, role, password, _ in users]
+    total = len(entries)
+    chunksize = max(1, min(32, total // (workers * 8) or 1))
+    results = []
+    started = time.time()
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for done, result in enumerate(executor.map(_hash_entry, entries, chunksize=chunksize), start=1):
+            results.append(result)
+            if done == total or done % max(1, total // 100) == 0:
+                elapsed = time.time() - started
+                rate = done / elapsed if elapsed else 0
+                remaining = (total - done) / rate if rate else 0
+                print(f"\rHashed {done}/{total} ({rate:.1f}/s, ~{remaining:.0f}s left)",
+                      end='', file=sys.stderr, flush=True)
+    
+    print(file=sys.stderr)
+    return results
+
+def open_private(path, newline=None):
+    """Open a file for writing that only the current user can read"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # The mode above only applies to new files; tighten existing ones too
+    if hasattr(os, 'fchmod'):
+        os.fchmod(fd, 0o600)
+    return os.fdopen(fd, 'w', newline=newline, encoding='utf-8')
+
+def write_toml(results, path, session_secret=False):
+    """Write a [users.*] secrets fragment (owner-readable only)"""
+    with open_private(path) as f:
+        f.write("# Generated by generate_password_hash.py - merge into .streamlit/secrets.toml\n")
+        if session_secret:
+            f.write(f'\n[auth]\nsession_secret = "{secrets.token_urlsafe(32)}"\n')
+        for username, role, hashed in results:
+            f.write(f'\n[users.{toml_key(username)}]\nrole = "{role}"\npassword_hash = "{hashed}"\n')
+
+def write_credentials(users, path):
+    """Write generated passwords so they can be handed out (owner-readable only)"""
+    with open_private(path, newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['username', 'role', 'password'])
+        for username, role, password, generated in users:
+            if generated:
+                writer.writerow([username, role, password])
+
+def run_bulk(args):
+    try:
+        users = read_users(args.bulk, args.generate_passwords)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if not users:
+        print("Error: CSV contains no users")
+        sys.exit(1)
+    
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Hashing {len(users)} passwords with cost {args.rounds} on {workers} worker(s)...")
+    started = time.time()
+    results = bulk_hash(users, args.rounds, workers)
+    
+    write_toml(results, args.out, args.session_secret)
+    print(f"Wrote {len(results)} users to {args.out} in {time.time() - started:.1f}s")
+    
+    generated = sum(1 for user in users if user[3])
+    if generated:
+        write_credentials(users, args.passwords_out)
+        print(f"Wrote {generated} generated password(s) to {args.passwords_out} - share securely, then delete")
+
+def run_single(args):
     print("=" * 60)
     print("MIND Dashboard - Password Hash Generator")
     print("=" * 60)
     print()
     
-    if len(sys.argv) > 1:
+    if args.password:
         # Password provided as argument
-        password = sys.argv[1]
+        password = args.password
         print(f"Generating hash for provided password...")
     else:
         # Interactive mode
@@ -31,7 +172,7 @@ def main():
         sys.exit(1)
     
     print("\nGenerating hash...")
-    hash_result = generate_hash(password)
+    hash_result = generate_hash(password, args.rounds)
     
     print("\n" + "=" * 60)
     print("RESULT:")
@@ -50,5 +191,29 @@ password_hash = "{hash_result}"
     
     print("\n" + "=" * 60)
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate bcrypt password hashes for MIND Dashboard")
+    parser.add_argument('password', nargs='?', help="Password to hash (prompted if omitted)")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                        help=f"bcrypt cost factor, 4-31 (default {DEFAULT_ROUNDS})")
+    parser.add_argument('--bulk', metavar='CSV', help="CSV with username, role and optional password columns")
+    parser.add_argument('--out', default='users.toml', help="TOML fragment to write in bulk mode")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: all cores)")
+    parser.add_argument('--generate-passwords', action='store_true',
+                        help="Generate passwords for rows without one")
+    parser.add_argument('--passwords-out', default='generated_passwords.csv',
+                        help="Where generated passwords are written")
+    parser.add_argument('--session-secret', action='store_true',
+                        help="Also write an [auth] session_secret for session tokens")
+    args = parser.parse_args()
+    
+    if not 4 <= args.rounds <= 31:
+        parser.error("--rounds must be between 4 and 31")
+    
+    if args.bulk:
+        run_bulk(args)
+    else:
+        run_single(args)
+
 if __name__ == "__main__":
     main()
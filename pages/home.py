@@ -65,24 +65,36 @@ def render():
         {
             'title': 'Total Users',
             'value': f"{total_users:,}",
+            'raw': total_users,
+            'key': 'home.users',
+            'delta_format': "{:+,.0f}",
             'icon': '👥',
             'help_text': 'Total registered users'
         },
         {
             'title': 'Case Studies',
             'value': f"{total_cases:,}",
+            'raw': total_cases,
+            'key': 'home.cases',
+            'delta_format': "{:+,.0f}",
             'icon': '📚',
             'help_text': 'Available learning scenarios'
         },
         {
             'title': 'Learning Sessions',
             'value': f"{total_sessions:,}",
+            'raw': total_sessions,
+            'key': 'home.sessions',
+            'delta_format': "{:+,.0f}",
             'icon': '🎯',
             'help_text': 'Total engagement sessions'
         },
         {
             'title': 'Graded Attempts',
             'value': f"{total_grades:,}",
+            'raw': total_grades,
+            'key': 'home.grades',
+            'delta_format': "{:+,.0f}",
             'icon': '✅',
             'help_text': 'Total graded conversations'
         }